@@ -1,43 +1,137 @@
+import importlib
 import os
 
 from flask import Flask
-from flask_migrate import Migrate
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
 
-db = SQLAlchemy()
-migrate = Migrate()
-login_manager = LoginManager()
-
-app = Flask(__name__)
-app.config.from_pyfile("../config.py")
-app.secret_key = os.getenv("SECRET_KEY", "dev-secret-key-please-change")
+from . import commands, views
+from .cache import versions
+from .database import TimedQueuePool, engine_tuning
+from .instrumentation import sql_instrumentation
+from .page_cache import page_cache
+from .routing import REPLICA_BIND, RoutingSession, replica_routing
 
-app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv(
-    'DATABASE_URI',
-    'sqlite:///expenses.db'
+db = SQLAlchemy(
+    engine_options={'poolclass': TimedQueuePool},
+    session_options={'class_': RoutingSession}
 )
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-
-db.init_app(app)
-migrate.init_app(app, db)
-login_manager.init_app(app)
+login_manager = LoginManager()
 login_manager.login_view = 'users_bp.login'
 login_manager.login_message = 'Please log in to access this page.'
 login_manager.login_message_category = 'warning'
+# The API answers 401 instead of redirecting to the login form.
+login_manager.blueprint_login_views['api_bp'] = None
+
+# Blueprints create_app can register, as "module:attribute". A blueprint's
+# package is only imported when an app asks for it. users is always
+# registered because the login manager redirects to it.
+BLUEPRINTS = {
+    'users': 'app.users:users_bp',
+    'products': 'app.products:products_bp',
+    'expenses': 'app.expenses:expenses_bp',
+    'api': 'app.api:api_bp',
+}
+
+
+def load_config(app, config=None):
+    app.config.from_pyfile("../config.py")
+    profile = app.config['APP_PROFILE']
+    if config and 'APP_PROFILE' in config:
+        profile = config['APP_PROFILE']
+    if profile not in app.config['PROFILES']:
+        raise RuntimeError(f"Unknown APP_PROFILE {profile!r}")
+    app.config.from_mapping(app.config['PROFILES'][profile])
+
+    app.secret_key = os.getenv("SECRET_KEY", "dev-secret-key-please-change")
+    app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv(
+        'DATABASE_URI',
+        'sqlite:///expenses.db'
+    )
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    if os.getenv('DATABASE_REPLICA_URI'):
+        app.config['SQLALCHEMY_BINDS'] = {
+            REPLICA_BIND: os.getenv('DATABASE_REPLICA_URI'),
+        }
+
+    if config:
+        app.config.from_mapping(config)
+
+    # Flask-SQLAlchemy gives bind engines none of SQLALCHEMY_ENGINE_OPTIONS,
+    # so the replica gets the profile's pool settings spelled out.
+    binds = app.config.get('SQLALCHEMY_BINDS') or {}
+    replica = binds.get(REPLICA_BIND)
+    if replica is not None and not isinstance(replica, dict):
+        app.config['SQLALCHEMY_BINDS'] = {**binds, REPLICA_BIND: {
+            'url': replica,
+            **app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}),
+        }}
+
 
-from . import views
+def register_blueprints(app, names):
+    for name in ['users', *(name for name in names if name != 'users')]:
+        if name not in BLUEPRINTS:
+            raise RuntimeError(f"Unknown blueprint {name!r}")
+        module_name, attribute = BLUEPRINTS[name].split(':')
+        blueprint = getattr(importlib.import_module(module_name), attribute)
+        app.register_blueprint(blueprint)
 
-from .users import users_bp
-from .products import products_bp
-from .expenses import expenses_bp
-from .users.models import User
 
-app.register_blueprint(users_bp)
-app.register_blueprint(products_bp)
-app.register_blueprint(expenses_bp)
+def create_app(config=None, blueprints=None):
+    """Build an application.
+
+    ``config`` is applied last, on top of ``config.py`` and the selected
+    profile. ``blueprints`` lists the keys of ``BLUEPRINTS`` to register;
+    all of them by default.
+    """
+    app = Flask(__name__)
+    load_config(app, config)
+
+    db.init_app(app)
+    replica_routing.init_app(app, db)
+    engine_tuning.init_app(app, db)
+    if app.config['MIGRATIONS']:
+        from flask_migrate import Migrate
+
+        Migrate(app, db)
+    versions.init_app(app)
+    sql_instrumentation.init_app(app, db)
+    login_manager.init_app(app)
+    page_cache.init_app(app)
+
+    from .users.hashing import password_hasher
+    from .users.identity import user_identities
+
+    password_hasher.init_app(app)
+    user_identities.init_app(app)
+    views.init_app(app)
+    commands.init_app(app)
+
+    register_blueprints(app, BLUEPRINTS if blueprints is None else blueprints)
+
+    @app.context_processor
+    def inject_blueprints():
+        return {'blueprints': app.blueprints}
+
+    # Tests and CLI commands such as "flask db upgrade" do not serve
+    # pages, and may run before the tables exist.
+    if (
+        app.config['PAGE_CACHE_PREWARM']
+        and not app.config['TESTING']
+        and not app.config['MIGRATIONS']
+    ):
+        page_cache.prewarm(app)
+        # Workers forked from a preloaded app must not share the
+        # connections opened while prewarming.
+        with app.app_context():
+            for engine in db.engines.values():
+                engine.dispose()
+
+    return app
 
 
 @login_manager.user_loader
 def load_user(user_id):
-    return db.session.get(User, int(user_id))
+    from .users.identity import user_identities
+
+    return user_identities.load(int(user_id))
@@ -0,0 +1,9 @@
+from flask import Blueprint
+
+api_bp = Blueprint(
+    "api_bp",
+    __name__,
+    url_prefix="/api/v1"
+)
+
+from . import errors, expenses
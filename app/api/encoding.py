@@ -0,0 +1,47 @@
+"""JSON responses for the API.
+
+orjson is used when it is installed: it encodes a page of expenses
+several times faster than the standard library and returns bytes that
+go into the response as they are. Without it the payload is encoded
+with :mod:`json` in its compact form. Money amounts are ``Decimal``
+and are written as strings such as ``"12.50"``, which keeps them
+exact for the client.
+"""
+import json
+from decimal import Decimal
+
+from flask import current_app
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+
+def _default(value):
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+
+_encode = json.JSONEncoder(
+    ensure_ascii=False,
+    separators=(',', ':'),
+    default=_default
+).encode
+
+
+def dumps(payload):
+    """Encode ``payload`` to UTF-8 JSON bytes."""
+    if orjson is not None:
+        return orjson.dumps(payload, default=_default)
+    return _encode(payload).encode()
+
+
+def json_response(payload, status=200, headers=None):
+    return current_app.response_class(
+        dumps(payload),
+        status=status,
+        headers=headers,
+        mimetype='application/json'
+    )
@@ -0,0 +1,13 @@
+from werkzeug.exceptions import HTTPException
+
+from . import api_bp
+from .encoding import json_response
+
+
+@api_bp.errorhandler(HTTPException)
+def http_error(error):
+    """Report errors as JSON instead of the HTML error pages."""
+    return json_response(
+        {'error': error.name, 'message': error.description},
+        status=error.code
+    )
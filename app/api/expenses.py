@@ -0,0 +1,377 @@
+"""JSON API for expenses.
+
+Input is validated with the rules of
+:class:`~app.expenses.forms.ExpenseForm`. Bodies must be sent as
+``application/json``, which browsers cannot do cross-site without a
+CORS preflight, so the form's CSRF token is not required here.
+
+``fields=id,title,amount`` limits the returned attributes, and only
+those columns (plus the key the page is sorted on) are loaded from the
+database. Lists are paginated with the same opaque keyset cursors as
+the HTML pages.
+"""
+from datetime import date, datetime, timezone
+from decimal import Decimal
+
+from flask import abort, current_app, request, url_for
+from flask_login import current_user, login_required
+from sqlalchemy import func, select
+from sqlalchemy.orm import load_only
+from werkzeug.datastructures import MultiDict
+
+from app import db
+from app.expenses import analytics, batch
+from app.expenses.cache import category_choices
+from app.expenses.forms import DATE_FORMAT, ExpenseForm
+from app.expenses.models import Expense, ExpenseCategory, UserCategoryTotal
+from app.expenses.pagination import (
+    SORT_COLUMNS,
+    InvalidCursor,
+    normalize_sort,
+    paginate
+)
+from app.expenses.search import get_search_backend
+from app.routing import read_from_replica, sticks_to_primary
+from . import api_bp
+from .encoding import json_response
+
+FIELDS = {
+    'id': Expense.id,
+    'title': Expense.title,
+    'description': Expense.description,
+    'amount': Expense.amount,
+    'date': Expense.date,
+    'category_id': Expense.category_id,
+    'owner_id': Expense.owner_id,
+    'created_at': Expense.created_at,
+    'updated_at': Expense.updated_at,
+}
+
+FORM_FIELDS = ('title', 'description', 'amount', 'date', 'category_id')
+# Fields the HTML form could also send as a JSON number.
+NUMERIC_FIELDS = ('amount', 'category_id')
+
+
+def _format_date(value):
+    return value.strftime(DATE_FORMAT)
+
+
+def _format_timestamp(value):
+    """ISO 8601 in UTC; SQLite hands the stored UTC times back naive."""
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.isoformat()
+
+
+FORMATTERS = {
+    'date': _format_date,
+    'created_at': _format_timestamp,
+    'updated_at': _format_timestamp,
+}
+
+
+def _requested_fields():
+    raw = request.args.get('fields', '')
+    if not raw.strip():
+        return tuple(FIELDS)
+
+    names = tuple(dict.fromkeys(
+        name.strip() for name in raw.split(',') if name.strip()
+    ))
+    unknown = [name for name in names if name not in FIELDS]
+    if unknown:
+        abort(400, f"Unknown field(s): {', '.join(unknown)}")
+    return names
+
+
+def _load_only(fields, *extra):
+    columns = [FIELDS[name] for name in fields if name != 'id']
+    return load_only(Expense.id, *columns, *extra)
+
+
+def _serialize(expense, fields):
+    data = {}
+    for name in fields:
+        value = getattr(expense, name)
+        formatter = FORMATTERS.get(name)
+        data[name] = formatter(value) if formatter else value
+    return data
+
+
+def _payload():
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        abort(400, 'Expected a JSON object')
+    return data
+
+
+def _form_value(name, value):
+    """``value`` as the HTML form would have sent it. Only strings, and
+    numbers for the numeric fields, could have come from the form."""
+    if isinstance(value, str):
+        return value
+    if name in NUMERIC_FIELDS:
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            return str(value)
+        raise ValueError('Expected a number or a string.')
+    raise ValueError('Expected a string.')
+
+
+def _validate(data):
+    """Return ``(form, valid)``: an ``ExpenseForm`` validated against
+    ``data`` and whether it passed; the errors are left on the form."""
+    formdata = MultiDict()
+    type_errors = {}
+    for name in FORM_FIELDS:
+        if data.get(name) is None:
+            continue
+        try:
+            formdata[name] = _form_value(name, data[name])
+        except ValueError as exc:
+            type_errors[name] = [str(exc)]
+
+    form = ExpenseForm(formdata=formdata, meta={'csrf': False})
+    form.category_id.choices = category_choices()
+    valid = form.validate()
+    for name, errors in type_errors.items():
+        form[name].errors = errors
+    return form, valid and not type_errors
+
+
+def _validation_error(errors):
+    return json_response(
+        {'error': 'Unprocessable Entity', 'errors': errors},
+        status=422
+    )
+
+
+def _apply(form, expense):
+    expense.title = form.title.data
+    expense.description = form.description.data
+    expense.amount = form.amount.data
+    expense.date = datetime.combine(form.date.data, datetime.min.time())
+    expense.category_id = form.category_id.data
+
+
+def _owned_expense(id):
+    expense = db.session.get(Expense, id)
+    if expense is None:
+        abort(404)
+    if expense.owner_id != current_user.id:
+        abort(403, 'You do not own this expense')
+    return expense
+
+
+@api_bp.route('/expenses')
+@login_required
+@read_from_replica
+def list_expenses():
+    fields = _requested_fields()
+
+    stmt = select(Expense)
+    if request.args.get('scope') == 'mine':
+        stmt = stmt.where(Expense.owner_id == current_user.id)
+
+    rank = None
+    search_query = request.args.get('search', '').strip()
+    if search_query:
+        stmt, rank = get_search_backend().apply(stmt, search_query)
+    sort_by, order = normalize_sort(
+        request.args.get('sort_by', 'date'),
+        request.args.get('order', 'desc'),
+        ranked=rank is not None
+    )
+
+    per_page = request.args.get(
+        'per_page',
+        current_app.config['EXPENSES_PER_PAGE'],
+        type=int
+    )
+    per_page = max(1, min(per_page, current_app.config['API_MAX_PER_PAGE']))
+
+    sort_key = () if sort_by == 'relevance' else (SORT_COLUMNS[sort_by],)
+    try:
+        page = paginate(
+            stmt.options(_load_only(fields, *sort_key)),
+            sort_by,
+            order,
+            cursor=request.args.get('cursor'),
+            per_page=per_page,
+            rank=rank
+        )
+    except InvalidCursor:
+        abort(400, 'Invalid cursor')
+
+    return json_response({
+        'items': [_serialize(expense, fields) for expense in page.items],
+        'next_cursor': page.next_cursor,
+        'prev_cursor': page.prev_cursor,
+    })
+
+
+@api_bp.route('/expenses', methods=['POST'])
+@login_required
+@sticks_to_primary
+def create_expense():
+    form, valid = _validate(_payload())
+    if not valid:
+        return _validation_error(form.errors)
+
+    expense = Expense(owner_id=current_user.id)
+    _apply(form, expense)
+    db.session.add(expense)
+    db.session.flush()
+    data = _serialize(expense, FIELDS)
+    db.session.commit()
+
+    return json_response(
+        data,
+        status=201,
+        headers={'Location': url_for('api_bp.get_expense', id=data['id'])}
+    )
+
+
+@api_bp.route('/expenses/<int:id>')
+@login_required
+@read_from_replica
+def get_expense(id):
+    fields = _requested_fields()
+    expense = db.session.get(Expense, id, options=[_load_only(fields)])
+    if expense is None:
+        abort(404)
+    return json_response(_serialize(expense, fields))
+
+
+@api_bp.route('/expenses/<int:id>', methods=['PUT', 'PATCH'])
+@login_required
+@sticks_to_primary
+def update_expense(id):
+    expense = _owned_expense(id)
+    data = _payload()
+    if request.method == 'PATCH':
+        data = {
+            'title': expense.title,
+            'description': expense.description,
+            'amount': expense.amount,
+            'date': _format_date(expense.date),
+            'category_id': expense.category_id,
+            **data,
+        }
+
+    form, valid = _validate(data)
+    if not valid:
+        return _validation_error(form.errors)
+
+    _apply(form, expense)
+    expense.updated_at = datetime.now(timezone.utc)
+    db.session.flush()
+    data = _serialize(expense, FIELDS)
+    db.session.commit()
+    return json_response(data)
+
+
+@api_bp.route('/expenses/<int:id>', methods=['DELETE'])
+@login_required
+@sticks_to_primary
+def delete_expense(id):
+    db.session.delete(_owned_expense(id))
+    db.session.commit()
+    return '', 204
+
+
+@api_bp.route('/expenses/batch', methods=['POST'])
+@login_required
+@sticks_to_primary
+def batch_expenses():
+    """Delete or update many of the user's expenses at once.
+
+    The body names an ``action`` (``delete`` or ``update``), selects
+    expenses with ``ids`` or ``filter`` and, for updates, lists the new
+    ``amount``, ``date`` and/or ``category_id`` under ``changes``.
+    """
+    data = _payload()
+    action = data.get('action')
+    try:
+        if action not in ('delete', 'update'):
+            raise batch.InvalidBatch(
+                {'action': ["Expected 'delete' or 'update'."]}
+            )
+        clauses = batch.selection(
+            current_user.id,
+            ids=data.get('ids'),
+            filters=data.get('filter')
+        )
+        if action == 'delete':
+            return json_response(
+                {'deleted': batch.delete_expenses(current_user.id, clauses)}
+            )
+        values = batch.changes(
+            data.get('changes'),
+            {id for id, _ in category_choices()}
+        )
+    except batch.InvalidBatch as exc:
+        return _validation_error(exc.errors)
+
+    return json_response(
+        {'updated': batch.update_expenses(current_user.id, clauses, values)}
+    )
+
+
+@api_bp.route('/expenses/summary')
+@login_required
+@read_from_replica
+def expenses_summary():
+    """Count and amounts of the user's expenses per category, read from
+    the ``user_category_totals`` rollup."""
+    rows = db.session.execute(
+        select(
+            ExpenseCategory.id,
+            ExpenseCategory.name,
+            func.sum(UserCategoryTotal.count),
+            func.sum(UserCategoryTotal.total),
+            func.min(UserCategoryTotal.min_amount),
+            func.max(UserCategoryTotal.max_amount),
+        )
+        .join(
+            ExpenseCategory,
+            ExpenseCategory.id == UserCategoryTotal.category_id
+        )
+        .where(UserCategoryTotal.owner_id == current_user.id)
+        .group_by(ExpenseCategory.id, ExpenseCategory.name)
+        .order_by(ExpenseCategory.name)
+    ).all()
+
+    categories = [
+        {
+            'category_id': id,
+            'category': name,
+            'count': int(count),
+            'total': total,
+            'min_amount': low,
+            'max_amount': high,
+        }
+        for id, name, count, total, low, high in rows
+    ]
+    return json_response({
+        'count': sum(row['count'] for row in categories),
+        'total': sum((row['total'] for row in categories), Decimal('0.00')),
+        'categories': categories,
+    })
+
+
+@api_bp.route('/expenses/analytics')
+@login_required
+@read_from_replica
+def expenses_analytics():
+    """The user's spending per category by day, week or month."""
+    try:
+        series = analytics.spending_from_args(
+            current_user.id,
+            request.args,
+            date.today()
+        )
+    except analytics.InvalidRange as exc:
+        abort(400, str(exc))
+    return json_response(series.as_dict())
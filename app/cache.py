@@ -0,0 +1,85 @@
+"""Version stamps for process-local caches.
+
+A cache stores the version it was filled at and refills itself when
+the current version differs. ``LocalVersions`` keeps the counters in
+memory, which is enough for a single process. ``FileVersions`` keeps
+them as file modification times in a shared directory, so every
+gunicorn worker on the host sees a bump made by any other worker at
+the cost of one ``stat`` call per lookup.
+"""
+import os
+import threading
+import time
+
+from flask import current_app
+
+
+class LocalVersions:
+    def __init__(self):
+        self._versions = {}
+        self._lock = threading.Lock()
+        # Keys never bumped report the start time, so a version seen
+        # before a restart is never mistaken for the current one.
+        self._initial = time.time_ns()
+
+    def get(self, key):
+        return self._versions.get(key, self._initial)
+
+    def bump(self, key):
+        with self._lock:
+            version = max(time.time_ns(), self.get(key) + 1)
+            self._versions[key] = version
+        return version
+
+
+class FileVersions:
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, f'{key}.version')
+
+    def get(self, key):
+        try:
+            return os.stat(self._path(key)).st_mtime_ns
+        except FileNotFoundError:
+            return 0
+
+    def bump(self, key):
+        path = self._path(key)
+        version = max(time.time_ns(), self.get(key) + 1)
+        with open(path, 'a'):
+            pass
+        os.utime(path, ns=(version, version))
+        return version
+
+
+class VersionStore:
+    """Flask extension exposing the configured version backend.
+
+    Set ``CACHE_VERSION_DIR`` to share versions between processes.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        directory = app.config.get('CACHE_VERSION_DIR')
+        app.extensions['versions'] = (
+            FileVersions(directory) if directory else LocalVersions()
+        )
+
+    @property
+    def backend(self):
+        return current_app.extensions['versions']
+
+    def get(self, key):
+        return self.backend.get(key)
+
+    def bump(self, key):
+        return self.backend.bump(key)
+
+
+versions = VersionStore()
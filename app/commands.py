@@ -0,0 +1,66 @@
+import time
+
+import click
+from flask.cli import with_appcontext
+
+
+@click.command("seed")
+@with_appcontext
+@click.option("--users", default=1_000, show_default=True,
+              type=click.IntRange(min=1),
+              help="Number of users to create.")
+@click.option("--categories", default=10, show_default=True,
+              type=click.IntRange(min=1),
+              help="Number of expense categories to use; existing ones "
+                   "with the same name are reused.")
+@click.option("--expenses", default=1_000_000, show_default=True,
+              type=click.IntRange(min=0),
+              help="Number of expenses to add, spread over the new users.")
+@click.option("--days", default=730, show_default=True,
+              type=click.IntRange(min=1),
+              help="Expenses are dated on this many days before today.")
+@click.option("--username-prefix", default="user", show_default=True,
+              help="New users are named PREFIX<id>.")
+@click.option("--password", default="password", show_default=True,
+              help="Password of every new user.")
+@click.option("--batch-size", default=None, type=click.IntRange(min=1),
+              help="Rows per INSERT batch and transaction.")
+@click.option("--seed", "random_seed", default=42, show_default=True,
+              help="Random seed, for reproducible datasets.")
+def seed(users, categories, expenses, days, username_prefix, password,
+         batch_size, random_seed):
+    """Bulk-load synthetic users, categories and expenses."""
+    from app import db
+    from app.cache import versions
+    from app.expenses import seeding
+    from app.expenses.cache import (
+        CATEGORIES_VERSION_KEY,
+        EXPENSES_VERSION_KEY
+    )
+    from app.users.hashing import password_hasher
+
+    started = time.perf_counter()
+    report = seeding.seed(
+        db.engine,
+        users,
+        categories,
+        expenses,
+        password_hash=password_hasher.hash(password),
+        days=days,
+        batch_size=batch_size or seeding.SEED_BATCH_SIZE,
+        username_prefix=username_prefix,
+        random_seed=random_seed,
+    )
+
+    versions.bump(EXPENSES_VERSION_KEY)
+    if report.categories:
+        versions.bump(CATEGORIES_VERSION_KEY)
+    click.echo(
+        f"Added {report.users} user(s), {report.categories} category(ies) "
+        f"and {report.expenses} expense(s) in "
+        f"{time.perf_counter() - started:.2f}s"
+    )
+
+
+def init_app(app):
+    app.cli.add_command(seed)
@@ -0,0 +1,75 @@
+"""Conditional GET for views whose output is fully determined by a few
+cheap validators.
+
+``conditional`` asks a validator function for the parts of an ETag
+(and optionally a last-modification time) before the view runs. If the
+client already holds that version it gets a bare 304 and the view,
+with its queries and template rendering, is skipped. Pages are marked
+``private, no-cache`` so browsers revalidate every time and shared
+caches never store them. Requests with pending flash messages always
+run the view, since the flash must be shown once. Neither are requests
+read from a replica: the validators come from the primary, and a
+lagging replica would render an old page under a current ETag.
+"""
+import hashlib
+from functools import wraps
+
+from flask import current_app, make_response, request, session
+from werkzeug.http import is_resource_modified
+
+from .routing import reading_from_replica
+
+
+def make_etag(*parts):
+    return hashlib.sha1(repr(parts).encode()).hexdigest()
+
+
+def conditional(validators):
+    """Decorate a view with conditional GET handling.
+
+    ``validators`` receives the view arguments and returns
+    ``(parts, last_modified)``, or ``None`` to let the view run
+    unconditionally (e.g. to produce a 404). The ETag covers ``parts``,
+    the current user and the query string.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if (
+                request.method != 'GET'
+                or not current_app.config.get('CONDITIONAL_GET', False)
+                or '_flashes' in session
+                or reading_from_replica()
+            ):
+                return view(*args, **kwargs)
+
+            validated = validators(*args, **kwargs)
+            if validated is None:
+                return view(*args, **kwargs)
+            parts, last_modified = validated
+            etag = make_etag(
+                parts,
+                session.get('_user_id'),
+                request.query_string
+            )
+
+            if not is_resource_modified(
+                request.environ,
+                etag=etag,
+                last_modified=last_modified
+            ):
+                response = current_app.response_class(status=304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+
+            response.set_etag(etag)
+            if last_modified is not None:
+                response.last_modified = last_modified
+            response.cache_control.private = True
+            response.cache_control.no_cache = True
+            response.vary.add('Cookie')
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,95 @@
+"""Engine tuning: SQLite pragmas and connection pool checkout metrics.
+
+``TimedQueuePool`` is the default pool class for every engine. It
+times how long each checkout waits for a free connection (including
+opening a new one) and keeps running totals per pool, counting the
+checkouts that gave up after ``pool_timeout`` separately; failures to
+open a connection are not timeouts. The time is also
+added to the current request's SQL statistics. ``EngineTuning`` runs
+the ``SQLITE_PRAGMAS`` from the active config profile on every new
+SQLite connection.
+"""
+import threading
+import time
+from dataclasses import asdict, dataclass
+
+from sqlalchemy import event, exc
+from sqlalchemy.pool import QueuePool
+
+from .instrumentation import record_pool_wait
+
+
+@dataclass
+class PoolStats:
+    checkouts: int = 0
+    timeouts: int = 0
+    total_wait: float = 0.0
+    max_wait: float = 0.0
+
+
+class TimedQueuePool(QueuePool):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+        self._stats_lock = threading.Lock()
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            with self._stats_lock:
+                self.stats.timeouts += 1
+            raise
+
+        wait = time.perf_counter() - started
+        with self._stats_lock:
+            self.stats.checkouts += 1
+            self.stats.total_wait += wait
+            self.stats.max_wait = max(self.stats.max_wait, wait)
+        record_pool_wait(wait)
+        return connection
+
+
+def pool_stats(engine):
+    """Return checkout metrics and current usage of ``engine``'s pool."""
+    pool = engine.pool
+    stats = {'pool': type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        stats.update(
+            size=pool.size(),
+            checked_out=pool.checkedout(),
+            overflow=pool.overflow(),
+        )
+    if isinstance(pool, TimedQueuePool):
+        stats.update(asdict(pool.stats))
+    return stats
+
+
+def _apply_pragmas(pragmas):
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name}={value}')
+        cursor.close()
+    return on_connect
+
+
+class EngineTuning:
+    def __init__(self, app=None, db=None):
+        if app is not None:
+            self.init_app(app, db)
+
+    def init_app(self, app, db):
+        pragmas = app.config.setdefault('SQLITE_PRAGMAS', {})
+        if not pragmas:
+            return
+
+        with app.app_context():
+            engines = set(db.engines.values())
+        for engine in engines:
+            if engine.dialect.name == 'sqlite':
+                event.listen(engine, 'connect', _apply_pragmas(pragmas))
+
+
+engine_tuning = EngineTuning()
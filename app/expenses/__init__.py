@@ -4,7 +4,8 @@ expenses_bp = Blueprint(
     "expenses_bp",
     __name__,
     url_prefix="/expenses",
-    template_folder="templates"
+    template_folder="templates",
+    cli_group="expenses"
 )
 
-from . import views
+from . import views, commands
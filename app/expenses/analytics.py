@@ -0,0 +1,201 @@
+"""Spending per category over time, bucketed in SQL.
+
+Series are read from the rollups rather than the expenses: monthly
+ones from ``user_category_totals``, daily and weekly ones from
+``user_daily_totals``, with weeks summed from days in the query. The
+cost follows the number of buckets and categories, however many
+expenses the user has. Monthly ranges are widened to whole months and
+weekly ones start on a Monday. Buckets with no spending are filled
+with zeros so every series lines up with the bucket labels.
+"""
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import List
+
+from sqlalchemy import func, select
+
+from app import db
+from . import rollup
+from .cache import category_choices
+from .daily import week_start
+from .forms import DATE_FORMAT
+from .models import UserCategoryTotal, UserDailyTotal
+
+GRANULARITIES = ('day', 'week', 'month')
+
+# Default ranges, ending today, when the request leaves "from" out.
+DEFAULT_SPANS = {
+    'day': timedelta(days=29),
+    'week': timedelta(weeks=11),
+    'month': timedelta(days=365),
+}
+
+MAX_BUCKETS = 1500
+
+
+class InvalidRange(ValueError):
+    pass
+
+
+@dataclass
+class Series:
+    granularity: str
+    start: date
+    end: date
+    buckets: List[date]
+    categories: List[dict] = field(default_factory=list)
+    totals: List[Decimal] = field(default_factory=list)
+
+    def as_dict(self):
+        """Chart-ready form: bucket labels plus one series per category."""
+        return {
+            'granularity': self.granularity,
+            'from': self.start.strftime(DATE_FORMAT),
+            'to': self.end.strftime(DATE_FORMAT),
+            'buckets': [
+                bucket.strftime(DATE_FORMAT) for bucket in self.buckets
+            ],
+            'categories': self.categories,
+            'totals': self.totals,
+        }
+
+
+def bucket_of(granularity, value):
+    if granularity == 'month':
+        return rollup.month_of(value)
+    if granularity == 'week':
+        return value - timedelta(days=value.weekday())
+    return value
+
+
+def _next_bucket(granularity, bucket):
+    if granularity == 'month':
+        return rollup.next_month(bucket)
+    if granularity == 'week':
+        return bucket + timedelta(weeks=1)
+    return bucket + timedelta(days=1)
+
+
+def parse_range(granularity, start, end, today):
+    """Validate the query parameters; ``start`` and ``end`` are
+    ``YYYY-MM-DD`` strings or empty for the default range."""
+    if granularity not in GRANULARITIES:
+        raise InvalidRange(f'granularity must be one of {GRANULARITIES}')
+    try:
+        end = datetime.strptime(end, DATE_FORMAT).date() if end else today
+        start = (
+            datetime.strptime(start, DATE_FORMAT).date() if start
+            else end - DEFAULT_SPANS[granularity]
+        )
+    except ValueError:
+        raise InvalidRange('Dates must be given as YYYY-MM-DD') from None
+    if start > end:
+        raise InvalidRange('"from" must not be after "to"')
+
+    start = bucket_of(granularity, start)
+    if granularity == 'month':
+        end = rollup.next_month(rollup.month_of(end)) - timedelta(days=1)
+    return granularity, start, end
+
+
+def _rows(owner_id, granularity, start, end):
+    """Return ``(category_id, bucket, count, total)`` rows."""
+    if granularity == 'month':
+        return db.session.execute(
+            select(
+                UserCategoryTotal.category_id,
+                UserCategoryTotal.month,
+                UserCategoryTotal.count,
+                UserCategoryTotal.total,
+            ).where(
+                UserCategoryTotal.owner_id == owner_id,
+                UserCategoryTotal.month >= start,
+                UserCategoryTotal.month <= end,
+            )
+        )
+
+    in_range = (
+        UserDailyTotal.owner_id == owner_id,
+        UserDailyTotal.day >= start,
+        UserDailyTotal.day <= end,
+    )
+    if granularity == 'day':
+        return db.session.execute(
+            select(
+                UserDailyTotal.category_id,
+                UserDailyTotal.day,
+                UserDailyTotal.count,
+                UserDailyTotal.total,
+            ).where(*in_range)
+        )
+
+    week = week_start(UserDailyTotal.day)
+    return db.session.execute(
+        select(
+            UserDailyTotal.category_id,
+            week,
+            func.sum(UserDailyTotal.count),
+            func.sum(UserDailyTotal.total),
+        )
+        .where(*in_range)
+        .group_by(UserDailyTotal.category_id, week)
+    )
+
+
+def spending(owner_id, granularity, start, end):
+    """Return the :class:`Series` of the owner's spending per category
+    between ``start`` and ``end`` (as returned by :func:`parse_range`)."""
+    buckets = []
+    bucket = start
+    while bucket <= end:
+        buckets.append(bucket)
+        if len(buckets) > MAX_BUCKETS:
+            raise InvalidRange(
+                f'At most {MAX_BUCKETS} buckets; pick a shorter range or '
+                'a coarser granularity'
+            )
+        bucket = _next_bucket(granularity, bucket)
+
+    position = {bucket: index for index, bucket in enumerate(buckets)}
+    series = {}
+    for category_id, bucket, count, total in _rows(
+        owner_id, granularity, start, end
+    ):
+        if category_id not in series:
+            series[category_id] = (
+                [0] * len(buckets),
+                [Decimal('0.00')] * len(buckets)
+            )
+        counts, totals = series[category_id]
+        index = position[bucket]
+        counts[index] += count
+        totals[index] += total
+
+    result = Series(granularity, start, end, buckets)
+    result.totals = [Decimal('0.00')] * len(buckets)
+    for category_id, name in category_choices():
+        if category_id not in series:
+            continue
+        counts, totals = series[category_id]
+        result.categories.append({
+            'category_id': category_id,
+            'category': name,
+            'counts': counts,
+            'totals': totals,
+        })
+        for index, total in enumerate(totals):
+            result.totals[index] += total
+    return result
+
+
+def spending_from_args(owner_id, args, today):
+    """:func:`spending` for the ``granularity``, ``from`` and ``to``
+    query parameters in ``args``."""
+    granularity, start, end = parse_range(
+        args.get('granularity', 'month'),
+        args.get('from', ''),
+        args.get('to', ''),
+        today
+    )
+    return spending(owner_id, granularity, start, end)
@@ -0,0 +1,202 @@
+"""Set-based changes to many expenses of one owner.
+
+A batch selects expenses by a list of ids or by a filter and deletes
+or updates all of them with a single ``DELETE`` or ``UPDATE``. The
+owner is part of the ``WHERE`` clause, so ids of other users' expenses
+simply do not match. The statements bypass the ORM unit of work, so
+the rollup buckets they touch are recomputed and the expense versions
+bumped here, and everything is committed once.
+"""
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal, InvalidOperation
+
+from sqlalchemy import delete, select, update
+
+from app import db
+from . import daily, rollup
+from .cache import expenses_changed
+from .forms import (
+    AMOUNT_MAX,
+    AMOUNT_MAX_MESSAGE,
+    AMOUNT_MESSAGE,
+    AMOUNT_MIN,
+    CATEGORY_MESSAGE,
+    DATE_FORMAT
+)
+from .models import Expense, to_decimal
+from .search import get_search_backend
+
+BATCH_MAX_IDS = 5000
+
+CHANGE_FIELDS = ('amount', 'date', 'category_id')
+
+
+class InvalidBatch(ValueError):
+    def __init__(self, errors):
+        super().__init__(errors)
+        self.errors = errors
+
+
+def _integer(value):
+    if isinstance(value, bool) or not isinstance(value, int):
+        raise ValueError('Not a valid integer value.')
+    return value
+
+
+def _amount(value):
+    """An amount given as a JSON number or a decimal string."""
+    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+        raise ValueError('Not a valid decimal value.')
+    try:
+        amount = to_decimal(Decimal(str(value)))
+    except InvalidOperation:
+        raise ValueError('Not a valid decimal value.') from None
+    if abs(amount) > AMOUNT_MAX:
+        raise ValueError(AMOUNT_MAX_MESSAGE)
+    return amount
+
+
+def _date(value):
+    try:
+        return datetime.strptime(value, DATE_FORMAT)
+    except (TypeError, ValueError):
+        raise ValueError('Not a valid date value.') from None
+
+
+def _search(value):
+    if not isinstance(value, str) or not value.strip():
+        raise ValueError('Expected a search query.')
+    matches, _ = get_search_backend().apply(select(Expense.id), value.strip())
+    return Expense.id.in_(matches)
+
+
+FILTERS = {
+    'search': _search,
+    'category_id': lambda value: Expense.category_id == _integer(value),
+    'date_from': lambda value: Expense.date >= _date(value),
+    'date_to': lambda value: Expense.date < _date(value) + timedelta(days=1),
+    'min_amount': lambda value: Expense.amount >= _amount(value),
+    'max_amount': lambda value: Expense.amount <= _amount(value),
+}
+
+
+def selection(owner_id, ids=None, filters=None):
+    """Return the ``WHERE`` clauses for the owner's expenses among
+    ``ids`` or matching every entry of ``filters``."""
+    if (ids is None) == (filters is None):
+        raise InvalidBatch({'selection': ['Send either ids or filter.']})
+
+    clauses = [Expense.owner_id == owner_id]
+    errors = {}
+    if ids is not None:
+        try:
+            if not isinstance(ids, list) or not ids:
+                raise ValueError('Expected a non-empty list of ids.')
+            if len(ids) > BATCH_MAX_IDS:
+                raise ValueError(f'At most {BATCH_MAX_IDS} ids per batch.')
+            clauses.append(Expense.id.in_({_integer(id) for id in ids}))
+        except ValueError as exc:
+            errors['ids'] = [str(exc)]
+    elif not isinstance(filters, dict) or not filters:
+        errors['filter'] = ['Expected at least one filter.']
+    else:
+        for name, value in filters.items():
+            if name not in FILTERS:
+                errors[name] = ['Unknown filter.']
+                continue
+            try:
+                clauses.append(FILTERS[name](value))
+            except ValueError as exc:
+                errors[name] = [str(exc)]
+
+    if errors:
+        raise InvalidBatch(errors)
+    return clauses
+
+
+def changes(data, category_ids):
+    """Validate the column values of a batch update."""
+    if not isinstance(data, dict) or not data:
+        raise InvalidBatch({'changes': ['Expected at least one change.']})
+
+    values = {}
+    errors = {}
+    for name, value in data.items():
+        try:
+            if name == 'amount':
+                values[name] = _amount(value)
+                if not values[name] >= AMOUNT_MIN:
+                    raise ValueError(AMOUNT_MESSAGE)
+            elif name == 'date':
+                values[name] = _date(value)
+            elif name == 'category_id':
+                values[name] = _integer(value)
+                if value not in category_ids:
+                    raise ValueError(CATEGORY_MESSAGE)
+            else:
+                raise ValueError('Cannot be changed in a batch.')
+        except ValueError as exc:
+            errors[name] = [str(exc)]
+
+    if errors:
+        raise InvalidBatch(errors)
+    return values
+
+
+def _buckets(connection, clauses):
+    month = rollup.month_start(Expense.date)
+    return {
+        (owner_id, category_id, month)
+        for owner_id, category_id, month in connection.execute(
+            select(Expense.owner_id, Expense.category_id, month)
+            .where(*clauses)
+            .group_by(Expense.owner_id, Expense.category_id, month)
+        )
+    }
+
+
+def _finish(owner_id, buckets):
+    connection = db.session.connection()
+    rollup.refresh_buckets(connection, buckets)
+    if buckets:
+        months = [month for _, _, month in buckets]
+        daily.refresh_range(
+            connection,
+            owner_id,
+            {category_id for _, category_id, _ in buckets},
+            min(months),
+            rollup.next_month(max(months)) - timedelta(days=1)
+        )
+    expenses_changed(db.session, [owner_id])
+    db.session.commit()
+
+
+def delete_expenses(owner_id, clauses):
+    """Delete the selected expenses and return how many were deleted."""
+    buckets = _buckets(db.session.connection(), clauses)
+    result = db.session.execute(
+        delete(Expense).where(*clauses),
+        execution_options={'synchronize_session': False}
+    )
+    _finish(owner_id, buckets)
+    return result.rowcount
+
+
+def update_expenses(owner_id, clauses, values):
+    """Apply ``values`` to the selected expenses and return how many
+    were updated."""
+    before = _buckets(db.session.connection(), clauses)
+    result = db.session.execute(
+        update(Expense)
+        .where(*clauses)
+        .values(**values, updated_at=datetime.now(timezone.utc)),
+        execution_options={'synchronize_session': False}
+    )
+
+    after = set()
+    for owner, category_id, month in before:
+        if 'date' in values:
+            month = rollup.month_of(values['date'])
+        after.add((owner, values.get('category_id', category_id), month))
+    _finish(owner_id, before | after)
+    return result.rowcount
@@ -0,0 +1,87 @@
+"""Process-local cache of the expense category choices, and data
+versions for expense pages.
+
+Writes to ``ExpenseCategory`` flag the session, and the version is
+bumped once the transaction commits, so a reader can never cache rows
+that were later rolled back or miss rows that were just committed.
+Writes to ``Expense`` do the same for a global version and one version
+per owner, which the list pages use as their ETags.
+"""
+from flask import current_app
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session, object_session
+
+from app import db
+from app.cache import versions
+from .models import Expense, ExpenseCategory
+
+CATEGORIES_VERSION_KEY = 'expense-categories'
+EXPENSES_VERSION_KEY = 'expenses'
+
+
+def owner_version_key(owner_id):
+    return f'expenses-owner-{owner_id}'
+
+
+def category_choices():
+    """Return ``[(id, name), ...]`` ordered by name."""
+    version = versions.get(CATEGORIES_VERSION_KEY)
+    cached = current_app.extensions.get('category_choices')
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    choices = [
+        (id, name) for id, name in db.session.execute(
+            select(ExpenseCategory.id, ExpenseCategory.name)
+            .order_by(ExpenseCategory.name)
+        )
+    ]
+    current_app.extensions['category_choices'] = (version, choices)
+    return choices
+
+
+def _categories_changed(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        session.info['categories_changed'] = True
+
+
+for _event in ('after_insert', 'after_update', 'after_delete'):
+    event.listen(ExpenseCategory, _event, _categories_changed)
+
+
+def expenses_changed(session, owner_ids):
+    """Bump the expense versions of ``owner_ids`` when ``session``
+    commits; for writes that bypass the ORM mapper events."""
+    session.info.setdefault('expense_owners', set()).update(owner_ids)
+
+
+def _expense_changed(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        expenses_changed(session, [target.owner_id])
+
+
+for _event in ('after_insert', 'after_update', 'after_delete'):
+    event.listen(Expense, _event, _expense_changed)
+
+
+@event.listens_for(Session, 'after_commit')
+def _bump_categories_version(session):
+    if session.info.pop('categories_changed', False):
+        versions.bump(CATEGORIES_VERSION_KEY)
+
+
+@event.listens_for(Session, 'after_commit')
+def _bump_expense_versions(session):
+    owner_ids = session.info.pop('expense_owners', None)
+    if owner_ids:
+        versions.bump(EXPENSES_VERSION_KEY)
+        for owner_id in owner_ids:
+            versions.bump(owner_version_key(owner_id))
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_changes(session):
+    session.info.pop('categories_changed', None)
+    session.info.pop('expense_owners', None)
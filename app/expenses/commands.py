@@ -0,0 +1,79 @@
+import time
+
+import click
+from sqlalchemy import select
+
+from app import db
+from app.users.models import User
+from . import expenses_bp
+from . import daily, rollup
+from .importer import IMPORT_CHUNK_SIZE, import_expenses
+
+
+@expenses_bp.cli.command('rebuild-totals')
+@click.option(
+    '--check',
+    is_flag=True,
+    help='Only report buckets that drifted from the expenses table.'
+)
+def rebuild_totals(check):
+    """Rebuild the user_category_totals and user_daily_totals rollups
+    from scratch."""
+    with db.engine.begin() as connection:
+        if check:
+            drift = [
+                (owner_id, category_id, f'{month:%Y-%m}', expected, stored)
+                for (owner_id, category_id, month), expected, stored
+                in rollup.find_drift(connection)
+            ] + [
+                (owner_id, category_id, f'{day:%Y-%m-%d}', expected, stored)
+                for (owner_id, category_id, day), expected, stored
+                in daily.find_drift(connection)
+            ]
+            for owner_id, category_id, period, expected, stored in drift:
+                click.echo(
+                    f'owner={owner_id} category={category_id} '
+                    f'{period}: expected {expected}, stored {stored}'
+                )
+            if drift:
+                raise click.ClickException(
+                    f'{len(drift)} bucket(s) drifted'
+                )
+            click.echo('Rollup is in sync')
+            return
+
+        rollup.rebuild(connection)
+        daily.rebuild(connection)
+    click.echo('Rollup rebuilt')
+
+
+@expenses_bp.cli.command('import')
+@click.argument('file', type=click.File('r', encoding='utf-8-sig'))
+@click.option('--owner', required=True, help='Username that owns the rows.')
+@click.option(
+    '--chunk-size',
+    default=IMPORT_CHUNK_SIZE,
+    show_default=True,
+    help='Rows inserted and committed per batch.'
+)
+def import_command(file, owner, chunk_size):
+    """Import expenses from a CSV file."""
+    owner_id = db.session.execute(
+        select(User.id).filter_by(username=owner)
+    ).scalar()
+    if owner_id is None:
+        raise click.BadParameter(
+            f'unknown user {owner!r}',
+            param_hint='--owner'
+        )
+
+    started = time.perf_counter()
+    report = import_expenses(file, owner_id, chunk_size=chunk_size)
+    elapsed = time.perf_counter() - started
+
+    for line, message in report.errors:
+        click.echo(f'line {line}: {message}', err=True)
+    click.echo(
+        f'Imported {report.inserted} expense(s), skipped '
+        f'{len(report.errors)} row(s) in {elapsed:.2f}s'
+    )
@@ -0,0 +1,235 @@
+"""Incremental maintenance of the ``user_daily_totals`` rollup.
+
+The day-grain companion of :mod:`.rollup`: count and sum of each
+owner's expenses per category and day, which daily and weekly
+analytics read instead of the expenses themselves. Without minimum
+and maximum every change is a plain increment or decrement. As with
+the monthly rollup, statements that bypass the ORM unit of work must
+call :func:`add_amounts` or :func:`refresh_range` themselves.
+"""
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, event, func, inspect, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import FunctionElement
+from sqlalchemy.types import Date
+
+from .models import Expense, UserDailyTotal
+
+daily = UserDailyTotal.__table__
+expenses = Expense.__table__
+
+
+class day_start(FunctionElement):
+    """Date part of a datetime expression."""
+
+    type = Date()
+    name = 'day_start'
+    inherit_cache = True
+
+
+@compiles(day_start)
+def _day_start_default(element, compiler, **kw):
+    return 'CAST(%s AS DATE)' % compiler.process(element.clauses, **kw)
+
+
+@compiles(day_start, 'sqlite')
+def _day_start_sqlite(element, compiler, **kw):
+    return 'date(%s)' % compiler.process(element.clauses, **kw)
+
+
+class week_start(FunctionElement):
+    """Monday of the ISO week of a date expression, as a DATE."""
+
+    type = Date()
+    name = 'week_start'
+    inherit_cache = True
+
+
+@compiles(week_start)
+def _week_start_default(element, compiler, **kw):
+    return "CAST(date_trunc('week', %s) AS DATE)" % compiler.process(
+        element.clauses, **kw
+    )
+
+
+@compiles(week_start, 'sqlite')
+def _week_start_sqlite(element, compiler, **kw):
+    return "date(%s, 'weekday 0', '-6 days')" % compiler.process(
+        element.clauses, **kw
+    )
+
+
+def bucket_of(owner_id, category_id, value):
+    return owner_id, category_id, value.date()
+
+
+def _bucket_where(bucket):
+    owner_id, category_id, day = bucket
+    return (
+        daily.c.owner_id == owner_id,
+        daily.c.category_id == category_id,
+        daily.c.day == day,
+    )
+
+
+def add_amounts(connection, rows):
+    """Merge ``{bucket: (count, total)}`` into the rollup; negative
+    counts take expenses out and empty buckets are removed."""
+    dialect = connection.dialect.name
+    for bucket, (count, total) in rows.items():
+        if not count and not total:
+            continue
+        owner_id, category_id, day = bucket
+        values = dict(
+            owner_id=owner_id,
+            category_id=category_id,
+            day=day,
+            count=count,
+            total=total,
+        )
+
+        if dialect in ('sqlite', 'postgresql'):
+            insert = (sqlite if dialect == 'sqlite' else postgresql).insert
+            stmt = insert(daily).values(**values)
+            connection.execute(stmt.on_conflict_do_update(
+                index_elements=[
+                    daily.c.owner_id,
+                    daily.c.day,
+                    daily.c.category_id,
+                ],
+                set_={
+                    'count': daily.c.count + stmt.excluded.count,
+                    'total': daily.c.total + stmt.excluded.total,
+                }
+            ))
+        else:
+            result = connection.execute(
+                update(daily)
+                .where(*_bucket_where(bucket))
+                .values(
+                    count=daily.c.count + count,
+                    total=daily.c.total + total,
+                )
+            )
+            if result.rowcount == 0:
+                connection.execute(daily.insert().values(**values))
+
+        if count < 0:
+            connection.execute(
+                delete(daily).where(*_bucket_where(bucket), daily.c.count <= 0)
+            )
+
+
+def _aggregate(*where):
+    day = day_start(expenses.c.date)
+    return select(
+        expenses.c.owner_id,
+        day.label('day'),
+        expenses.c.category_id,
+        func.count(expenses.c.id).label('count'),
+        func.sum(expenses.c.amount).label('total'),
+    ).where(*where).group_by(expenses.c.owner_id, day, expenses.c.category_id)
+
+
+def _insert_from(query):
+    return daily.insert().from_select(
+        ['owner_id', 'day', 'category_id', 'count', 'total'],
+        query
+    )
+
+
+def refresh_range(connection, owner_id, category_ids, first_day, last_day):
+    """Recompute the owner's buckets of ``category_ids`` from
+    ``first_day`` to ``last_day`` with two set-based statements."""
+    category_ids = list(category_ids)
+    if not category_ids:
+        return
+    connection.execute(
+        delete(daily).where(
+            daily.c.owner_id == owner_id,
+            daily.c.category_id.in_(category_ids),
+            daily.c.day >= first_day,
+            daily.c.day <= last_day,
+        )
+    )
+    connection.execute(_insert_from(_aggregate(
+        expenses.c.owner_id == owner_id,
+        expenses.c.category_id.in_(category_ids),
+        expenses.c.date >= datetime.combine(first_day, datetime.min.time()),
+        expenses.c.date < datetime.combine(
+            last_day + timedelta(days=1),
+            datetime.min.time()
+        ),
+    )))
+
+
+def _previous(state, key):
+    history = state.attrs[key].history
+    if history.deleted:
+        return history.deleted[0]
+    return getattr(state.object, key)
+
+
+@event.listens_for(Expense, 'after_insert')
+def _expense_inserted(mapper, connection, target):
+    bucket = bucket_of(target.owner_id, target.category_id, target.date)
+    add_amounts(connection, {bucket: (1, target.amount)})
+
+
+@event.listens_for(Expense, 'after_update')
+def _expense_updated(mapper, connection, target):
+    state = inspect(target)
+    if not any(
+        state.attrs[key].history.has_changes()
+        for key in ('owner_id', 'category_id', 'date', 'amount')
+    ):
+        return
+
+    old_bucket = bucket_of(
+        _previous(state, 'owner_id'),
+        _previous(state, 'category_id'),
+        _previous(state, 'date'),
+    )
+    new_bucket = bucket_of(target.owner_id, target.category_id, target.date)
+    old_amount = _previous(state, 'amount')
+
+    if old_bucket == new_bucket:
+        add_amounts(connection, {new_bucket: (0, target.amount - old_amount)})
+        return
+    add_amounts(connection, {old_bucket: (-1, -old_amount)})
+    add_amounts(connection, {new_bucket: (1, target.amount)})
+
+
+@event.listens_for(Expense, 'after_delete')
+def _expense_deleted(mapper, connection, target):
+    bucket = bucket_of(target.owner_id, target.category_id, target.date)
+    add_amounts(connection, {bucket: (-1, -target.amount)})
+
+
+def rebuild(connection):
+    connection.execute(delete(daily))
+    connection.execute(_insert_from(_aggregate()))
+
+
+def find_drift(connection):
+    """Return ``(bucket, expected, stored)`` for every mismatching bucket.
+
+    Amounts are whole cents, so buckets must match exactly.
+    """
+    def as_dict(rows):
+        return {
+            (row.owner_id, row.category_id, row.day): (row.count, row.total)
+            for row in rows
+        }
+
+    expected = as_dict(connection.execute(_aggregate()))
+    stored = as_dict(connection.execute(select(daily)))
+
+    drift = []
+    for bucket in sorted(expected.keys() | stored.keys(), key=str):
+        want, have = expected.get(bucket), stored.get(bucket)
+        if want != have:
+            drift.append((bucket, want, have))
+    return drift
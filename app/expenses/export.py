@@ -0,0 +1,93 @@
+"""Streaming serializers for expense exports.
+
+Rows are fetched with ``yield_per`` so the driver streams them from a
+server-side cursor where the database supports one, and each batch is
+written out as soon as it arrives.
+"""
+import csv
+import io
+import json
+
+from app import db
+from app.users.models import User
+from .models import Expense, ExpenseCategory
+
+EXPORT_BATCH_SIZE = 1000
+
+COLUMNS = (
+    'id',
+    'title',
+    'description',
+    'amount',
+    'date',
+    'category',
+    'owner_username',
+)
+
+
+def export_statement(stmt, order_by):
+    """Narrow a filtered ``select(Expense)`` to the exported columns."""
+    return (
+        stmt.with_only_columns(
+            Expense.id,
+            Expense.title,
+            Expense.description,
+            Expense.amount,
+            Expense.date,
+            ExpenseCategory.name.label('category'),
+            User.username.label('owner_username'),
+        )
+        .join(ExpenseCategory, ExpenseCategory.id == Expense.category_id)
+        .join(User, User.id == Expense.owner_id)
+        .order_by(*order_by)
+        .execution_options(yield_per=EXPORT_BATCH_SIZE)
+    )
+
+
+def _batches(stmt):
+    result = db.session.execute(stmt)
+    try:
+        yield from result.partitions()
+    finally:
+        result.close()
+
+
+def csv_rows(stmt):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    writer.writerow(COLUMNS)
+    yield buffer.getvalue()
+
+    for batch in _batches(stmt):
+        buffer.seek(0)
+        buffer.truncate()
+        for row in batch:
+            writer.writerow((
+                row.id,
+                row.title,
+                row.description or '',
+                f'{row.amount:.2f}',
+                row.date.strftime('%Y-%m-%d'),
+                row.category,
+                row.owner_username,
+            ))
+        yield buffer.getvalue()
+
+
+def ndjson_rows(stmt):
+    dumps = json.JSONEncoder(ensure_ascii=False, separators=(',', ':')).encode
+
+    for batch in _batches(stmt):
+        yield ''.join(
+            dumps({
+                'id': row.id,
+                'title': row.title,
+                'description': row.description,
+                'amount': str(row.amount),
+                'date': row.date.strftime('%Y-%m-%d'),
+                'category': row.category,
+                'owner_username': row.owner_username,
+            }) + '\n'
+            for row in batch
+        )
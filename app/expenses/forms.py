@@ -1,25 +1,47 @@
 from datetime import date
+from decimal import ROUND_HALF_UP, Decimal
 
 from flask_wtf import FlaskForm
+from flask_wtf.file import FileAllowed, FileField, FileRequired
 from wtforms import (
     StringField,
     TextAreaField,
-    FloatField,
+    DecimalField,
     DateField,
     SelectField
 )
 from wtforms.validators import DataRequired, Length, NumberRange, Optional
 
+from .models import AMOUNT_MAX
+
+TITLE_MIN_LENGTH = 3
+TITLE_MAX_LENGTH = 200
+DESCRIPTION_MAX_LENGTH = 1000
+AMOUNT_MIN = Decimal('0.01')
+DATE_FORMAT = '%Y-%m-%d'
+
+REQUIRED_MESSAGE = 'This field is required'
+TITLE_LENGTH_MESSAGE = (
+    f'Title must be between {TITLE_MIN_LENGTH} and {TITLE_MAX_LENGTH} '
+    'characters'
+)
+DESCRIPTION_LENGTH_MESSAGE = (
+    f'Description cannot exceed {DESCRIPTION_MAX_LENGTH} characters'
+)
+AMOUNT_MESSAGE = 'Amount must be greater than 0'
+AMOUNT_MAX_MESSAGE = f'Amount cannot exceed {AMOUNT_MAX}'
+CATEGORY_MESSAGE = 'Select a category'
+
 
 class ExpenseForm(FlaskForm):
     title = StringField(
         'Expense Title',
         validators=[
-            DataRequired(message='This field is required'),
+            DataRequired(message=REQUIRED_MESSAGE),
             Length(
-                min=3,
-                max=200,
-                message='Title must be between 3 and 200 characters'
+                min=TITLE_MIN_LENGTH,
+                max=TITLE_MAX_LENGTH,
+                message=TITLE_LENGTH_MESSAGE
             )
         ]
     )
@@ -29,31 +51,34 @@ class ExpenseForm(FlaskForm):
         validators=[
             Optional(),
             Length(
-                max=1000,
-                message='Description cannot exceed 1000 characters'
+                max=DESCRIPTION_MAX_LENGTH,
+                message=DESCRIPTION_LENGTH_MESSAGE
             )
         ]
     )
 
-    amount = FloatField(
+    amount = DecimalField(
         'Amount (UAH)',
+        places=2,
+        rounding=ROUND_HALF_UP,
         validators=[
-            DataRequired(message='This field is required'),
-            NumberRange(min=0.01, message='Amount must be greater than 0')
+            DataRequired(message=REQUIRED_MESSAGE),
+            NumberRange(min=AMOUNT_MIN, message=AMOUNT_MESSAGE),
+            NumberRange(max=AMOUNT_MAX, message=AMOUNT_MAX_MESSAGE)
         ]
     )
 
     date = DateField(
         'Expense Date',
-        format='%Y-%m-%d',
+        format=DATE_FORMAT,
         default=date.today,
-        validators=[DataRequired(message='This field is required')]
+        validators=[DataRequired(message=REQUIRED_MESSAGE)]
     )
 
     category_id = SelectField(
         'Category',
         coerce=int,
-        validators=[DataRequired(message='Select a category')]
+        validators=[DataRequired(message=CATEGORY_MESSAGE)]
     )
 
     def __init__(self, *args, **kwargs):
@@ -62,6 +87,16 @@ class ExpenseForm(FlaskForm):
 
 class SearchForm(FlaskForm):
     search = StringField(
-        'Search by title',
+        'Search title and description',
         validators=[Optional()]
     )
+
+
+class ImportForm(FlaskForm):
+    file = FileField(
+        'CSV file',
+        validators=[
+            FileRequired(message='Choose a file to import'),
+            FileAllowed(['csv'], message='Only .csv files can be imported')
+        ]
+    )
@@ -0,0 +1,191 @@
+"""Bulk CSV import of expenses.
+
+The file is parsed row by row and valid rows are inserted in chunks
+with a single executemany ``INSERT`` and one commit per chunk, so a
+failing row never aborts the rows around it. Rows are validated with
+the same rules as :class:`~app.expenses.forms.ExpenseForm`.
+
+Expected columns: ``title``, ``description``, ``amount``, ``date``
+(``YYYY-MM-DD``) and ``category`` (an existing category name).
+"""
+import csv
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from decimal import Decimal, InvalidOperation
+from functools import lru_cache
+from typing import List, Tuple
+
+from sqlalchemy import insert, select
+
+from app import db
+from . import daily, rollup
+from .cache import expenses_changed
+from .forms import (
+    AMOUNT_MAX,
+    AMOUNT_MAX_MESSAGE,
+    AMOUNT_MESSAGE,
+    AMOUNT_MIN,
+    CATEGORY_MESSAGE,
+    DATE_FORMAT,
+    DESCRIPTION_LENGTH_MESSAGE,
+    DESCRIPTION_MAX_LENGTH,
+    REQUIRED_MESSAGE,
+    TITLE_LENGTH_MESSAGE,
+    TITLE_MAX_LENGTH,
+    TITLE_MIN_LENGTH,
+)
+from .models import Expense, ExpenseCategory, to_decimal
+from .search import deferred_index_sync
+
+IMPORT_CHUNK_SIZE = 5000
+
+REQUIRED_COLUMNS = ('title', 'amount', 'date', 'category')
+
+
+@dataclass
+class ImportReport:
+    inserted: int = 0
+    errors: List[Tuple[int, str]] = field(default_factory=list)
+
+
+@lru_cache(maxsize=4096)
+def _parse_date(value):
+    return datetime.strptime(value, DATE_FORMAT)
+
+
+def _validate(row, categories):
+    """Return ``(values, errors)`` for one CSV row."""
+    errors = []
+
+    title = (row.get('title') or '').strip()
+    if not title:
+        errors.append(f'title: {REQUIRED_MESSAGE}')
+    elif not TITLE_MIN_LENGTH <= len(title) <= TITLE_MAX_LENGTH:
+        errors.append(f'title: {TITLE_LENGTH_MESSAGE}')
+
+    description = (row.get('description') or '').strip() or None
+    if description and len(description) > DESCRIPTION_MAX_LENGTH:
+        errors.append(f'description: {DESCRIPTION_LENGTH_MESSAGE}')
+
+    amount = None
+    raw_amount = (row.get('amount') or '').strip()
+    if not raw_amount:
+        errors.append(f'amount: {REQUIRED_MESSAGE}')
+    else:
+        try:
+            amount = to_decimal(Decimal(raw_amount))
+        except InvalidOperation:
+            errors.append('amount: Not a valid decimal value.')
+        else:
+            if not amount >= AMOUNT_MIN:
+                errors.append(f'amount: {AMOUNT_MESSAGE}')
+            elif amount > AMOUNT_MAX:
+                errors.append(f'amount: {AMOUNT_MAX_MESSAGE}')
+
+    expense_date = None
+    raw_date = (row.get('date') or '').strip()
+    if not raw_date:
+        errors.append(f'date: {REQUIRED_MESSAGE}')
+    else:
+        try:
+            expense_date = _parse_date(raw_date)
+        except ValueError:
+            errors.append('date: Not a valid date value.')
+
+    category_name = (row.get('category') or '').strip()
+    category_id = categories.get(category_name.casefold())
+    if category_id is None:
+        errors.append(f'category: {CATEGORY_MESSAGE}')
+
+    if errors:
+        return None, errors
+    return {
+        'title': title,
+        'description': description,
+        'amount': amount,
+        'date': expense_date,
+        'category_id': category_id,
+    }, errors
+
+
+def _flush(chunk, owner_id):
+    now = datetime.now(timezone.utc)
+    for values in chunk:
+        values['owner_id'] = owner_id
+        values['created_at'] = now
+        values['updated_at'] = now
+
+    buckets = defaultdict(lambda: [0, Decimal('0.00'), None, None])
+    days = defaultdict(lambda: [0, Decimal('0.00')])
+    for values in chunk:
+        bucket = buckets[(
+            owner_id,
+            values['category_id'],
+            rollup.month_of(values['date']),
+        )]
+        amount = values['amount']
+        bucket[0] += 1
+        bucket[1] += amount
+        bucket[2] = amount if bucket[2] is None else min(bucket[2], amount)
+        bucket[3] = amount if bucket[3] is None else max(bucket[3], amount)
+        day = days[daily.bucket_of(
+            owner_id,
+            values['category_id'],
+            values['date']
+        )]
+        day[0] += 1
+        day[1] += amount
+
+    connection = db.session.connection()
+    with deferred_index_sync(connection):
+        connection.execute(insert(Expense.__table__), chunk)
+    rollup.add_amounts(
+        connection,
+        {key: tuple(value) for key, value in buckets.items()}
+    )
+    daily.add_amounts(
+        connection,
+        {key: tuple(value) for key, value in days.items()}
+    )
+    expenses_changed(db.session, [owner_id])
+    db.session.commit()
+
+
+def import_expenses(stream, owner_id, chunk_size=IMPORT_CHUNK_SIZE):
+    """Import expenses owned by user ``owner_id`` from a CSV text stream."""
+    report = ImportReport()
+    categories = {
+        name.casefold(): id
+        for id, name in db.session.execute(
+            select(ExpenseCategory.id, ExpenseCategory.name)
+        )
+    }
+
+    reader = csv.DictReader(stream)
+    missing = [
+        column for column in REQUIRED_COLUMNS
+        if column not in (reader.fieldnames or ())
+    ]
+    if missing:
+        report.errors.append((1, f"missing column(s): {', '.join(missing)}"))
+        return report
+
+    chunk = []
+    for row in reader:
+        values, errors = _validate(row, categories)
+        if errors:
+            report.errors.append((reader.line_num, '; '.join(errors)))
+            continue
+
+        chunk.append(values)
+        if len(chunk) >= chunk_size:
+            _flush(chunk, owner_id)
+            report.inserted += len(chunk)
+            chunk = []
+
+    if chunk:
+        _flush(chunk, owner_id)
+        report.inserted += len(chunk)
+
+    return report
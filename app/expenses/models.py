@@ -1,10 +1,55 @@
-from datetime import datetime, timezone
-from typing import List, Optional
+from datetime import date, datetime, timezone
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+from typing import TYPE_CHECKING, List, Optional
 
-from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy.orm import Mapped, mapped_column, relationship, validates
+from sqlalchemy.types import BigInteger, TypeDecorator
 
 from app import db
 
+if TYPE_CHECKING:
+    from app.users.models import User
+
+CENT = Decimal('0.01')
+# Largest amount accepted anywhere. In cents it fits a BIGINT with room
+# to add up millions of such amounts in the rollups.
+AMOUNT_MAX = Decimal('9999999999.99')
+
+
+def to_decimal(value):
+    """Round a number to whole cents; floats go through their shortest
+    repr, so 0.1 becomes Decimal('0.10') rather than its binary value."""
+    if not isinstance(value, Decimal):
+        value = Decimal(str(value))
+    if not value.is_finite():
+        raise InvalidOperation(f'{value} is not an amount')
+    return value.quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+class Money(TypeDecorator):
+    """Exact amount stored as an integer number of cents.
+
+    Python sees ``Decimal`` values with two places. ``SUM``, ``MIN`` and
+    ``MAX`` of a ``Money`` column add integers in the database and come
+    back as ``Decimal`` too, so totals never drift.
+    """
+
+    impl = BigInteger
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        value = to_decimal(value)
+        if abs(value) > AMOUNT_MAX:
+            raise ValueError(f'{value} is out of range')
+        return int(value * 100)
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return Decimal(int(value)).scaleb(-2)
+
 
 class ExpenseCategory(db.Model):
     __tablename__ = 'expense_categories'
@@ -30,11 +75,20 @@ class ExpenseCategory(db.Model):
 
 class Expense(db.Model):
     __tablename__ = 'expenses'
+    __table_args__ = (
+        db.Index('ix_expenses_owner_date', 'owner_id', 'date', 'id'),
+        db.Index('ix_expenses_owner_amount', 'owner_id', 'amount', 'id'),
+        db.Index('ix_expenses_owner_title', 'owner_id', 'title', 'id'),
+        db.Index('ix_expenses_date', 'date', 'id'),
+        db.Index('ix_expenses_amount', 'amount', 'id'),
+        db.Index('ix_expenses_title', 'title', 'id'),
+        db.Index('ix_expenses_category_amount', 'category_id', 'amount'),
+    )
 
     id: Mapped[int] = mapped_column(db.Integer, primary_key=True)
     title: Mapped[str] = mapped_column(db.String(200), nullable=False)
     description: Mapped[Optional[str]] = mapped_column(db.Text)
-    amount: Mapped[float] = mapped_column(db.Float, nullable=False)
+    amount: Mapped[Decimal] = mapped_column(Money, nullable=False)
     date: Mapped[datetime] = mapped_column(
         db.DateTime,
         default=lambda: datetime.now(timezone.utc),
@@ -56,7 +110,72 @@ class Expense(db.Model):
         nullable=False,
     )
 
-    owner_username: Mapped[str] = mapped_column(db.String(100), nullable=False)
+    owner_id: Mapped[int] = mapped_column(
+        db.Integer,
+        db.ForeignKey('users.id'),
+        nullable=False,
+    )
+    owner: Mapped["User"] = relationship("User", lazy=True)
+
+    @validates('amount')
+    def _round_amount(self, key, value):
+        return None if value is None else to_decimal(value)
 
     def __repr__(self):
         return f'<Expense {self.title}>'
+
+
+class UserCategoryTotal(db.Model):
+    __tablename__ = 'user_category_totals'
+    __table_args__ = (
+        db.Index('ix_user_category_totals_category', 'category_id'),
+    )
+
+    owner_id: Mapped[int] = mapped_column(
+        db.Integer,
+        db.ForeignKey('users.id'),
+        primary_key=True,
+    )
+    category_id: Mapped[int] = mapped_column(
+        db.Integer,
+        db.ForeignKey('expense_categories.id'),
+        primary_key=True,
+    )
+    month: Mapped[date] = mapped_column(db.Date, primary_key=True)
+    count: Mapped[int] = mapped_column(db.Integer, nullable=False)
+    total: Mapped[Decimal] = mapped_column(Money, nullable=False)
+    min_amount: Mapped[Decimal] = mapped_column(Money, nullable=False)
+    max_amount: Mapped[Decimal] = mapped_column(Money, nullable=False)
+
+    def __repr__(self):
+        return (
+            f'<UserCategoryTotal {self.owner_id} '
+            f'{self.category_id} {self.month:%Y-%m}>'
+        )
+
+
+class UserDailyTotal(db.Model):
+    __tablename__ = 'user_daily_totals'
+    __table_args__ = (
+        db.Index('ix_user_daily_totals_category', 'category_id'),
+    )
+
+    owner_id: Mapped[int] = mapped_column(
+        db.Integer,
+        db.ForeignKey('users.id'),
+        primary_key=True,
+    )
+    day: Mapped[date] = mapped_column(db.Date, primary_key=True)
+    category_id: Mapped[int] = mapped_column(
+        db.Integer,
+        db.ForeignKey('expense_categories.id'),
+        primary_key=True,
+    )
+    count: Mapped[int] = mapped_column(db.Integer, nullable=False)
+    total: Mapped[Decimal] = mapped_column(Money, nullable=False)
+
+    def __repr__(self):
+        return (
+            f'<UserDailyTotal {self.owner_id} '
+            f'{self.category_id} {self.day:%Y-%m-%d}>'
+        )
@@ -0,0 +1,158 @@
+import base64
+import binascii
+import json
+from dataclasses import dataclass
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from typing import List, Optional
+
+from sqlalchemy import tuple_
+
+from app import db
+from .models import AMOUNT_MAX, Expense, to_decimal
+
+SORT_COLUMNS = {
+    'date': Expense.date,
+    'amount': Expense.amount,
+    'title': Expense.title,
+}
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+@dataclass
+class Page:
+    items: List[Expense]
+    next_cursor: Optional[str] = None
+    prev_cursor: Optional[str] = None
+
+
+def _dump_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def _load_value(sort_by, value):
+    if sort_by == 'date':
+        return datetime.fromisoformat(value)
+    if sort_by == 'amount':
+        amount = to_decimal(Decimal(value))
+        if abs(amount) > AMOUNT_MAX:
+            raise ValueError(f'{amount} is out of range')
+        return amount
+    if sort_by == 'relevance':
+        return float(value)
+    return str(value)
+
+
+def encode_cursor(sort_by, value, id, direction):
+    payload = {
+        's': sort_by,
+        'v': _dump_value(value),
+        'i': id,
+        'd': direction,
+    }
+    raw = json.dumps(payload, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token, sort_by):
+    """Return ``(value, id, direction)`` stored in an opaque cursor token."""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded))
+        if payload['s'] != sort_by or payload['d'] not in ('next', 'prev'):
+            raise InvalidCursor(token)
+        return (
+            _load_value(sort_by, payload['v']),
+            int(payload['i']),
+            payload['d'],
+        )
+    except (
+        binascii.Error,
+        InvalidOperation,
+        KeyError,
+        TypeError,
+        ValueError
+    ) as exc:
+        raise InvalidCursor(token) from exc
+
+
+def normalize_sort(sort_by, order, ranked=False):
+    if sort_by not in SORT_COLUMNS and not (ranked and sort_by == 'relevance'):
+        sort_by = 'date'
+    if order not in ('asc', 'desc'):
+        order = 'desc'
+    return sort_by, order
+
+
+def sort_column(sort_by, rank=None):
+    return rank if sort_by == 'relevance' else SORT_COLUMNS[sort_by]
+
+
+def order_by_clauses(sort_by, order, rank=None):
+    column = sort_column(sort_by, rank)
+    if order == 'desc':
+        return column.desc(), Expense.id.desc()
+    return column.asc(), Expense.id.asc()
+
+
+def paginate(stmt, sort_by, order, cursor=None, per_page=20, rank=None):
+    """Fetch one page of ``stmt`` using keyset pagination.
+
+    Rows are ordered by the sort column with ``Expense.id`` as the
+    tie-breaker, and the cursor holds the key of the boundary row, so
+    every page costs one index range scan regardless of its depth.
+    Sorting by ``'relevance'`` orders by the search ``rank`` expression.
+    """
+    column = sort_column(sort_by, rank)
+    if sort_by == 'relevance':
+        stmt = stmt.add_columns(rank)
+    key = tuple_(column, Expense.id)
+    descending = order == 'desc'
+
+    direction = 'next'
+    if cursor:
+        value, last_id, direction = decode_cursor(cursor, sort_by)
+        boundary = (value, last_id)
+        forward = direction == 'next'
+        if forward == descending:
+            stmt = stmt.where(key < boundary)
+        else:
+            stmt = stmt.where(key > boundary)
+
+    backwards = direction == 'prev'
+    stmt = stmt.order_by(*order_by_clauses(
+        sort_by,
+        'desc' if descending != backwards else 'asc',
+        rank
+    ))
+
+    rows = db.session.execute(stmt.limit(per_page + 1)).all()
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if backwards:
+        rows.reverse()
+
+    def cursor_for(row, direction):
+        expense = row[0]
+        value = row[1] if sort_by == 'relevance' else getattr(expense, sort_by)
+        return encode_cursor(sort_by, value, expense.id, direction)
+
+    page = Page(items=[row[0] for row in rows])
+    if backwards:
+        if rows:
+            page.next_cursor = cursor_for(rows[-1], 'next')
+            if has_more:
+                page.prev_cursor = cursor_for(rows[0], 'prev')
+    elif rows:
+        if has_more:
+            page.next_cursor = cursor_for(rows[-1], 'next')
+        if cursor:
+            page.prev_cursor = cursor_for(rows[0], 'prev')
+    return page
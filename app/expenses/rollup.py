@@ -0,0 +1,293 @@
+"""Incremental maintenance of the ``user_category_totals`` rollup.
+
+Every ORM insert, update and delete of an ``Expense`` adjusts the
+matching (owner, category, month) bucket in the same transaction.
+Statements that bypass the ORM unit of work (Core ``insert()``, bulk
+``update()``/``delete()``) must call :func:`add_amounts` or
+:func:`refresh_buckets` themselves, or the table drifts until the next
+``flask expenses rebuild-totals``.
+"""
+from datetime import date, datetime
+
+from sqlalchemy import case, delete, event, func, inspect, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import FunctionElement
+from sqlalchemy.types import Date
+
+from .models import Expense, UserCategoryTotal
+
+totals = UserCategoryTotal.__table__
+expenses = Expense.__table__
+
+KEY_ATTRS = ('owner_id', 'category_id', 'date')
+
+
+class month_start(FunctionElement):
+    """First day of the month of a datetime expression, as a DATE."""
+
+    type = Date()
+    name = 'month_start'
+    inherit_cache = True
+
+
+@compiles(month_start)
+def _month_start_default(element, compiler, **kw):
+    return "CAST(date_trunc('month', %s) AS DATE)" % compiler.process(
+        element.clauses, **kw
+    )
+
+
+@compiles(month_start, 'sqlite')
+def _month_start_sqlite(element, compiler, **kw):
+    return "date(%s, 'start of month')" % compiler.process(
+        element.clauses, **kw
+    )
+
+
+def month_of(value):
+    return date(value.year, value.month, 1)
+
+
+def next_month(month):
+    if month.month == 12:
+        return date(month.year + 1, 1, 1)
+    return date(month.year, month.month + 1, 1)
+
+
+def bucket_of(expense):
+    return (
+        expense.owner_id,
+        expense.category_id,
+        month_of(expense.date),
+    )
+
+
+def _bucket_where(bucket):
+    owner_id, category_id, month = bucket
+    return (
+        totals.c.owner_id == owner_id,
+        totals.c.category_id == category_id,
+        totals.c.month == month,
+    )
+
+
+def add_amounts(connection, rows):
+    """Merge ``{bucket: (count, total, min, max)}`` into the rollup."""
+    dialect = connection.dialect.name
+    for bucket, (count, total, low, high) in rows.items():
+        owner_id, category_id, month = bucket
+        values = dict(
+            owner_id=owner_id,
+            category_id=category_id,
+            month=month,
+            count=count,
+            total=total,
+            min_amount=low,
+            max_amount=high,
+        )
+
+        if dialect in ('sqlite', 'postgresql'):
+            insert = (sqlite if dialect == 'sqlite' else postgresql).insert
+            stmt = insert(totals).values(**values)
+            excluded = stmt.excluded
+            connection.execute(stmt.on_conflict_do_update(
+                index_elements=[
+                    totals.c.owner_id,
+                    totals.c.category_id,
+                    totals.c.month,
+                ],
+                set_={
+                    'count': totals.c.count + excluded.count,
+                    'total': totals.c.total + excluded.total,
+                    'min_amount': case(
+                        (excluded.min_amount < totals.c.min_amount,
+                         excluded.min_amount),
+                        else_=totals.c.min_amount
+                    ),
+                    'max_amount': case(
+                        (excluded.max_amount > totals.c.max_amount,
+                         excluded.max_amount),
+                        else_=totals.c.max_amount
+                    ),
+                }
+            ))
+            continue
+
+        result = connection.execute(
+            update(totals)
+            .where(*_bucket_where(bucket))
+            .values(
+                count=totals.c.count + count,
+                total=totals.c.total + total,
+                min_amount=case(
+                    (totals.c.min_amount > low, low),
+                    else_=totals.c.min_amount
+                ),
+                max_amount=case(
+                    (totals.c.max_amount < high, high),
+                    else_=totals.c.max_amount
+                ),
+            )
+        )
+        if result.rowcount == 0:
+            connection.execute(totals.insert().values(**values))
+
+
+def refresh_buckets(connection, buckets):
+    """Recompute the given buckets from the ``expenses`` table."""
+    for bucket in set(buckets):
+        owner_id, category_id, month = bucket
+        start = datetime.combine(month, datetime.min.time())
+        end = datetime.combine(next_month(month), datetime.min.time())
+        count, total, low, high = connection.execute(
+            select(
+                func.count(expenses.c.id),
+                func.sum(expenses.c.amount),
+                func.min(expenses.c.amount),
+                func.max(expenses.c.amount),
+            ).where(
+                expenses.c.owner_id == owner_id,
+                expenses.c.category_id == category_id,
+                expenses.c.date >= start,
+                expenses.c.date < end,
+            )
+        ).one()
+
+        connection.execute(delete(totals).where(*_bucket_where(bucket)))
+        if count:
+            connection.execute(totals.insert().values(
+                owner_id=owner_id,
+                category_id=category_id,
+                month=month,
+                count=count,
+                total=total,
+                min_amount=low,
+                max_amount=high,
+            ))
+
+
+def _remove_amount(connection, bucket, amount):
+    """Take one expense out of a bucket.
+
+    Count and total are decremented in place; when the removed amount
+    was the bucket's minimum or maximum the bucket is recomputed, since
+    the new extreme cannot be derived from the rollup alone.
+    """
+    row = connection.execute(
+        select(totals.c.count, totals.c.min_amount, totals.c.max_amount)
+        .where(*_bucket_where(bucket))
+    ).first()
+    if row is None:
+        refresh_buckets(connection, [bucket])
+        return
+
+    count, low, high = row
+    if count <= 1 or amount <= low or amount >= high:
+        refresh_buckets(connection, [bucket])
+        return
+
+    connection.execute(
+        update(totals)
+        .where(*_bucket_where(bucket))
+        .values(count=totals.c.count - 1, total=totals.c.total - amount)
+    )
+
+
+def _previous(state, key):
+    history = state.attrs[key].history
+    if history.deleted:
+        return history.deleted[0]
+    return getattr(state.object, key)
+
+
+@event.listens_for(Expense, 'after_insert')
+def _expense_inserted(mapper, connection, target):
+    amount = target.amount
+    add_amounts(connection, {bucket_of(target): (1, amount, amount, amount)})
+
+
+@event.listens_for(Expense, 'after_update')
+def _expense_updated(mapper, connection, target):
+    state = inspect(target)
+    if not any(
+        state.attrs[key].history.has_changes()
+        for key in KEY_ATTRS + ('amount',)
+    ):
+        return
+
+    old_bucket = (
+        _previous(state, 'owner_id'),
+        _previous(state, 'category_id'),
+        month_of(_previous(state, 'date')),
+    )
+    new_bucket = bucket_of(target)
+    amount = target.amount
+
+    if old_bucket == new_bucket:
+        refresh_buckets(connection, [new_bucket])
+        return
+
+    _remove_amount(connection, old_bucket, _previous(state, 'amount'))
+    add_amounts(connection, {new_bucket: (1, amount, amount, amount)})
+
+
+@event.listens_for(Expense, 'after_delete')
+def _expense_deleted(mapper, connection, target):
+    _remove_amount(connection, bucket_of(target), target.amount)
+
+
+def rollup_query():
+    """Aggregate ``expenses`` into rollup rows from scratch."""
+    month = month_start(expenses.c.date)
+    return select(
+        expenses.c.owner_id,
+        expenses.c.category_id,
+        month.label('month'),
+        func.count(expenses.c.id).label('count'),
+        func.sum(expenses.c.amount).label('total'),
+        func.min(expenses.c.amount).label('min_amount'),
+        func.max(expenses.c.amount).label('max_amount'),
+    ).group_by(expenses.c.owner_id, expenses.c.category_id, month)
+
+
+def rebuild(connection):
+    connection.execute(delete(totals))
+    connection.execute(
+        totals.insert().from_select(
+            [
+                'owner_id',
+                'category_id',
+                'month',
+                'count',
+                'total',
+                'min_amount',
+                'max_amount',
+            ],
+            rollup_query()
+        )
+    )
+
+
+def find_drift(connection):
+    """Return ``(bucket, expected, stored)`` for every mismatching bucket.
+
+    Amounts are whole cents, so buckets must match exactly.
+    """
+    def as_dict(rows):
+        return {
+            (row.owner_id, row.category_id, row.month): (
+                row.count, row.total, row.min_amount, row.max_amount
+            )
+            for row in rows
+        }
+
+    expected = as_dict(connection.execute(rollup_query()))
+    stored = as_dict(connection.execute(select(totals)))
+
+    drift = []
+    for bucket in sorted(expected.keys() | stored.keys(), key=str):
+        want, have = expected.get(bucket), stored.get(bucket)
+        if want != have:
+            drift.append((bucket, want, have))
+    return drift
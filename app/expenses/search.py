@@ -0,0 +1,188 @@
+import re
+from contextlib import contextmanager
+
+from flask import current_app
+from sqlalchemy import (
+    DDL,
+    column,
+    event,
+    false,
+    func,
+    literal_column,
+    or_,
+    select,
+    table,
+    text
+)
+
+from app import db
+from .models import Expense
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+FTS_TABLE = 'expenses_fts'
+
+SQLITE_FTS_DDL = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    "title, description, content='expenses', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+    f"CREATE TABLE IF NOT EXISTS {FTS_TABLE}_deferred "
+    "(id INTEGER PRIMARY KEY)",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON expenses "
+    f"WHEN NOT EXISTS (SELECT 1 FROM {FTS_TABLE}_deferred) "
+    f"BEGIN INSERT INTO {FTS_TABLE}(rowid, title, description) "
+    "VALUES (new.id, new.title, new.description); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON expenses "
+    f"BEGIN INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description) "
+    "VALUES ('delete', old.id, old.title, old.description); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au "
+    "AFTER UPDATE OF title, description ON expenses "
+    f"BEGIN INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description) "
+    "VALUES ('delete', old.id, old.title, old.description); "
+    f"INSERT INTO {FTS_TABLE}(rowid, title, description) "
+    "VALUES (new.id, new.title, new.description); END",
+]
+
+POSTGRES_FTS_DDL = [
+    "CREATE INDEX IF NOT EXISTS ix_expenses_search ON expenses USING gin "
+    "(to_tsvector('simple', title || ' ' || coalesce(description, '')))",
+]
+
+for statement in SQLITE_FTS_DDL:
+    event.listen(
+        Expense.__table__,
+        'after_create',
+        DDL(statement).execute_if(dialect='sqlite')
+    )
+for statement in POSTGRES_FTS_DDL:
+    event.listen(
+        Expense.__table__,
+        'after_create',
+        DDL(statement).execute_if(dialect='postgresql')
+    )
+for name in (FTS_TABLE, f'{FTS_TABLE}_deferred'):
+    event.listen(
+        Expense.__table__,
+        'before_drop',
+        DDL(f'DROP TABLE IF EXISTS {name}').execute_if(dialect='sqlite')
+    )
+
+
+@contextmanager
+def deferred_index_sync(connection):
+    """Index rows inserted inside the block with one set-based statement.
+
+    On SQLite the per-row insert trigger is suspended for the current
+    transaction and the new rows are copied into the FTS5 table at the
+    end, which is several times faster for bulk inserts. Other
+    backends index rows on their own, so the block runs unchanged.
+    """
+    if connection.dialect.name != 'sqlite':
+        yield
+        return
+
+    last_id = connection.execute(select(func.max(Expense.id))).scalar() or 0
+    connection.execute(
+        text(f'INSERT INTO {FTS_TABLE}_deferred (id) VALUES (1)')
+    )
+    yield
+    connection.execute(text(f'DELETE FROM {FTS_TABLE}_deferred'))
+    connection.execute(
+        text(
+            f'INSERT INTO {FTS_TABLE}(rowid, title, description) '
+            'SELECT id, title, description FROM expenses WHERE id > :last_id'
+        ),
+        {'last_id': last_id}
+    )
+
+
+def tokenize(query):
+    return TOKEN_RE.findall(query.lower())
+
+
+class LikeSearch:
+    """Substring match on title and description, without ranking."""
+
+    def apply(self, stmt, query):
+        if not query:
+            return stmt, None
+        return stmt.where(or_(
+            Expense.title.icontains(query, autoescape=True),
+            Expense.description.icontains(query, autoescape=True)
+        )), None
+
+
+class SQLiteFullTextSearch:
+    """FTS5 index kept in sync with ``expenses`` by triggers.
+
+    Every token is matched as a prefix, so ``groc`` finds "Groceries".
+    The rank is the negated FTS5 bm25 score, so higher is more relevant.
+    """
+
+    fts = table(FTS_TABLE, column('rowid'), column('rank'), column(FTS_TABLE))
+
+    def apply(self, stmt, query):
+        tokens = tokenize(query)
+        if not tokens:
+            return stmt.where(false()), None
+        match = ' '.join(f'"{token}"*' for token in tokens)
+        hits = (
+            select(
+                self.fts.c.rowid.label('id'),
+                self.fts.c.rank.label('rank')
+            )
+            .where(self.fts.c[FTS_TABLE].op('MATCH')(match))
+            .subquery('hits')
+        )
+        return stmt.join(hits, hits.c.id == Expense.id), -hits.c.rank
+
+
+class PostgresFullTextSearch:
+    """``tsvector`` search served by the ``ix_expenses_search`` GIN index.
+
+    The document expression must stay identical to the indexed one.
+    The rank is ``ts_rank``, so higher is more relevant.
+    """
+
+    config = literal_column("'simple'")
+
+    def document(self):
+        return func.to_tsvector(
+            self.config,
+            Expense.title
+            + literal_column("' '")
+            + func.coalesce(Expense.description, literal_column("''"))
+        )
+
+    def apply(self, stmt, query):
+        tokens = tokenize(query)
+        if not tokens:
+            return stmt.where(false()), None
+        tsquery = func.to_tsquery(
+            self.config,
+            ' & '.join(f'{token}:*' for token in tokens)
+        )
+        document = self.document()
+        return (
+            stmt.where(document.op('@@')(tsquery)),
+            func.ts_rank(document, tsquery)
+        )
+
+
+BACKENDS = {
+    'like': LikeSearch(),
+    'sqlite': SQLiteFullTextSearch(),
+    'postgresql': PostgresFullTextSearch(),
+}
+
+
+def get_search_backend():
+    """Pick the search backend for the configured database.
+
+    ``EXPENSES_SEARCH_BACKEND`` may force ``'like'``; by default the
+    full-text backend matching the engine dialect is used.
+    """
+    name = current_app.config.get('EXPENSES_SEARCH_BACKEND', 'auto')
+    if name == 'auto':
+        name = db.engine.dialect.name
+    return BACKENDS.get(name, BACKENDS['like'])
@@ -0,0 +1,310 @@
+"""Synthetic users, categories and expenses for local performance work.
+
+Rows are generated in memory and written with Core executemany
+``INSERT`` statements, one transaction per batch, so millions of
+expenses load in seconds instead of the hours the ORM would take. The
+distributions follow real spending loosely: a few users account for
+most expenses, each category has its own typical amount and titles,
+amounts are log-normal, weekends and lunch or evening hours are busier.
+"""
+import itertools
+import math
+import operator
+import random
+from dataclasses import dataclass
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from typing import Tuple
+
+from sqlalchemy import func, insert, select
+
+from app.users.models import User
+from . import daily, rollup
+from .models import Expense, ExpenseCategory
+from .search import deferred_index_sync
+
+SEED_BATCH_SIZE = 50_000
+
+# Rows generated per call to random.choices.
+_CHUNK_SIZE = 10_000
+
+
+@dataclass(frozen=True)
+class CategoryProfile:
+    name: str
+    share: float
+    median_amount: float
+    spread: float
+    titles: Tuple[str, ...]
+
+
+PROFILES = (
+    CategoryProfile('Groceries', 28, 35, 0.6, (
+        'Supermarket', 'Groceries', 'Bakery', 'Farmers market', 'Butcher',
+        'Corner shop',
+    )),
+    CategoryProfile('Dining', 18, 18, 0.7, (
+        'Coffee', 'Lunch', 'Dinner', 'Pizza', 'Sushi', 'Takeaway',
+    )),
+    CategoryProfile('Transport', 14, 12, 0.8, (
+        'Bus ticket', 'Metro pass', 'Taxi', 'Fuel', 'Parking',
+        'Train ticket',
+    )),
+    CategoryProfile('Shopping', 10, 45, 1.0, (
+        'Clothes', 'Shoes', 'Electronics', 'Household goods', 'Books',
+    )),
+    CategoryProfile('Entertainment', 8, 25, 0.7, (
+        'Cinema', 'Concert', 'Streaming', 'Games', 'Museum',
+    )),
+    CategoryProfile('Health', 6, 30, 0.9, (
+        'Pharmacy', 'Dentist', 'Gym membership', 'Doctor',
+    )),
+    CategoryProfile('Utilities', 6, 80, 0.5, (
+        'Electricity', 'Water', 'Internet', 'Mobile phone', 'Heating',
+    )),
+    CategoryProfile('Gifts', 4, 40, 0.8, (
+        'Birthday gift', 'Flowers', 'Donation',
+    )),
+    CategoryProfile('Travel', 4, 150, 1.0, (
+        'Hotel', 'Flight', 'Car rental', 'Souvenirs',
+    )),
+    CategoryProfile('Rent', 2, 900, 0.3, ('Rent',)),
+)
+
+NOTES = (
+    'Paid by card', 'Split with friends', 'Receipt in email', 'Discounted',
+    'Paid in cash', 'Monthly', 'Refund expected',
+)
+NOTE_SHARE = 0.15
+
+WEEKEND_WEIGHT = 1.4
+# Relative number of expenses per hour of the day, from midnight.
+HOUR_WEIGHTS = (
+    1, 1, 0, 0, 0, 1, 2, 4, 6, 6, 6, 7,
+    10, 9, 6, 6, 7, 9, 10, 9, 7, 5, 3, 2,
+)
+
+
+@dataclass
+class SeedReport:
+    users: int = 0
+    categories: int = 0
+    expenses: int = 0
+
+
+def category_profile(number):
+    """Profile of the ``number``-th seeded category, counting from 0;
+    past the named profiles come generic "Category N" ones."""
+    if number < len(PROFILES):
+        return PROFILES[number]
+    return CategoryProfile(
+        f'Category {number + 1}', 2, 20, 1.0, ('Miscellaneous', 'Other')
+    )
+
+
+def _cumulative(weights):
+    return list(itertools.accumulate(weights))
+
+
+def generate_expenses(rng, owner_ids, categories, count, days, today):
+    """Yield ``count`` expense rows for ``owner_ids``, dated on the
+    ``days`` full days before ``today``.
+
+    ``categories`` is a list of ``(category_id, CategoryProfile)``.
+    ``created_at`` and ``updated_at`` are set to ``date`` on insert.
+    """
+    owner_weights = _cumulative(
+        rng.lognormvariate(0, 1.2) for _ in owner_ids
+    )
+    category_weights = _cumulative(
+        profile.share for _, profile in categories
+    )
+    first_day = today - timedelta(days=days)
+    dates = [
+        datetime.combine(first_day + timedelta(days=n), time())
+        for n in range(days)
+    ]
+    date_weights = _cumulative(
+        WEEKEND_WEIGHT if value.weekday() >= 5 else 1 for value in dates
+    )
+    hours = [timedelta(hours=hour) for hour in range(24)]
+    hour_weights = _cumulative(HOUR_WEIGHTS)
+    amounts = [
+        (math.log(profile.median_amount), profile.spread)
+        for _, profile in categories
+    ]
+    lognormal = rng.lognormvariate
+
+    for start in range(0, count, _CHUNK_SIZE):
+        size = min(_CHUNK_SIZE, count - start)
+        chunk = zip(
+            rng.choices(owner_ids, cum_weights=owner_weights, k=size),
+            rng.choices(
+                range(len(categories)),
+                cum_weights=category_weights,
+                k=size
+            ),
+            rng.choices(dates, cum_weights=date_weights, k=size),
+            rng.choices(hours, cum_weights=hour_weights, k=size),
+        )
+        for owner_id, number, day, hour in chunk:
+            category_id, profile = categories[number]
+            cents = max(1, round(lognormal(*amounts[number]) * 100))
+            yield {
+                'title': rng.choice(profile.titles),
+                'description': (
+                    rng.choice(NOTES) if rng.random() < NOTE_SHARE else None
+                ),
+                'amount': Decimal(cents).scaleb(-2),
+                'date': day + hour + timedelta(seconds=rng.random() * 3600),
+                'category_id': category_id,
+                'owner_id': owner_id,
+            }
+
+
+def _ensure_categories(connection, count):
+    """Return ``[(id, profile), ...]`` for the first ``count`` profiles,
+    reusing categories that already exist by name, and how many were
+    created."""
+    existing = {
+        name.casefold(): id
+        for id, name in connection.execute(
+            select(ExpenseCategory.id, ExpenseCategory.name)
+        )
+    }
+    profiles = [category_profile(number) for number in range(count)]
+    missing = [
+        profile for profile in profiles
+        if profile.name.casefold() not in existing
+    ]
+    if missing:
+        table = ExpenseCategory.__table__
+        rows = connection.execute(
+            insert(table).returning(table.c.id, table.c.name),
+            [{'name': profile.name} for profile in missing]
+        )
+        existing.update((name.casefold(), id) for id, name in rows)
+    return [
+        (existing[profile.name.casefold()], profile) for profile in profiles
+    ], len(missing)
+
+
+def _create_users(connection, count, username_prefix, password_hash):
+    table = User.__table__
+    first = (connection.execute(select(func.max(table.c.id))).scalar()
+             or 0) + 1
+    rows = connection.execute(
+        insert(table).returning(table.c.id),
+        [
+            {
+                'username': f'{username_prefix}{number}',
+                'password_hash': password_hash,
+            }
+            for number in range(first, first + count)
+        ]
+    )
+    return [id for id, in rows]
+
+
+def _insert_batch(engine, rows):
+    """Insert ``rows`` in one transaction.
+
+    The statement is compiled once and the rows go to the DB-API
+    ``executemany`` directly: converting each value with the column's
+    own bind processor is several times cheaper than Core's per-row
+    parameter handling, which otherwise costs more than the insert
+    itself. The timestamps reuse the converted ``date``.
+    """
+    table = Expense.__table__
+    with engine.begin() as connection:
+        dialect = connection.dialect
+        compiled = insert(table).compile(
+            dialect=dialect,
+            column_keys=[
+                'title', 'description', 'amount', 'date', 'created_at',
+                'updated_at', 'category_id', 'owner_id',
+            ]
+        )
+        to_amount = table.c.amount.type.bind_processor(dialect)
+        to_datetime = (
+            table.c.date.type.bind_processor(dialect) or (lambda value: value)
+        )
+        if compiled.positional:
+            ordered = operator.itemgetter(*compiled.positiontup)
+        else:
+            ordered = dict
+
+        params = []
+        for row in rows:
+            moment = to_datetime(row['date'])
+            params.append(ordered({
+                'title': row['title'],
+                'description': row['description'],
+                'amount': to_amount(row['amount']),
+                'date': moment,
+                'created_at': moment,
+                'updated_at': moment,
+                'category_id': row['category_id'],
+                'owner_id': row['owner_id'],
+            }))
+        with deferred_index_sync(connection):
+            connection.exec_driver_sql(compiled.string, params)
+
+
+def seed(engine, users, categories, expenses, password_hash, days=730,
+         batch_size=SEED_BATCH_SIZE, username_prefix='user',
+         random_seed=42, today=None):
+    """Create ``users`` users and ``expenses`` expenses spread over them
+    in the first ``categories`` categories of :data:`PROFILES`.
+
+    Every new user gets ``password_hash``. The expenses go to the new
+    users only, so existing data is left alone, but both rollups are
+    rebuilt from scratch at the end since the inserts bypass the ORM
+    events that maintain them. When the load more than doubles the
+    table, the ``expenses`` indexes are dropped first and rebuilt once
+    all rows are in.
+    """
+    rng = random.Random(random_seed)
+    today = today or datetime.now().date()
+    report = SeedReport()
+
+    with engine.begin() as connection:
+        category_rows, report.categories = _ensure_categories(
+            connection, categories
+        )
+        owner_ids = _create_users(
+            connection, users, username_prefix, password_hash
+        )
+        report.users = len(owner_ids)
+
+    table = Expense.__table__
+    with engine.connect() as connection:
+        existing = connection.execute(
+            select(func.count()).select_from(table)
+        ).scalar()
+    # Filling the indexes row by row costs several times more than
+    # building them once over the finished table.
+    rebuild_indexes = expenses > existing
+    if rebuild_indexes:
+        for index in table.indexes:
+            index.drop(engine)
+
+    rows = generate_expenses(
+        rng, owner_ids, category_rows, expenses, days, today
+    )
+    try:
+        while True:
+            batch = list(itertools.islice(rows, batch_size))
+            if not batch:
+                break
+            _insert_batch(engine, batch)
+            report.expenses += len(batch)
+    finally:
+        if rebuild_indexes:
+            for index in table.indexes:
+                index.create(engine)
+
+    with engine.begin() as connection:
+        rollup.rebuild(connection)
+        daily.rebuild(connection)
+    return report
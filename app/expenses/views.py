@@ -1,73 +1,180 @@
-from datetime import datetime, timezone
+import io
+from datetime import date, datetime, timezone
 
 from flask import (
+    Response,
+    current_app,
     request,
     redirect,
     url_for,
     render_template,
     flash,
-    abort
+    abort,
+    stream_with_context
 )
 from flask_login import login_required, current_user
 from sqlalchemy import select, func, literal_column
+from sqlalchemy.orm import joinedload
 
 from app import db
-from . import expenses_bp
-from .forms import ExpenseForm, SearchForm
-from .models import Expense, ExpenseCategory
-
+from app.cache import versions
+from app.conditional import conditional
+from app.routing import read_from_replica, sticks_to_primary
+from app.users.identity import USERS_VERSION_KEY
+from . import analytics, expenses_bp
+from .cache import (
+    CATEGORIES_VERSION_KEY,
+    EXPENSES_VERSION_KEY,
+    category_choices,
+    owner_version_key
+)
+from .export import csv_rows, export_statement, ndjson_rows
+from .forms import ExpenseForm, ImportForm, SearchForm
+from .importer import import_expenses
+from .models import Expense, ExpenseCategory, UserCategoryTotal
+from . import daily, rollup  # noqa: F401  register the rollup mapper events
+from .pagination import (
+    InvalidCursor,
+    normalize_sort,
+    order_by_clauses,
+    paginate
+)
+from .search import get_search_backend
+
+
+EXPORT_FORMATS = {
+    'csv': ('text/csv', csv_rows),
+    'ndjson': ('application/x-ndjson', ndjson_rows),
+}
+
+
+def _index_validators():
+    return (
+        'index',
+        versions.get(EXPENSES_VERSION_KEY),
+        versions.get(CATEGORIES_VERSION_KEY),
+        versions.get(USERS_VERSION_KEY),
+    ), None
+
+
+def _my_expenses_validators():
+    return (
+        'my_expenses',
+        versions.get(owner_version_key(current_user.id)),
+        versions.get(CATEGORIES_VERSION_KEY),
+        versions.get(USERS_VERSION_KEY),
+    ), None
+
+
+def _categories_validators():
+    return (
+        'categories',
+        versions.get(EXPENSES_VERSION_KEY),
+        versions.get(CATEGORIES_VERSION_KEY),
+    ), None
+
+
+def _analytics_validators():
+    return (
+        'analytics',
+        date.today().isoformat(),
+        versions.get(owner_version_key(current_user.id)),
+        versions.get(CATEGORIES_VERSION_KEY),
+    ), None
+
+
+def _detail_validators(id):
+    updated_at = db.session.execute(
+        select(Expense.updated_at).where(Expense.id == id)
+    ).scalar_one_or_none()
+    if updated_at is None:
+        return None
+    return (
+        'detail',
+        id,
+        updated_at.isoformat(),
+        versions.get(CATEGORIES_VERSION_KEY),
+        versions.get(USERS_VERSION_KEY),
+    ), updated_at
+
+
+def _filter_expenses(stmt):
+    search_query = request.args.get('search', '').strip()
 
-@expenses_bp.route('/')
-@login_required
-def index():
-    search_form = SearchForm()
+    rank = None
+    if search_query:
+        stmt, rank = get_search_backend().apply(stmt, search_query)
 
-    search_query = request.args.get('search', '').strip()
-    sort_by = request.args.get('sort_by', 'date')
-    order = request.args.get('order', 'desc')
+    sort_by, order = normalize_sort(
+        request.args.get('sort_by', 'date'),
+        request.args.get('order', 'desc'),
+        ranked=rank is not None
+    )
+    return stmt, rank, search_query, sort_by, order
 
-    stmt = select(Expense)
 
-    if search_query:
-        stmt = stmt.where(Expense.title.ilike(f'%{search_query}%'))
+def _list_expenses(stmt):
+    stmt, rank, search_query, sort_by, order = _filter_expenses(stmt)
+    cursor = request.args.get('cursor')
 
-    if sort_by == 'date':
-        stmt = stmt.order_by(
-            Expense.date.desc() if order == 'desc' else Expense.date.asc()
+    total_count, total_amount = db.session.execute(
+        stmt.with_only_columns(
+            func.count(Expense.id),
+            func.coalesce(func.sum(Expense.amount), literal_column("0"))
         )
-    elif sort_by == 'amount':
-        stmt = stmt.order_by(
-            Expense.amount.desc() if order == 'desc' else Expense.amount.asc()
-        )
-    elif sort_by == 'title':
-        stmt = stmt.order_by(
-            Expense.title.desc() if order == 'desc' else Expense.title.asc()
+    ).one()
+
+    try:
+        page = paginate(
+            stmt.options(
+                joinedload(Expense.category),
+                joinedload(Expense.owner)
+            ),
+            sort_by,
+            order,
+            cursor=cursor,
+            per_page=current_app.config['EXPENSES_PER_PAGE'],
+            rank=rank
         )
+    except InvalidCursor:
+        abort(400)
 
-    expenses = db.session.execute(stmt).scalars().all()
+    return dict(
+        expenses=page.items,
+        next_cursor=page.next_cursor,
+        prev_cursor=page.prev_cursor,
+        search_query=search_query,
+        sort_by=sort_by,
+        order=order,
+        total_count=total_count,
+        total_amount=total_amount
+    )
+
+
+@expenses_bp.route('/')
+@login_required
+@read_from_replica
+@conditional(_index_validators)
+def index():
+    search_form = SearchForm()
 
-    total_amount = sum(expense.amount for expense in expenses)
+    context = _list_expenses(select(Expense))
 
     return render_template(
         'expenses/index.html',
-        expenses=expenses,
         search_form=search_form,
-        search_query=search_query,
-        sort_by=sort_by,
-        order=order,
-        total_amount=total_amount
+        **context
     )
 
 
 @expenses_bp.route('/create', methods=['GET', 'POST'])
 @login_required
+@sticks_to_primary
 def create():
     form = ExpenseForm()
 
-    categories = db.session.execute(
-        select(ExpenseCategory).order_by(ExpenseCategory.name)
-    ).scalars().all()
-    form.category_id.choices = [(c.id, c.name) for c in categories]
+    categories = category_choices()
+    form.category_id.choices = categories
 
     if not categories:
         flash('Please create expense categories first', 'warning')
@@ -80,7 +187,7 @@ def create():
             amount=form.amount.data,
             date=datetime.combine(form.date.data, datetime.min.time()),
             category_id=form.category_id.data,
-            owner_username=current_user.username
+            owner_id=current_user.id
         )
 
         db.session.add(expense)
@@ -92,14 +199,43 @@ def create():
     return render_template('expenses/create.html', form=form)
 
 
+@expenses_bp.route('/import', methods=['GET', 'POST'])
+@login_required
+@sticks_to_primary
+def import_csv():
+    form = ImportForm()
+    report = None
+
+    if form.validate_on_submit():
+        stream = io.TextIOWrapper(form.file.data.stream, encoding='utf-8-sig')
+        report = import_expenses(stream, current_user.id)
+
+        if report.inserted:
+            flash(f'Imported {report.inserted} expense(s)', 'success')
+        if report.errors:
+            flash(f'{len(report.errors)} row(s) were skipped', 'warning')
+
+    return render_template(
+        'expenses/import.html',
+        form=form,
+        report=report
+    )
+
+
 @expenses_bp.route('/<int:id>')
 @login_required
+@read_from_replica
+@conditional(_detail_validators)
 def detail(id):
-    expense = db.session.get(Expense, id)
+    expense = db.session.get(
+        Expense,
+        id,
+        options=[joinedload(Expense.category), joinedload(Expense.owner)]
+    )
     if expense is None:
         abort(404)
 
-    is_owner = current_user.username == expense.owner_username
+    is_owner = current_user.id == expense.owner_id
 
     return render_template(
         'expenses/detail.html',
@@ -110,21 +246,18 @@ def detail(id):
 
 @expenses_bp.route('/<int:id>/edit', methods=['GET', 'POST'])
 @login_required
+@sticks_to_primary
 def edit(id):
     expense = db.session.get(Expense, id)
     if expense is None:
         abort(404)
 
-    if current_user.username != expense.owner_username:
+    if current_user.id != expense.owner_id:
         flash('You do not have permission to edit this expense', 'error')
         return redirect(url_for('expenses_bp.detail', id=id))
 
     form = ExpenseForm(obj=expense)
-
-    categories = db.session.execute(
-        select(ExpenseCategory).order_by(ExpenseCategory.name)
-    ).scalars().all()
-    form.category_id.choices = [(c.id, c.name) for c in categories]
+    form.category_id.choices = category_choices()
 
     if form.validate_on_submit():
         expense.title = form.title.data
@@ -147,12 +280,13 @@ def edit(id):
 
 @expenses_bp.route('/<int:id>/delete', methods=['POST'])
 @login_required
+@sticks_to_primary
 def delete(id):
     expense = db.session.get(Expense, id)
     if expense is None:
         abort(404)
 
-    if current_user.username != expense.owner_username:
+    if current_user.id != expense.owner_id:
         flash('You do not have permission to delete this expense', 'error')
         return redirect(url_for('expenses_bp.detail', id=id))
 
@@ -165,30 +299,37 @@ def delete(id):
 
 @expenses_bp.route('/categories')
 @login_required
+@read_from_replica
+@conditional(_categories_validators)
 def categories():
-    categories = db.session.execute(
-        select(ExpenseCategory).order_by(ExpenseCategory.name)
-    ).scalars().all()
-
-    categories_with_counts = []
-    for category in categories:
-        count = db.session.execute(
-            select(func.count()).select_from(Expense).where(
-                Expense.category_id == category.id
+    rows = db.session.execute(
+        select(
+            ExpenseCategory,
+            func.coalesce(
+                func.sum(UserCategoryTotal.count),
+                literal_column("0")
+            ),
+            func.coalesce(
+                func.sum(UserCategoryTotal.total),
+                literal_column("0")
             )
-        ).scalar() or 0
-        total = db.session.execute(
-            select(
-                func.coalesce(func.sum(Expense.amount), literal_column("0"))
-            ).select_from(Expense).where(Expense.category_id == category.id)
-        ).scalar() or 0
-        categories_with_counts.append(
-            {
-                'category': category,
-                'count': int(count),
-                'total': float(total)
-            }
         )
+        .outerjoin(
+            UserCategoryTotal,
+            UserCategoryTotal.category_id == ExpenseCategory.id
+        )
+        .group_by(ExpenseCategory.id)
+        .order_by(ExpenseCategory.name)
+    ).all()
+
+    categories_with_counts = [
+        {
+            'category': category,
+            'count': int(count),
+            'total': total
+        }
+        for category, count, total in rows
+    ]
 
     return render_template(
         'expenses/categories.html',
@@ -198,42 +339,59 @@ def categories():
 
 @expenses_bp.route('/my-expenses')
 @login_required
+@read_from_replica
+@conditional(_my_expenses_validators)
 def my_expenses():
-    search_query = request.args.get('search', '').strip()
-    sort_by = request.args.get('sort_by', 'date')
-    order = request.args.get('order', 'desc')
+    context = _list_expenses(
+        select(Expense).where(Expense.owner_id == current_user.id)
+    )
+
+    search_form = SearchForm()
 
-    stmt = select(Expense).where(
-        Expense.owner_username == current_user.username
+    return render_template(
+        'expenses/my_expenses.html',
+        search_form=search_form,
+        **context
     )
 
-    if search_query:
-        stmt = stmt.where(Expense.title.ilike(f'%{search_query}%'))
 
-    if sort_by == 'date':
-        stmt = stmt.order_by(
-            Expense.date.desc() if order == 'desc' else Expense.date.asc()
-        )
-    elif sort_by == 'amount':
-        stmt = stmt.order_by(
-            Expense.amount.desc() if order == 'desc' else Expense.amount.asc()
-        )
-    elif sort_by == 'title':
-        stmt = stmt.order_by(
-            Expense.title.desc() if order == 'desc' else Expense.title.asc()
+@expenses_bp.route('/analytics')
+@login_required
+@read_from_replica
+@conditional(_analytics_validators)
+def spending_analytics():
+    try:
+        series = analytics.spending_from_args(
+            current_user.id,
+            request.args,
+            date.today()
         )
+    except analytics.InvalidRange as exc:
+        abort(400, str(exc))
 
-    expenses = db.session.execute(stmt).scalars().all()
-    total_amount = sum(expense.amount for expense in expenses)
+    return render_template(
+        'expenses/analytics.html',
+        series=series,
+        granularities=analytics.GRANULARITIES
+    )
 
-    search_form = SearchForm()
 
-    return render_template(
-        'expenses/my_expenses.html',
-        expenses=expenses,
-        search_form=search_form,
-        search_query=search_query,
-        sort_by=sort_by,
-        order=order,
-        total_amount=total_amount
+@expenses_bp.route('/export.<any(csv, ndjson):fmt>')
+@login_required
+@read_from_replica
+def export(fmt):
+    stmt = select(Expense)
+    if request.args.get('scope') == 'mine':
+        stmt = stmt.where(Expense.owner_id == current_user.id)
+
+    stmt, rank, _, sort_by, order = _filter_expenses(stmt)
+    stmt = export_statement(stmt, order_by_clauses(sort_by, order, rank))
+    mimetype, serialize = EXPORT_FORMATS[fmt]
+
+    return Response(
+        stream_with_context(serialize(stmt)),
+        mimetype=mimetype,
+        headers={
+            'Content-Disposition': f'attachment; filename=expenses.{fmt}'
+        }
     )
@@ -0,0 +1,172 @@
+"""Per-request SQL statistics and slow-query logging.
+
+Every statement executed on the application's engine is timed. Inside
+a request the count and total time, and the time spent waiting for a
+pooled connection, are reported in ``Server-Timing`` headers and in
+one JSON log line on the ``app.sql`` logger; statements slower than
+``SLOW_QUERY_MS`` are logged individually together with the endpoint
+that issued them.
+"""
+import json
+import logging
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import List
+
+from flask import (
+    current_app,
+    g,
+    has_app_context,
+    has_request_context,
+    request
+)
+from sqlalchemy import event
+
+logger = logging.getLogger('app.sql')
+
+
+@dataclass
+class QueryStats:
+    count: int = 0
+    duration: float = 0.0
+    pool_wait: float = 0.0
+    statements: List[str] = field(default_factory=list)
+
+    def record(self, statement, duration):
+        self.count += 1
+        self.duration += duration
+        self.statements.append(statement)
+
+
+class SQLInstrumentation:
+    def __init__(self, app=None, db=None):
+        if app is not None:
+            self.init_app(app, db)
+
+    def init_app(self, app, db):
+        app.config.setdefault('SQL_INSTRUMENTATION', True)
+        app.config.setdefault('SLOW_QUERY_MS', 200)
+        app.extensions['sql_instrumentation'] = {'collectors': []}
+
+        if not app.config['SQL_INSTRUMENTATION']:
+            return
+        if logger.level == logging.NOTSET:
+            logger.setLevel(logging.INFO)
+
+        with app.app_context():
+            engines = set(db.engines.values())
+        for engine in engines:
+            event.listen(engine, 'before_cursor_execute', _before_execute)
+            event.listen(engine, 'after_cursor_execute', _after_execute)
+
+        app.before_request(_start_request)
+        app.after_request(_finish_request)
+
+
+def _before_execute(conn, cursor, statement, *args):
+    conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+
+def _after_execute(conn, cursor, statement, *args):
+    duration = time.perf_counter() - conn.info['query_start'].pop()
+
+    if not has_app_context():
+        return
+    state = current_app.extensions.get('sql_instrumentation')
+    if state is None:
+        return
+
+    for collector in state['collectors']:
+        collector.record(statement, duration)
+
+    if not has_request_context():
+        return
+    stats = g.get('sql_stats')
+    if stats is not None:
+        stats.record(statement, duration)
+
+    if duration * 1000 >= current_app.config['SLOW_QUERY_MS']:
+        logger.warning(json.dumps({
+            'event': 'slow_query',
+            'endpoint': request.endpoint,
+            'duration_ms': round(duration * 1000, 2),
+            'statement': statement,
+        }))
+
+
+def record_pool_wait(duration):
+    """Add time spent waiting for a pooled connection to the request."""
+    if not has_request_context():
+        return
+    stats = g.get('sql_stats')
+    if stats is not None:
+        stats.pool_wait += duration
+
+
+def _start_request():
+    g.sql_stats = QueryStats()
+    g.request_started = time.perf_counter()
+
+
+def _finish_request(response):
+    stats = g.pop('sql_stats', None)
+    started = g.pop('request_started', None)
+    if stats is None or started is None:
+        return response
+
+    total_ms = (time.perf_counter() - started) * 1000
+    sql_ms = stats.duration * 1000
+    pool_ms = stats.pool_wait * 1000
+
+    response.headers.add(
+        'Server-Timing',
+        f'db;dur={sql_ms:.2f};desc="{stats.count} queries"'
+    )
+    response.headers.add('Server-Timing', f'pool;dur={pool_ms:.2f}')
+    response.headers.add('Server-Timing', f'app;dur={total_ms:.2f}')
+
+    logger.info(json.dumps({
+        'event': 'request',
+        'endpoint': request.endpoint,
+        'method': request.method,
+        'status': response.status_code,
+        'queries': stats.count,
+        'sql_ms': round(sql_ms, 2),
+        'pool_wait_ms': round(pool_ms, 2),
+        'total_ms': round(total_ms, 2),
+    }))
+    return response
+
+
+@contextmanager
+def count_queries(app=None):
+    """Collect every statement executed on the app's engines in the block.
+
+    Works across requests made with the test client, so a test can wrap
+    a single ``client.get`` call.
+    """
+    app = app or current_app._get_current_object()
+    collectors = app.extensions['sql_instrumentation']['collectors']
+    stats = QueryStats()
+    collectors.append(stats)
+    try:
+        yield stats
+    finally:
+        collectors.remove(stats)
+
+
+@contextmanager
+def max_queries(limit, app=None):
+    """Fail with ``AssertionError`` if the block runs more than ``limit``
+    statements."""
+    with count_queries(app) as stats:
+        yield stats
+    if stats.count > limit:
+        raise AssertionError(
+            f'{stats.count} queries executed, expected at most {limit}:\n'
+            + '\n'.join(stats.statements)
+        )
+
+
+sql_instrumentation = SQLInstrumentation()
@@ -0,0 +1,168 @@
+"""In-memory cache of fully rendered pages that do not depend on the
+logged-in user.
+
+Views decorated with ``cached_page`` are keyed by endpoint, view
+arguments, query string and the cookies listed in
+``PAGE_CACHE_COOKIES``, plus a version from the version store for pages
+rendered from data that can change. Entries are evicted least recently
+used first once their bodies exceed ``PAGE_CACHE_BYTES``. Requests with
+flash messages pending bypass the cache, since the flash is part of the page.
+``prewarm`` renders every page a decorated view declares up front, so
+workers forked from a preloaded app start with a full cache. It is
+skipped for tests and flask CLI commands.
+"""
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from functools import wraps
+
+from flask import current_app, request, session, url_for
+
+from .cache import versions
+
+logger = logging.getLogger(__name__)
+
+_prewarm_urls = {}
+
+
+class ResponseCache:
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, body, mimetype):
+        if len(body) > self.max_bytes:
+            return None
+        etag = hashlib.sha1(body).hexdigest()
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size -= len(previous[0])
+            entry = self._entries[key] = (body, mimetype, etag)
+            self.size += len(body)
+            while self.size > self.max_bytes:
+                _, (evicted, _, _) = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def _cache_key(version_key):
+    cookies = tuple(
+        request.cookies.get(name)
+        for name in current_app.config['PAGE_CACHE_COOKIES']
+    )
+    return (
+        request.endpoint,
+        tuple(sorted((request.view_args or {}).items())),
+        request.query_string,
+        cookies,
+        versions.get(version_key) if version_key else None,
+    )
+
+
+def cached_page(prewarm=None, version_key=None):
+    """Serve the view's 200 responses from the page cache.
+
+    ``prewarm`` returns the view arguments to render at startup, one
+    dict per page. Bumping ``version_key`` makes every cached page of
+    the view stale.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            cache = current_app.extensions.get('page_cache')
+            if (
+                cache is None
+                or request.method != 'GET'
+                or '_flashes' in session
+            ):
+                return view(*args, **kwargs)
+
+            key = _cache_key(version_key)
+            entry = cache.get(key)
+            if entry is None:
+                response = current_app.make_response(view(*args, **kwargs))
+                if response.status_code != 200 or response.is_streamed:
+                    return response
+                entry = cache.put(key, response.get_data(), response.mimetype)
+                if entry is None:
+                    return response
+
+            body, mimetype, etag = entry
+            response = current_app.response_class(body, mimetype=mimetype)
+            response.set_etag(etag)
+            return response.make_conditional(request)
+
+        if prewarm is not None:
+            _prewarm_urls[wrapper] = prewarm
+        return wrapper
+    return decorator
+
+
+class PageCache:
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('PAGE_CACHE_BYTES', 4 * 1024 * 1024)
+        app.config.setdefault('PAGE_CACHE_COOKIES', ('theme',))
+        app.config.setdefault('PAGE_CACHE_PREWARM', True)
+        if app.config['PAGE_CACHE_BYTES'] > 0:
+            app.extensions['page_cache'] = ResponseCache(
+                app.config['PAGE_CACHE_BYTES']
+            )
+
+    def prewarm(self, app):
+        """Render every page declared by the registered cached views."""
+        if 'page_cache' not in app.extensions:
+            return 0
+
+        urls = []
+        with app.test_request_context():
+            for endpoint, view in app.view_functions.items():
+                if view in _prewarm_urls:
+                    urls.extend(
+                        url_for(endpoint, **view_args)
+                        for view_args in _prewarm_urls[view]()
+                    )
+
+        client = app.test_client()
+        warmed = 0
+        for url in urls:
+            response = client.get(url)
+            if response.status_code == 200:
+                warmed += 1
+            else:
+                # E.g. a table that is not migrated yet; the page is
+                # rendered on its first request instead.
+                logger.warning(
+                    'Could not prewarm %s: %s', url, response.status
+                )
+        return warmed
+
+
+page_cache = PageCache()
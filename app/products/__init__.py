@@ -4,7 +4,8 @@ products_bp = Blueprint(
     "products_bp",
     __name__,
     url_prefix="/products",
-    template_folder="templates"
+    template_folder="templates",
+    cli_group="products"
 )
 
-from . import views
+from . import views, commands
@@ -0,0 +1,42 @@
+from sqlalchemy import event
+from sqlalchemy.orm import Mapped, Session, mapped_column, object_session
+
+from app import db
+from app.cache import versions
+
+PRODUCTS_VERSION_KEY = "products"
+
+
+class Product(db.Model):
+    __tablename__ = "products"
+    __table_args__ = (
+        db.Index("ix_products_name", "name"),
+    )
+
+    id: Mapped[int] = mapped_column(db.Integer, primary_key=True)
+    name: Mapped[str] = mapped_column(db.String(100), nullable=False)
+    description: Mapped[str] = mapped_column(db.Text, nullable=True)
+
+    def __repr__(self):
+        return f"<Product {self.name}>"
+
+
+def _product_changed(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        session.info["products_changed"] = True
+
+
+for _event in ("after_insert", "after_update", "after_delete"):
+    event.listen(Product, _event, _product_changed)
+
+
+@event.listens_for(Session, "after_commit")
+def _bump_products_version(session):
+    if session.info.pop("products_changed", False):
+        versions.bump(PRODUCTS_VERSION_KEY)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_products_change(session):
+    session.info.pop("products_changed", None)
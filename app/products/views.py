@@ -1,39 +1,44 @@
-from flask import render_template, abort
+from flask import abort, current_app, render_template, request
+from sqlalchemy import or_, select
 
+from app import db
+from app.page_cache import cached_page
 from . import products_bp
-
-products = [
-    {
-        "id": 1,
-        "name": "Lemon",
-        "description": "A tart, yellow citrus fruit used for juice and zest."
-    },
-    {
-        "id": 2,
-        "name": "Apple",
-        "description": "A sweet, crunchy fruit commonly eaten fresh or in desserts."
-    },
-    {
-        "id": 3,
-        "name": "Banana",
-        "description": "A soft, sweet tropical fruit with a creamy texture."
-    },
-    {
-        "id": 4,
-        "name": "Orange",
-        "description": "A juicy citrus fruit rich in vitamin C."
-    }
-]
+from .models import PRODUCTS_VERSION_KEY, Product
 
 
 @products_bp.route("")
+@cached_page(prewarm=lambda: [{}], version_key=PRODUCTS_VERSION_KEY)
 def get_products():
-    return render_template("products/products.html", products=products)
+    search = request.args.get("search", "").strip()
+    after = request.args.get("after", 0, int)
+    per_page = current_app.config["PRODUCTS_PER_PAGE"]
+
+    stmt = select(Product).where(Product.id > after).order_by(Product.id)
+    if search:
+        stmt = stmt.where(or_(
+            Product.name.icontains(search, autoescape=True),
+            Product.description.icontains(search, autoescape=True)
+        ))
+
+    products = db.session.execute(stmt.limit(per_page + 1)).scalars().all()
+    next_after = None
+    if len(products) > per_page:
+        next_after = products[per_page - 1].id
+
+    return render_template(
+        "products/products.html",
+        products=products[:per_page],
+        search=search,
+        after=after,
+        next_after=next_after
+    )
 
 
 @products_bp.route("/<int:id>")
+@cached_page(version_key=PRODUCTS_VERSION_KEY)
 def detail_product(id):
-    if id > len(products) or id < 1:
+    product = db.session.get(Product, id)
+    if product is None:
         abort(404)
-    product = products[id - 1]
     return render_template("products/product.html", product=product)
@@ -0,0 +1,88 @@
+"""Routing of read-only requests to a replica database.
+
+When ``SQLALCHEMY_BINDS`` has a ``replica`` entry, views decorated with
+``read_from_replica`` send their ``SELECT`` statements to that engine;
+flushes and any other statement still go to the primary. After a user
+writes through a view decorated with ``sticks_to_primary`` their reads
+stay on the primary for ``REPLICA_STICKY_SECONDS``, so they never see a
+replica that has not caught up with their own change yet.
+``ReplicaRouting`` keeps the replica bind to the app that configures it.
+"""
+import time
+from functools import wraps
+
+from flask import current_app, g, has_request_context, request, session
+from flask_sqlalchemy.session import Session
+
+REPLICA_BIND = 'replica'
+
+
+class RoutingSession(Session):
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (
+            bind is None
+            and clause is not None
+            and getattr(clause, 'is_select', False)
+            and not self._flushing
+            and has_request_context()
+            and g.get('read_replica', False)
+        ):
+            replica = self._db.engines.get(REPLICA_BIND)
+            if replica is not None:
+                return replica
+        return super().get_bind(
+            mapper=mapper, clause=clause, bind=bind, **kwargs
+        )
+
+
+class ReplicaRouting:
+    def __init__(self, app=None, db=None):
+        if app is not None:
+            self.init_app(app, db)
+
+    def init_app(self, app, db):
+        # Flask-SQLAlchemy adds a MetaData per bind key to the ``db``
+        # shared by every app. No model lives on the replica, and left
+        # there it would make create_all() of later apps without the
+        # bind look for it; the engine itself stays with this app.
+        db.metadatas.pop(REPLICA_BIND, None)
+
+
+replica_routing = ReplicaRouting()
+
+
+def _recently_wrote():
+    wrote_at = session.get('wrote_at')
+    if wrote_at is None:
+        return False
+    window = current_app.config.get('REPLICA_STICKY_SECONDS', 5)
+    return time.time() - wrote_at < window
+
+
+def reading_from_replica():
+    """Whether the current request's ``SELECT``s go to the replica."""
+    return (
+        g.get('read_replica', False)
+        and REPLICA_BIND in (current_app.config.get('SQLALCHEMY_BINDS') or {})
+    )
+
+
+def read_from_replica(view):
+    """Run the view's ``SELECT``s on the replica unless the user wrote
+    recently."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        g.read_replica = request.method == 'GET' and not _recently_wrote()
+        return view(*args, **kwargs)
+    return wrapper
+
+
+def sticks_to_primary(view):
+    """Pin the user's reads to the primary after a write request."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        response = view(*args, **kwargs)
+        if request.method != 'GET':
+            session['wrote_at'] = time.time()
+        return response
+    return wrapper
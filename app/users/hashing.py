@@ -0,0 +1,58 @@
+"""Password hashing with a per-process concurrency cap.
+
+scrypt and pbkdf2 are deliberately slow. hashlib releases the GIL while
+computing them, so hashes run inline in the request thread and other
+threads keep serving meanwhile. ``PASSWORD_HASH_CONCURRENCY`` caps how
+many hashes one process computes at once, so a burst of logins cannot
+take every core; further logins wait for a free slot.
+"""
+import threading
+from functools import lru_cache
+
+from flask import current_app
+from werkzeug.security import check_password_hash, generate_password_hash
+
+
+@lru_cache(maxsize=8)
+def _method_prefix(method):
+    """Return ``method`` with werkzeug's defaults filled in, as it appears
+    at the start of a stored hash."""
+    return generate_password_hash("", method).split("$", 1)[0]
+
+
+class PasswordHasher:
+    """Flask extension hashing and verifying passwords."""
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("PASSWORD_HASH_METHOD", "scrypt")
+        app.config.setdefault("PASSWORD_HASH_CONCURRENCY", 2)
+        limit = app.config["PASSWORD_HASH_CONCURRENCY"]
+        app.extensions["password_hasher"] = (
+            threading.BoundedSemaphore(limit) if limit > 0 else None
+        )
+
+    def _run(self, func, *args):
+        slots = current_app.extensions["password_hasher"]
+        if slots is None:
+            return func(*args)
+        with slots:
+            return func(*args)
+
+    def hash(self, password):
+        method = current_app.config["PASSWORD_HASH_METHOD"]
+        return self._run(generate_password_hash, password, method)
+
+    def verify(self, password_hash, password):
+        return self._run(check_password_hash, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        """True if ``password_hash`` was made with another method or cost."""
+        method = current_app.config["PASSWORD_HASH_METHOD"]
+        return password_hash.split("$", 1)[0] != _method_prefix(method)
+
+
+password_hasher = PasswordHasher()
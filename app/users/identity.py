@@ -0,0 +1,168 @@
+"""In-memory cache of logged-in user identities.
+
+``login_manager.user_loader`` runs on every authenticated request but
+the views only need the user's id and username, so those are kept in a
+bounded LRU cache of small ``UserIdentity`` objects instead of loading
+a ``User`` row each time. Entries expire after ``USER_CACHE_TTL``
+seconds. Renaming or deleting a user evicts it once the transaction
+commits and bumps the ``users`` version, which clears the cache in
+every process sharing the version store. Other updates, such as the
+password rehash on login, leave the cache alone.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session, object_session
+
+from app import db
+from app.cache import versions
+from .models import User
+
+USERS_VERSION_KEY = "users"
+
+
+class UserIdentity:
+    """The part of a user that ``current_user`` needs between requests."""
+
+    __slots__ = ("id", "username")
+
+    is_active = True
+    is_authenticated = True
+    is_anonymous = False
+
+    def __init__(self, id, username):
+        self.id = id
+        self.username = username
+
+    def get_id(self):
+        return str(self.id)
+
+    def __eq__(self, other):
+        if hasattr(other, "get_id"):
+            return self.get_id() == other.get_id()
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self.id)
+
+    def __repr__(self):
+        return f"<UserIdentity {self.username}>"
+
+
+class IdentityCache:
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.version = None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id, version):
+        with self._lock:
+            if version != self.version:
+                self._entries.clear()
+                self.version = version
+                return None
+
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            identity, expires = entry
+            if expires <= time.monotonic():
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return identity
+
+    def put(self, identity):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[identity.id] = (
+                identity,
+                time.monotonic() + self.ttl
+            )
+            self._entries.move_to_end(identity.id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def discard(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class UserIdentities:
+    """Flask extension owning the per-app identity cache."""
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("USER_CACHE_SIZE", 1024)
+        app.config.setdefault("USER_CACHE_TTL", 300)
+        app.extensions["user_identities"] = IdentityCache(
+            app.config["USER_CACHE_SIZE"],
+            app.config["USER_CACHE_TTL"]
+        )
+
+    @property
+    def cache(self):
+        return current_app.extensions["user_identities"]
+
+    def load(self, user_id):
+        """Return the identity for ``user_id`` or ``None`` if it is gone."""
+        cache = self.cache
+        identity = cache.get(user_id, versions.get(USERS_VERSION_KEY))
+        if identity is not None:
+            return identity
+
+        row = db.session.execute(
+            select(User.id, User.username).where(User.id == user_id)
+        ).one_or_none()
+        if row is None:
+            return None
+        identity = UserIdentity(row.id, row.username)
+        cache.put(identity)
+        return identity
+
+    def invalidate(self, user_ids):
+        for user_id in user_ids:
+            self.cache.discard(user_id)
+        versions.bump(USERS_VERSION_KEY)
+
+
+user_identities = UserIdentities()
+
+
+def _user_changed(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault("changed_users", set()).add(target.id)
+
+
+def _user_updated(mapper, connection, target):
+    if inspect(target).attrs.username.history.has_changes():
+        _user_changed(mapper, connection, target)
+
+
+event.listen(User, "after_update", _user_updated)
+event.listen(User, "after_delete", _user_changed)
+
+
+@event.listens_for(Session, "after_commit")
+def _evict_changed_users(session):
+    changed = session.info.pop("changed_users", None)
+    if changed:
+        user_identities.invalidate(changed)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_user_changes(session):
+    session.info.pop("changed_users", None)
@@ -48,6 +48,10 @@ def login():
         user = db.session.execute(stmt).scalars().first()
 
         if user and user.check_password(password):
+            if user.password_needs_rehash():
+                user.set_password(password)
+                db.session.commit()
+
             login_user(user, remember=remember)
             flash("Logged in successfully!", "success")
 
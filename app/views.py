@@ -1,15 +1,20 @@
-from flask import request, redirect, url_for, render_template, abort
-from . import app
+from flask import request, render_template
 
+from .page_cache import cached_page
 
-@app.route("/")
+
+@cached_page(prewarm=lambda: [{}])
 def main():
     return render_template("base.html")
 
 
-@app.route("/homepage")
 def home():
     """View for the Home page of your website."""
     agent = request.user_agent
 
     return render_template("home.html", agent=agent)
+
+
+def init_app(app):
+    app.add_url_rule("/", view_func=main)
+    app.add_url_rule("/homepage", view_func=home)
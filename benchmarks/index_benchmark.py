@@ -0,0 +1,238 @@
+"""Query plans and timings for the expenses indexes, before and after.
+
+Seeds a throwaway SQLite database with synthetic expenses, runs the
+statements issued by ``index``, ``my_expenses`` and ``categories``
+without secondary indexes, then creates the indexes declared on
+``Expense`` and runs them again.
+
+Usage (from the repository root)::
+
+    python -m benchmarks.index_benchmark --rows 1000000
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, func, insert, literal_column, select
+from sqlalchemy import tuple_
+
+from app.expenses.models import Expense, ExpenseCategory
+from app.users.models import User
+
+WORDS = [
+    'coffee', 'lunch', 'taxi', 'groceries', 'rent', 'internet', 'gym',
+    'books', 'cinema', 'pharmacy', 'fuel', 'parking', 'dinner', 'gift',
+]
+
+
+def seed(engine, rows, owners, categories, batch_size=50_000):
+    rng = random.Random(42)
+    start = datetime(2020, 1, 1)
+    span = int(timedelta(days=5 * 365).total_seconds())
+
+    with engine.begin() as conn:
+        conn.execute(insert(ExpenseCategory.__table__), [
+            {'id': i + 1, 'name': f'Category {i}'} for i in range(categories)
+        ])
+        conn.execute(insert(User.__table__), [
+            {'id': i + 1, 'username': f'user{i}', 'password_hash': '!'}
+            for i in range(owners)
+        ])
+
+    batch = []
+    for i in range(rows):
+        moment = start + timedelta(seconds=rng.randrange(span))
+        batch.append({
+            'title': f'{rng.choice(WORDS)} {rng.choice(WORDS)} {i}',
+            'amount': round(rng.lognormvariate(4, 1), 2),
+            'date': moment,
+            'created_at': moment,
+            'updated_at': moment,
+            'category_id': rng.randrange(categories) + 1,
+            'owner_id': rng.randrange(owners) + 1,
+        })
+        if len(batch) == batch_size:
+            with engine.begin() as conn:
+                conn.execute(insert(Expense.__table__), batch)
+            batch = []
+    if batch:
+        with engine.begin() as conn:
+            conn.execute(insert(Expense.__table__), batch)
+
+
+def build_queries(engine):
+    expenses = Expense.__table__
+    categories = ExpenseCategory.__table__
+
+    with engine.connect() as conn:
+        owner = conn.execute(
+            select(expenses.c.owner_id).limit(1)
+        ).scalar_one()
+        middle = conn.execute(
+            select(expenses.c.date, expenses.c.id)
+            .order_by(expenses.c.date, expenses.c.id)
+            .offset(conn.execute(
+                select(func.count()).select_from(expenses)
+            ).scalar_one() // 2)
+            .limit(1)
+        ).one()
+        # Start the next page 50 rows in, or at the owner's top amount
+        # when they have fewer expenses than that.
+        by_amount = (
+            select(expenses.c.amount, expenses.c.id)
+            .where(expenses.c.owner_id == owner)
+            .order_by(expenses.c.amount.desc(), expenses.c.id.desc())
+            .limit(1)
+        )
+        amount = (
+            conn.execute(by_amount.offset(50)).one_or_none()
+            or conn.execute(by_amount).one()
+        )
+
+    mine = expenses.c.owner_id == owner
+    return {
+        'my_expenses first page by date': (
+            select(expenses)
+            .where(mine)
+            .order_by(expenses.c.date.desc(), expenses.c.id.desc())
+            .limit(21)
+        ),
+        'my_expenses next page by amount': (
+            select(expenses)
+            .where(mine)
+            .where(tuple_(expenses.c.amount, expenses.c.id) < tuple(amount))
+            .order_by(expenses.c.amount.desc(), expenses.c.id.desc())
+            .limit(21)
+        ),
+        'my_expenses first page by title': (
+            select(expenses)
+            .where(mine)
+            .order_by(expenses.c.title.asc(), expenses.c.id.asc())
+            .limit(21)
+        ),
+        'my_expenses summary': (
+            select(
+                func.count(expenses.c.id),
+                func.coalesce(func.sum(expenses.c.amount), literal_column('0'))
+            ).where(mine)
+        ),
+        'index deep page by date': (
+            select(expenses)
+            .where(tuple_(expenses.c.date, expenses.c.id) < tuple(middle))
+            .order_by(expenses.c.date.desc(), expenses.c.id.desc())
+            .limit(21)
+        ),
+        'index first page by amount': (
+            select(expenses)
+            .order_by(expenses.c.amount.desc(), expenses.c.id.desc())
+            .limit(21)
+        ),
+        'categories aggregate': (
+            select(
+                categories,
+                func.count(expenses.c.id),
+                func.coalesce(func.sum(expenses.c.amount), literal_column('0'))
+            )
+            .select_from(categories)
+            .outerjoin(expenses, expenses.c.category_id == categories.c.id)
+            .group_by(categories.c.id)
+            .order_by(categories.c.name)
+        ),
+    }
+
+
+def _driver_params(compiled):
+    """Positional DB-API parameters of ``compiled``, each converted by
+    its column type as ``Connection.execute`` would, so amounts go in
+    as cents and datetimes as strings."""
+    params = compiled.construct_params()
+    values = []
+    for name in compiled.positiontup:
+        value = params[name]
+        process = compiled.binds[name].type.bind_processor(compiled.dialect)
+        values.append(process(value) if process else value)
+    return tuple(values)
+
+
+def measure(engine, queries, repeat):
+    results = {}
+    with engine.connect() as conn:
+        for name, stmt in queries.items():
+            compiled = stmt.compile(conn)
+            sql = str(compiled)
+            params = _driver_params(compiled)
+
+            plan = [
+                row[-1] for row in conn.exec_driver_sql(
+                    f'EXPLAIN QUERY PLAN {sql}', params
+                )
+            ]
+
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                conn.exec_driver_sql(sql, params).fetchall()
+                timings.append((time.perf_counter() - started) * 1000)
+
+            results[name] = {
+                'plan': plan,
+                'median_ms': round(statistics.median(timings), 3),
+            }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--owners', type=int, default=1_000)
+    parser.add_argument('--categories', type=int, default=50)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--json', help='write results to this file')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        User.__table__.create(engine)
+        ExpenseCategory.__table__.create(engine)
+        Expense.__table__.create(engine)
+        for index in Expense.__table__.indexes:
+            index.drop(engine)
+
+        started = time.perf_counter()
+        seed(engine, args.rows, args.owners, args.categories)
+        print(f'Seeded {args.rows} expenses in '
+              f'{time.perf_counter() - started:.1f}s')
+
+        queries = build_queries(engine)
+        before = measure(engine, queries, args.repeat)
+
+        started = time.perf_counter()
+        for index in Expense.__table__.indexes:
+            index.create(engine)
+        with engine.begin() as conn:
+            conn.exec_driver_sql('ANALYZE')
+        print(f'Created indexes in {time.perf_counter() - started:.1f}s')
+
+        after = measure(engine, queries, args.repeat)
+        engine.dispose()
+
+    for name in queries:
+        print(f'\n{name}')
+        print(f"  before: {before[name]['median_ms']:>10.3f} ms  "
+              f"{'; '.join(before[name]['plan'])}")
+        print(f"  after:  {after[name]['median_ms']:>10.3f} ms  "
+              f"{'; '.join(after[name]['plan'])}")
+
+    if args.json:
+        with open(args.json, 'w') as fh:
+            json.dump({'rows': args.rows, 'before': before, 'after': after},
+                      fh, indent=2)
+
+
+if __name__ == '__main__':
+    main()
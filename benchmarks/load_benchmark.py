@@ -0,0 +1,414 @@
+"""Throughput, latency percentiles and query counts per endpoint.
+
+Seeds a throwaway SQLite database with ``--users`` users,
+``--categories`` categories, ``--expenses`` synthetic expenses and
+``--products`` products, then sends ``--requests`` GET requests to each
+entry of ``ENDPOINTS`` from ``--concurrency`` threads, each thread
+logged in as a different user. Requests go through the Flask test
+client and, with ``--gunicorn``, also to a local gunicorn serving the
+same database, which adds the WSGI server and the network round trip.
+Query counts are read from the ``Server-Timing`` header that
+:mod:`app.instrumentation` adds to every response.
+
+With ``--database-uri`` no data is generated and an existing database
+is used instead, e.g. one filled by ``flask seed``; ``--password`` must
+then be the seeded users' password.
+
+Results are written with ``--json``; pass an earlier file as
+``--baseline`` to print the change against it, e.g. between two
+commits.
+
+Usage (from the repository root)::
+
+    python -m benchmarks.load_benchmark --expenses 200000 --gunicorn \\
+        --json load-new.json --baseline load-old.json
+    python -m benchmarks.load_benchmark --gunicorn \\
+        --database-uri sqlite:////tmp/seeded.db --password password
+"""
+import argparse
+import json
+import os
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from http.cookiejar import CookieJar
+
+from sqlalchemy import func, insert, select
+from werkzeug.security import generate_password_hash
+
+from app import create_app, db
+from app.expenses import seeding
+from app.expenses.models import Expense, ExpenseCategory
+from app.page_cache import page_cache
+from app.products.models import Product
+from app.users.models import User
+
+# Name -> path; {expense_id} and {product_id} are filled in per user.
+ENDPOINTS = {
+    'products list': '/products',
+    'product detail': '/products/{product_id}',
+    'profile': '/users/profile',
+    'expenses index': '/expenses/',
+    'expenses search': '/expenses/?search=coffee',
+    'my expenses': '/expenses/my-expenses',
+    'my expenses by amount': '/expenses/my-expenses?sort_by=amount',
+    'expense detail': '/expenses/{expense_id}',
+    'categories': '/expenses/categories',
+    'analytics by week': '/expenses/analytics?granularity=week',
+    'api list': '/api/v1/expenses?scope=mine',
+    'api detail': '/api/v1/expenses/{expense_id}',
+    'api summary': '/api/v1/expenses/summary',
+}
+
+PASSWORD = 'bench-password'
+# Cheap on purpose: logging in is not what is measured here, see
+# login_benchmark for that.
+HASH_METHOD = 'pbkdf2:sha256:1000'
+
+QUERIES_RE = re.compile(r'^db;.*desc="(\d+) queries"')
+
+
+def seed(engine, users, categories, expenses, products):
+    seeding.seed(
+        engine,
+        users,
+        categories,
+        expenses,
+        password_hash=generate_password_hash(PASSWORD, HASH_METHOD),
+    )
+    with engine.begin() as conn:
+        conn.execute(insert(Product.__table__), [
+            {'name': f'Product {i}', 'description': f'Synthetic product {i}'}
+            for i in range(products)
+        ])
+
+
+def user_contexts(engine, count):
+    """Path parameters for ``count`` users that own at least one expense."""
+    expenses = Expense.__table__
+    users = User.__table__
+    with engine.connect() as conn:
+        rows = conn.execute(
+            select(users.c.id, users.c.username, func.min(expenses.c.id))
+            .join(expenses, expenses.c.owner_id == users.c.id)
+            .group_by(users.c.id, users.c.username)
+            .order_by(users.c.id)
+            .limit(count)
+        ).all()
+        product_id = conn.execute(
+            select(func.min(Product.__table__.c.id))
+        ).scalar_one()
+    return [
+        {'user_id': user_id, 'username': username,
+         'expense_id': expense_id, 'product_id': product_id}
+        for user_id, username, expense_id in rows
+    ]
+
+
+def dataset_size(engine):
+    with engine.connect() as conn:
+        return {
+            name: conn.execute(
+                select(func.count()).select_from(model.__table__)
+            ).scalar_one()
+            for name, model in (
+                ('users', User),
+                ('categories', ExpenseCategory),
+                ('expenses', Expense),
+            )
+        }
+
+
+def _query_count(timings):
+    for value in timings:
+        match = QUERIES_RE.match(value)
+        if match:
+            return int(match.group(1))
+    return None
+
+
+class ClientSession:
+    """A test client logged in as one user."""
+
+    def __init__(self, app, context):
+        self.context = context
+        self.client = app.test_client()
+        with self.client.session_transaction() as session:
+            session['_user_id'] = str(context['user_id'])
+            session['_fresh'] = True
+
+    def get(self, path):
+        response = self.client.get(path)
+        response.close()
+        return response.status_code, response.headers.getlist('Server-Timing')
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class HttpSession:
+    """A cookie jar logged in as one user on a running server."""
+
+    def __init__(self, url, context, password):
+        self.url = url
+        self.context = context
+        self.opener = urllib.request.build_opener(
+            _NoRedirect, urllib.request.HTTPCookieProcessor(CookieJar())
+        )
+        data = urllib.parse.urlencode({
+            'username': context['username'],
+            'password': password,
+        }).encode()
+        try:
+            self.opener.open(f'{url}/users/login', data)
+        except urllib.error.HTTPError as error:
+            if error.code != 302:
+                raise
+
+    def get(self, path):
+        try:
+            response = self.opener.open(f'{self.url}{path}')
+        except urllib.error.HTTPError as error:
+            response = error
+        with response:
+            response.read()
+            return response.status, response.headers.get_all(
+                'Server-Timing', []
+            )
+
+
+def _percentile(timings, fraction):
+    ordered = sorted(timings)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def _summary(timings, queries, elapsed):
+    return {
+        'requests': len(timings),
+        'requests_per_s': round(len(timings) / elapsed, 2),
+        'p50_ms': round(statistics.median(timings), 2),
+        'p95_ms': round(_percentile(timings, 0.95), 2),
+        'p99_ms': round(_percentile(timings, 0.99), 2),
+        'max_ms': round(max(timings), 2),
+        'max_queries': max(queries) if queries else None,
+    }
+
+
+def run(sessions, template, requests):
+    """Send ``requests`` GETs of ``template`` spread over ``sessions``,
+    one thread per session."""
+    def worker(session, count):
+        path = template.format(**session.context)
+        status, _ = session.get(path)
+        if status != 200:
+            raise RuntimeError(f'GET {path} answered {status}')
+
+        timings, queries = [], []
+        for _ in range(count):
+            started = time.perf_counter()
+            status, server_timing = session.get(path)
+            timings.append((time.perf_counter() - started) * 1000)
+            if status != 200:
+                raise RuntimeError(f'GET {path} answered {status}')
+            executed = _query_count(server_timing)
+            if executed is not None:
+                queries.append(executed)
+        return timings, queries
+
+    share, extra = divmod(requests, len(sessions))
+    counts = [share + (i < extra) for i in range(len(sessions))]
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(sessions)) as executor:
+        results = list(executor.map(worker, sessions, counts))
+    elapsed = time.perf_counter() - started
+
+    timings = [t for result, _ in results for t in result]
+    queries = [q for _, result in results for q in result]
+    return _summary(timings, queries, elapsed)
+
+
+def measure(sessions, requests):
+    """Run every endpoint whose path parameters exist; an existing
+    database may have no products, for instance."""
+    missing = [
+        f'{{{key}}}' for key, value in sessions[0].context.items()
+        if value is None
+    ]
+    return {
+        name: run(sessions, template, requests)
+        for name, template in ENDPOINTS.items()
+        if not any(key in template for key in missing)
+    }
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_gunicorn(database_uri, workers, cache_dir, hash_method=None):
+    port = _free_port()
+    url = f'http://127.0.0.1:{port}'
+    env = dict(
+        os.environ,
+        DATABASE_URI=database_uri,
+        CACHE_VERSION_DIR=cache_dir,
+    )
+    if hash_method:
+        env['PASSWORD_HASH_METHOD'] = hash_method
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn',
+         '--workers', str(workers),
+         '--bind', f'127.0.0.1:{port}',
+         '--log-level', 'warning',
+         'app:create_app()'],
+        env=env,
+    )
+
+    deadline = time.monotonic() + 30
+    while True:
+        try:
+            urllib.request.urlopen(f'{url}/products').close()
+            return server, url
+        except (urllib.error.URLError, ConnectionError):
+            if server.poll() is not None or time.monotonic() > deadline:
+                server.kill()
+                raise RuntimeError('gunicorn did not start')
+            time.sleep(0.2)
+
+
+def _revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _change(new, old):
+    if not old:
+        return '      n/a'
+    return f'{(new - old) / old * 100:>+8.1f}%'
+
+
+def report(results, baseline):
+    for target, endpoints in results.items():
+        print(f'\n{target}')
+        previous = baseline.get('results', {}).get(target, {})
+        for name, result in endpoints.items():
+            line = (f"  {name:<22} {result['requests_per_s']:>8.1f} req/s  "
+                    f"p50 {result['p50_ms']:>7.2f}  "
+                    f"p95 {result['p95_ms']:>7.2f}  "
+                    f"p99 {result['p99_ms']:>7.2f} ms  "
+                    f"{result['max_queries']} queries")
+            old = previous.get(name)
+            if old:
+                line += (f"  | p50 {_change(result['p50_ms'], old['p50_ms'])}"
+                         f"  p95 {_change(result['p95_ms'], old['p95_ms'])}")
+                if result['max_queries'] != old['max_queries']:
+                    line += (f"  queries {old['max_queries']}"
+                             f"->{result['max_queries']}")
+            print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--categories', type=int, default=10)
+    parser.add_argument('--expenses', type=int, default=100_000)
+    parser.add_argument('--products', type=int, default=1_000)
+    parser.add_argument('--requests', type=int, default=200,
+                        help='requests per endpoint')
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--gunicorn', action='store_true',
+                        help='also benchmark a local gunicorn')
+    parser.add_argument('--gunicorn-workers', type=int, default=2)
+    parser.add_argument('--database-uri',
+                        help='benchmark this database instead of seeding one')
+    parser.add_argument('--password', default=PASSWORD,
+                        help='password of the users in --database-uri')
+    parser.add_argument('--json', help='write results to this file')
+    parser.add_argument('--baseline', help='compare with this results file')
+    args = parser.parse_args()
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as fh:
+            baseline = json.load(fh)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        database_uri = (
+            args.database_uri
+            or f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        )
+        app = create_app({
+            'SQLALCHEMY_DATABASE_URI': database_uri,
+            'PAGE_CACHE_PREWARM': False,
+        })
+        with app.app_context():
+            engine = db.engine
+            if not args.database_uri:
+                db.create_all()
+                started = time.perf_counter()
+                seed(engine, args.users, args.categories, args.expenses,
+                     args.products)
+                print(f'Seeded {args.expenses} expenses for {args.users} '
+                      f'users in {time.perf_counter() - started:.1f}s')
+            size = dataset_size(engine)
+            contexts = user_contexts(engine, args.concurrency)
+        page_cache.prewarm(app)
+
+        sessions = [ClientSession(app, context) for context in contexts]
+        results['test client'] = measure(sessions, args.requests)
+        with app.app_context():
+            db.engine.dispose()
+
+        if args.gunicorn:
+            cache_dir = os.path.join(tmp, 'versions')
+            os.mkdir(cache_dir)
+            server, url = start_gunicorn(
+                database_uri,
+                args.gunicorn_workers,
+                cache_dir,
+                hash_method=None if args.database_uri else HASH_METHOD,
+            )
+            try:
+                sessions = [
+                    HttpSession(url, context, args.password)
+                    for context in contexts
+                ]
+                results['gunicorn'] = measure(sessions, args.requests)
+            finally:
+                server.terminate()
+                server.wait()
+
+    report(results, baseline)
+
+    if args.json:
+        with open(args.json, 'w') as fh:
+            json.dump({
+                'revision': _revision(),
+                **size,
+                'requests': args.requests,
+                'concurrency': args.concurrency,
+                'results': results,
+            }, fh, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,155 @@
+"""Login throughput under concurrency, per password hashing limit.
+
+Creates a throwaway SQLite database with one user, then fires
+``--requests`` logins at ``users_bp.login`` from ``--concurrency``
+threads, once per ``--limits`` setting of
+``PASSWORD_HASH_CONCURRENCY`` (``0`` means no limit). With ``--url``
+the logins go to a running server instead, and the user must already
+exist.
+
+Usage (from the repository root)::
+
+    python -m benchmarks.login_benchmark --concurrency 8 --limits 0 2
+    python -m benchmarks.login_benchmark --url http://127.0.0.1:8000 \\
+        --username bench --password bench-password
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from app import create_app, db
+from app.users.hashing import password_hasher
+from app.users.models import User
+
+
+def _percentile(timings, fraction):
+    ordered = sorted(timings)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def _summary(timings, elapsed):
+    return {
+        'requests': len(timings),
+        'logins_per_s': round(len(timings) / elapsed, 2),
+        'p50_ms': round(statistics.median(timings), 1),
+        'p95_ms': round(_percentile(timings, 0.95), 1),
+        'max_ms': round(max(timings), 1),
+    }
+
+
+def run(login, requests, concurrency):
+    def timed(_):
+        started = time.perf_counter()
+        login()
+        return (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        timings = list(executor.map(timed, range(requests)))
+    return _summary(timings, time.perf_counter() - started)
+
+
+def remote_login(url, username, password):
+    data = urllib.parse.urlencode({
+        'username': username,
+        'password': password,
+    }).encode()
+    opener = urllib.request.build_opener(_NoRedirect)
+
+    def login():
+        try:
+            opener.open(f'{url}/users/login', data)
+        except urllib.error.HTTPError as error:
+            if error.code != 302:
+                raise
+    return login
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+def local_login(app, username, password):
+    clients = threading.local()
+
+    def login():
+        if not hasattr(clients, 'client'):
+            clients.client = app.test_client()
+        response = clients.client.post('/users/login', data={
+            'username': username,
+            'password': password,
+        })
+        assert response.status_code == 302, response.status_code
+        clients.client.post('/users/logout')
+    return login
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=64)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--limits', type=int, nargs='+', default=[0, 2])
+    parser.add_argument('--method', help='PASSWORD_HASH_METHOD to use')
+    parser.add_argument('--url', help='benchmark a running server instead')
+    parser.add_argument('--username', default='bench')
+    parser.add_argument('--password', default='bench-password')
+    parser.add_argument('--json', help='write results to this file')
+    args = parser.parse_args()
+
+    results = {}
+    if args.url:
+        login = remote_login(args.url, args.username, args.password)
+        results[args.url] = run(login, args.requests, args.concurrency)
+    else:
+        with tempfile.TemporaryDirectory() as tmp:
+            config = {
+                'SQLALCHEMY_DATABASE_URI':
+                    f"sqlite:///{os.path.join(tmp, 'bench.db')}",
+                'WTF_CSRF_ENABLED': False,
+            }
+            if args.method:
+                config['PASSWORD_HASH_METHOD'] = args.method
+            app = create_app(config, blueprints=['users'])
+            with app.app_context():
+                db.create_all()
+                user = User(username=args.username)
+                user.set_password(args.password)
+                db.session.add(user)
+                db.session.commit()
+
+            for limit in args.limits:
+                app.config['PASSWORD_HASH_CONCURRENCY'] = limit
+                password_hasher.init_app(app)
+                login = local_login(app, args.username, args.password)
+                login()
+                results[f'limit={limit}'] = run(
+                    login, args.requests, args.concurrency
+                )
+            with app.app_context():
+                db.engine.dispose()
+
+    for name, result in results.items():
+        print(f"{name:>24}: {result['logins_per_s']:>8.2f} logins/s  "
+              f"p50 {result['p50_ms']:.1f} ms  "
+              f"p95 {result['p95_ms']:.1f} ms  "
+              f"max {result['max_ms']:.1f} ms")
+
+    if args.json:
+        with open(args.json, 'w') as fh:
+            json.dump({
+                'concurrency': args.concurrency,
+                'results': results,
+            }, fh, indent=2)
+
+
+if __name__ == '__main__':
+    main()
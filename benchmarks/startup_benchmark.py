@@ -0,0 +1,109 @@
+"""Application startup cost per blueprint selection, from -X importtime.
+
+Each scenario runs ``create_app`` in a fresh interpreter with
+``python -X importtime``. It reports the median wall time to build the
+app, the total import time and the heaviest modules imported on the
+way. This is the cost paid by every gunicorn master before it forks
+(or by each worker without ``--preload``), every test process and every
+``flask`` CLI invocation.
+
+Usage (from the repository root)::
+
+    python -m benchmarks.startup_benchmark --repeat 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+SCENARIOS = {
+    'import only': None,
+    'users': ['users'],
+    'users+products': ['users', 'products'],
+    'all blueprints': ['users', 'products', 'expenses'],
+}
+
+SCRIPT = """
+import time
+started = time.perf_counter()
+from app import create_app
+blueprints = {blueprints!r}
+if blueprints is not None:
+    create_app(blueprints=blueprints)
+print(time.perf_counter() - started)
+"""
+
+
+def run_once(blueprints):
+    env = dict(os.environ, DATABASE_URI='sqlite:///:memory:')
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c',
+         SCRIPT.format(blueprints=blueprints)],
+        capture_output=True,
+        text=True,
+        check=True,
+        env=env,
+    )
+
+    modules = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        modules[name.strip()] = (int(self_us), int(cumulative_us))
+    return float(result.stdout.strip().splitlines()[-1]) * 1000, modules
+
+
+def measure(blueprints, repeat, top):
+    timings = []
+    for _ in range(repeat):
+        wall_ms, modules = run_once(blueprints)
+        timings.append(wall_ms)
+
+    heaviest = sorted(
+        ((name, cumulative) for name, (_, cumulative) in modules.items()
+         if not name.startswith(' ') or name.strip().startswith('app')),
+        key=lambda item: item[1],
+        reverse=True
+    )[:top]
+    return {
+        'median_ms': round(statistics.median(timings), 1),
+        'modules': len(modules),
+        'import_ms': round(
+            sum(self_us for self_us, _ in modules.values()) / 1000, 1
+        ),
+        'heaviest': [
+            {'module': name.strip(), 'cumulative_ms': round(us / 1000, 1)}
+            for name, us in heaviest
+        ],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--top', type=int, default=8)
+    parser.add_argument('--json', help='write results to this file')
+    args = parser.parse_args()
+
+    results = {
+        name: measure(blueprints, args.repeat, args.top)
+        for name, blueprints in SCENARIOS.items()
+    }
+
+    for name, result in results.items():
+        print(f"\n{name}: {result['median_ms']:.1f} ms median, "
+              f"{result['modules']} modules, "
+              f"{result['import_ms']:.1f} ms importing")
+        for module in result['heaviest']:
+            print(f"  {module['cumulative_ms']:>8.1f} ms  {module['module']}")
+
+    if args.json:
+        with open(args.json, 'w') as fh:
+            json.dump(results, fh, indent=2)
+
+
+if __name__ == '__main__':
+    main()
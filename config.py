@@ -0,0 +1,90 @@
+import os
+
+EXPENSES_PER_PAGE = 20
+
+# Directory shared by all workers for cache version stamps; unset keeps
+# the versions in process memory.
+CACHE_VERSION_DIR = os.getenv('CACHE_VERSION_DIR')
+
+# Statements slower than this many milliseconds are logged with the
+# endpoint that issued them.
+SLOW_QUERY_MS = int(os.getenv('SLOW_QUERY_MS', '200'))
+
+# Logged-in user identities kept in memory by the login manager's user
+# loader: at most USER_CACHE_SIZE entries, each trusted for
+# USER_CACHE_TTL seconds.
+USER_CACHE_SIZE = int(os.getenv('USER_CACHE_SIZE', '1024'))
+USER_CACHE_TTL = int(os.getenv('USER_CACHE_TTL', '300'))
+
+# Werkzeug hashing method for new passwords, e.g. "scrypt:32768:8:1" or
+# "pbkdf2:sha256:1000000". Hashes made with another method are upgraded
+# on the next successful login.
+PASSWORD_HASH_METHOD = os.getenv('PASSWORD_HASH_METHOD', 'scrypt')
+
+# Most passwords one process hashes at the same time; 0 means no limit.
+PASSWORD_HASH_CONCURRENCY = int(os.getenv('PASSWORD_HASH_CONCURRENCY', '2'))
+
+# Deployment profile selected with APP_PROFILE. Each profile's settings
+# are applied on top of the values above.
+APP_PROFILE = os.getenv('APP_PROFILE', 'dev')
+
+PROFILES = {
+    'dev': {
+        'SQLALCHEMY_ENGINE_OPTIONS': {},
+        'SQLITE_PRAGMAS': {},
+    },
+    'sqlite-prod': {
+        # SQLite allows a single writer, so a small pool is enough; WAL
+        # lets readers proceed while it writes.
+        'SQLALCHEMY_ENGINE_OPTIONS': {
+            'pool_size': int(os.getenv('DB_POOL_SIZE', '5')),
+            'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', '5')),
+            'pool_timeout': 10,
+        },
+        'SQLITE_PRAGMAS': {
+            'journal_mode': 'WAL',
+            'synchronous': 'NORMAL',
+            'mmap_size': 256 * 1024 * 1024,
+            'busy_timeout': 5000,
+        },
+    },
+    'postgres-prod': {
+        'SQLALCHEMY_ENGINE_OPTIONS': {
+            'pool_size': int(os.getenv('DB_POOL_SIZE', '10')),
+            'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', '20')),
+            'pool_timeout': 30,
+            'pool_pre_ping': True,
+            'pool_recycle': 1800,
+        },
+        'SQLITE_PRAGMAS': {},
+    },
+}
+
+# Flask-Migrate (and Alembic with it) is only set up for the flask CLI,
+# where the "db" commands live; importing it is a large share of
+# startup time for web workers and tests.
+MIGRATIONS = os.getenv('FLASK_RUN_FROM_CLI') == 'true'
+
+# With DATABASE_REPLICA_URI set, read-only expense pages query the
+# replica, except for this many seconds after the user's own write.
+REPLICA_STICKY_SECONDS = int(os.getenv('REPLICA_STICKY_SECONDS', '5'))
+
+# ETags and 304 responses for the expense pages. The pages take their
+# ETag from the cache versions, which other worker processes only see
+# through CACHE_VERSION_DIR, so this is off by default without it: a
+# worker could answer 304 for a page that another worker changed.
+CONDITIONAL_GET = os.getenv(
+    'CONDITIONAL_GET',
+    '1' if CACHE_VERSION_DIR else '0'
+) == '1'
+
+# Rendered pages that depend on neither the database nor the user are
+# kept in memory up to this many bytes, keyed also by these cookies.
+PAGE_CACHE_BYTES = int(os.getenv('PAGE_CACHE_BYTES', str(4 * 1024 * 1024)))
+PAGE_CACHE_COOKIES = ('theme',)
+PAGE_CACHE_PREWARM = os.getenv('PAGE_CACHE_PREWARM', '1') == '1'
+
+PRODUCTS_PER_PAGE = 24
+
+# Largest page the JSON API returns; clients pick the size with per_page.
+API_MAX_PER_PAGE = int(os.getenv('API_MAX_PER_PAGE', '100'))
@@ -0,0 +1,69 @@
+"""Add expenses full-text search
+
+Revision ID: 8a4f2b61c0d9
+Revises: 5c1d7a9e2f43
+Create Date: 2026-10-18 13:40:05.117402
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8a4f2b61c0d9'
+down_revision = '5c1d7a9e2f43'
+branch_labels = None
+depends_on = None
+
+
+SQLITE_UPGRADE = [
+    "CREATE VIRTUAL TABLE expenses_fts USING fts5("
+    "title, description, content='expenses', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+    "CREATE TRIGGER expenses_fts_ai AFTER INSERT ON expenses "
+    "BEGIN INSERT INTO expenses_fts(rowid, title, description) "
+    "VALUES (new.id, new.title, new.description); END",
+    "CREATE TRIGGER expenses_fts_ad AFTER DELETE ON expenses "
+    "BEGIN INSERT INTO expenses_fts(expenses_fts, rowid, title, description) "
+    "VALUES ('delete', old.id, old.title, old.description); END",
+    "CREATE TRIGGER expenses_fts_au "
+    "AFTER UPDATE OF title, description ON expenses "
+    "BEGIN INSERT INTO expenses_fts(expenses_fts, rowid, title, description) "
+    "VALUES ('delete', old.id, old.title, old.description); "
+    "INSERT INTO expenses_fts(rowid, title, description) "
+    "VALUES (new.id, new.title, new.description); END",
+    "INSERT INTO expenses_fts(expenses_fts) VALUES ('rebuild')",
+]
+
+SQLITE_DOWNGRADE = [
+    "DROP TRIGGER IF EXISTS expenses_fts_au",
+    "DROP TRIGGER IF EXISTS expenses_fts_ad",
+    "DROP TRIGGER IF EXISTS expenses_fts_ai",
+    "DROP TABLE IF EXISTS expenses_fts",
+]
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        for statement in SQLITE_UPGRADE:
+            op.execute(statement)
+    elif dialect == 'postgresql':
+        op.create_index(
+            'ix_expenses_search',
+            'expenses',
+            [sa.text(
+                "to_tsvector('simple', "
+                "title || ' ' || coalesce(description, ''))"
+            )],
+            postgresql_using='gin'
+        )
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        for statement in SQLITE_DOWNGRADE:
+            op.execute(statement)
+    elif dialect == 'postgresql':
+        op.drop_index('ix_expenses_search', table_name='expenses')
@@ -0,0 +1,175 @@
+"""Drop expenses owner_username
+
+Revision ID: a9d03e5b7c18
+Revises: f41a6c3e9d20
+Create Date: 2026-10-18 21:31:09.774520
+
+Contract step: finishes the owner_id backfill for rows written since the
+expand step, makes ``owner_id`` a required foreign key, moves the
+owner indexes and the ``user_category_totals`` rollup onto it and
+drops ``owner_username``. On PostgreSQL the indexes are rebuilt
+concurrently; SQLite has to copy the table to change the column.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a9d03e5b7c18'
+down_revision = 'f41a6c3e9d20'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 10000
+
+OWNER_INDEXES = {
+    'ix_expenses_owner_date': 'date',
+    'ix_expenses_owner_amount': 'amount',
+    'ix_expenses_owner_title': 'title',
+}
+
+MONTH_START = {
+    'sqlite': "date(date, 'start of month')",
+    'postgresql': "CAST(date_trunc('month', date) AS DATE)",
+}
+
+SQLITE_FTS_TRIGGERS = [
+    "CREATE TRIGGER IF NOT EXISTS expenses_fts_ai AFTER INSERT ON expenses "
+    "WHEN NOT EXISTS (SELECT 1 FROM expenses_fts_deferred) "
+    "BEGIN INSERT INTO expenses_fts(rowid, title, description) "
+    "VALUES (new.id, new.title, new.description); END",
+    "CREATE TRIGGER IF NOT EXISTS expenses_fts_ad AFTER DELETE ON expenses "
+    "BEGIN INSERT INTO expenses_fts(expenses_fts, rowid, title, description) "
+    "VALUES ('delete', old.id, old.title, old.description); END",
+    "CREATE TRIGGER IF NOT EXISTS expenses_fts_au "
+    "AFTER UPDATE OF title, description ON expenses "
+    "BEGIN INSERT INTO expenses_fts(expenses_fts, rowid, title, description) "
+    "VALUES ('delete', old.id, old.title, old.description); "
+    "INSERT INTO expenses_fts(rowid, title, description) "
+    "VALUES (new.id, new.title, new.description); END",
+]
+
+
+def backfill_owner_id(bind):
+    low, high = bind.execute(
+        sa.text("SELECT min(id), max(id) FROM expenses WHERE owner_id IS NULL")
+    ).one()
+    if low is None:
+        return
+
+    for start in range(low, high + 1, BATCH_SIZE):
+        bind.execute(
+            sa.text(
+                "UPDATE expenses SET owner_id = ("
+                "SELECT users.id FROM users "
+                "WHERE users.username = expenses.owner_username) "
+                "WHERE id >= :start AND id < :end AND owner_id IS NULL"
+            ),
+            {'start': start, 'end': start + BATCH_SIZE}
+        )
+
+
+def rebuild_totals(owner_column, owner_type, owner_fk):
+    dialect = op.get_bind().dialect.name
+    month = MONTH_START.get(dialect, MONTH_START['postgresql'])
+
+    op.drop_table('user_category_totals')
+    op.create_table('user_category_totals',
+    sa.Column(owner_column, owner_type, nullable=False),
+    sa.Column('category_id', sa.Integer(), nullable=False),
+    sa.Column('month', sa.Date(), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.Column('total', sa.Float(), nullable=False),
+    sa.Column('min_amount', sa.Float(), nullable=False),
+    sa.Column('max_amount', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['category_id'], ['expense_categories.id'], ),
+    *owner_fk,
+    sa.PrimaryKeyConstraint(owner_column, 'category_id', 'month')
+    )
+    with op.batch_alter_table('user_category_totals', schema=None) as batch_op:
+        batch_op.create_index('ix_user_category_totals_category', ['category_id'], unique=False)
+
+    op.execute(
+        f"INSERT INTO user_category_totals ({owner_column}, category_id, "
+        "month, count, total, min_amount, max_amount) "
+        f"SELECT {owner_column}, category_id, {month}, count(id), "
+        "sum(amount), min(amount), max(amount) FROM expenses "
+        f"GROUP BY {owner_column}, category_id, {month}"
+    )
+
+
+def upgrade():
+    bind = op.get_bind()
+    dialect = bind.dialect.name
+
+    with op.get_context().autocommit_block():
+        backfill_owner_id(bind)
+
+        if dialect == 'postgresql':
+            for name, column in OWNER_INDEXES.items():
+                op.drop_index(
+                    name,
+                    table_name='expenses',
+                    postgresql_concurrently=True
+                )
+                op.create_index(
+                    name,
+                    'expenses',
+                    ['owner_id', column, 'id'],
+                    postgresql_concurrently=True
+                )
+
+    with op.batch_alter_table('expenses', schema=None) as batch_op:
+        if dialect != 'postgresql':
+            for name in OWNER_INDEXES:
+                batch_op.drop_index(name)
+        batch_op.alter_column('owner_id',
+               existing_type=sa.Integer(),
+               nullable=False)
+        batch_op.create_foreign_key('fk_expenses_owner_id_users', 'users', ['owner_id'], ['id'])
+        batch_op.drop_column('owner_username')
+        if dialect != 'postgresql':
+            for name, column in OWNER_INDEXES.items():
+                batch_op.create_index(name, ['owner_id', column, 'id'], unique=False)
+
+    if dialect == 'sqlite':
+        for statement in SQLITE_FTS_TRIGGERS:
+            op.execute(statement)
+
+    rebuild_totals(
+        'owner_id',
+        sa.Integer(),
+        [sa.ForeignKeyConstraint(['owner_id'], ['users.id'], )]
+    )
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+
+    with op.batch_alter_table('expenses', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('owner_username', sa.String(length=100), nullable=True))
+
+    op.execute(
+        "UPDATE expenses SET owner_username = ("
+        "SELECT users.username FROM users WHERE users.id = expenses.owner_id)"
+    )
+
+    with op.batch_alter_table('expenses', schema=None) as batch_op:
+        for name in OWNER_INDEXES:
+            batch_op.drop_index(name)
+        batch_op.alter_column('owner_username',
+               existing_type=sa.String(length=100),
+               nullable=False)
+        batch_op.drop_constraint('fk_expenses_owner_id_users', type_='foreignkey')
+        batch_op.alter_column('owner_id',
+               existing_type=sa.Integer(),
+               nullable=True)
+        for name, column in OWNER_INDEXES.items():
+            batch_op.create_index(name, ['owner_username', column, 'id'], unique=False)
+
+    if dialect == 'sqlite':
+        for statement in SQLITE_FTS_TRIGGERS:
+            op.execute(statement)
+
+    rebuild_totals('owner_username', sa.String(length=100), [])
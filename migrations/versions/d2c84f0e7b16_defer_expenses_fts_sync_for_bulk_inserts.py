@@ -0,0 +1,45 @@
+"""Defer expenses FTS sync for bulk inserts
+
+Revision ID: d2c84f0e7b16
+Revises: b37e91d4a5c2
+Create Date: 2026-10-18 19:25:47.902614
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd2c84f0e7b16'
+down_revision = 'b37e91d4a5c2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+
+    op.execute(
+        "CREATE TABLE expenses_fts_deferred (id INTEGER PRIMARY KEY)"
+    )
+    op.execute("DROP TRIGGER IF EXISTS expenses_fts_ai")
+    op.execute(
+        "CREATE TRIGGER expenses_fts_ai AFTER INSERT ON expenses "
+        "WHEN NOT EXISTS (SELECT 1 FROM expenses_fts_deferred) "
+        "BEGIN INSERT INTO expenses_fts(rowid, title, description) "
+        "VALUES (new.id, new.title, new.description); END"
+    )
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+
+    op.execute("DROP TRIGGER IF EXISTS expenses_fts_ai")
+    op.execute(
+        "CREATE TRIGGER expenses_fts_ai AFTER INSERT ON expenses "
+        "BEGIN INSERT INTO expenses_fts(rowid, title, description) "
+        "VALUES (new.id, new.title, new.description); END"
+    )
+    op.execute("DROP TABLE IF EXISTS expenses_fts_deferred")
@@ -0,0 +1,60 @@
+"""Add expenses owner_id
+
+Revision ID: f41a6c3e9d20
+Revises: d2c84f0e7b16
+Create Date: 2026-10-18 21:14:52.336071
+
+Expand step: adds a nullable ``owner_id`` and backfills it from
+``owner_username`` in id ranges, each committed on its own, so writers
+are never blocked for longer than one batch. Expenses whose owner never
+registered get a placeholder account with an unusable password.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f41a6c3e9d20'
+down_revision = 'd2c84f0e7b16'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 10000
+
+
+def backfill_owner_id(bind):
+    low, high = bind.execute(
+        sa.text("SELECT min(id), max(id) FROM expenses")
+    ).one()
+    if low is None:
+        return
+
+    for start in range(low, high + 1, BATCH_SIZE):
+        bind.execute(
+            sa.text(
+                "UPDATE expenses SET owner_id = ("
+                "SELECT users.id FROM users "
+                "WHERE users.username = expenses.owner_username) "
+                "WHERE id >= :start AND id < :end AND owner_id IS NULL"
+            ),
+            {'start': start, 'end': start + BATCH_SIZE}
+        )
+
+
+def upgrade():
+    op.add_column('expenses', sa.Column('owner_id', sa.Integer(), nullable=True))
+
+    op.execute(
+        "INSERT INTO users (username, password_hash) "
+        "SELECT DISTINCT owner_username, '!' FROM expenses "
+        "WHERE owner_username NOT IN (SELECT username FROM users)"
+    )
+
+    with op.get_context().autocommit_block():
+        backfill_owner_id(op.get_bind())
+
+
+def downgrade():
+    with op.batch_alter_table('expenses', schema=None) as batch_op:
+        batch_op.drop_column('owner_id')
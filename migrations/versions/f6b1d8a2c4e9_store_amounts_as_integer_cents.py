@@ -0,0 +1,190 @@
+"""Store amounts as integer cents
+
+Revision ID: f6b1d8a2c4e9
+Revises: e5a90c3d7f21
+Create Date: 2026-10-19 10:12:41.518730
+
+``expenses.amount`` becomes a BIGINT number of cents. The new values
+are written to ``new_amount`` in id ranges, each committed on its own,
+then rows written meanwhile are caught up in the migration's own
+transaction before the columns are swapped. Amounts are converted in
+Python with the application's rule, half up from the float's shortest
+repr, so 1.005 becomes 101 cents where ``ROUND(amount * 100)`` would
+give 100. The rollups are then recomputed from the converted amounts
+rather than converted themselves, so any float drift they had
+accumulated is gone too.
+
+"""
+from decimal import ROUND_HALF_UP, Decimal
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f6b1d8a2c4e9'
+down_revision = 'e5a90c3d7f21'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 10000
+
+AMOUNT_INDEXES = {
+    'ix_expenses_owner_amount': ['owner_id', 'amount', 'id'],
+    'ix_expenses_amount': ['amount', 'id'],
+    'ix_expenses_category_amount': ['category_id', 'amount'],
+}
+
+ROLLUP_COLUMNS = {
+    'user_category_totals': ('total', 'min_amount', 'max_amount'),
+    'user_daily_totals': ('total',),
+}
+
+MONTH_START = {
+    'sqlite': "date(date, 'start of month')",
+    'postgresql': "CAST(date_trunc('month', date) AS DATE)",
+}
+
+DAY_START = {
+    'sqlite': 'date(date)',
+    'postgresql': 'CAST(date AS DATE)',
+}
+
+SQLITE_FTS_TRIGGERS = [
+    "CREATE TRIGGER IF NOT EXISTS expenses_fts_ai AFTER INSERT ON expenses "
+    "WHEN NOT EXISTS (SELECT 1 FROM expenses_fts_deferred) "
+    "BEGIN INSERT INTO expenses_fts(rowid, title, description) "
+    "VALUES (new.id, new.title, new.description); END",
+    "CREATE TRIGGER IF NOT EXISTS expenses_fts_ad AFTER DELETE ON expenses "
+    "BEGIN INSERT INTO expenses_fts(expenses_fts, rowid, title, description) "
+    "VALUES ('delete', old.id, old.title, old.description); END",
+    "CREATE TRIGGER IF NOT EXISTS expenses_fts_au "
+    "AFTER UPDATE OF title, description ON expenses "
+    "BEGIN INSERT INTO expenses_fts(expenses_fts, rowid, title, description) "
+    "VALUES ('delete', old.id, old.title, old.description); "
+    "INSERT INTO expenses_fts(rowid, title, description) "
+    "VALUES (new.id, new.title, new.description); END",
+]
+
+
+def to_cents(amount):
+    return int(
+        Decimal(repr(float(amount)))
+        .quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+        .scaleb(2)
+    )
+
+
+def from_cents(cents):
+    return cents / 100
+
+
+def backfill(bind, convert, catch_up=False):
+    """Write ``convert(amount)`` to ``new_amount`` in id ranges; with
+    ``catch_up`` only rows whose value is missing or out of date."""
+    low, high = bind.execute(
+        sa.text("SELECT min(id), max(id) FROM expenses")
+    ).one()
+    if low is None:
+        return
+
+    for start in range(low, high + 1, BATCH_SIZE):
+        rows = bind.execute(
+            sa.text(
+                "SELECT id, amount, new_amount FROM expenses "
+                "WHERE id >= :start AND id < :end"
+            ),
+            {'start': start, 'end': start + BATCH_SIZE}
+        )
+        values = []
+        for id, amount, current in rows:
+            value = convert(amount)
+            if not catch_up or value != current:
+                values.append({'id': id, 'value': value})
+        if values:
+            bind.execute(
+                sa.text("UPDATE expenses SET new_amount = :value "
+                        "WHERE id = :id"),
+                values
+            )
+
+
+def swap_amount(new_type, convert):
+    """Replace ``expenses.amount`` by a column of ``new_type`` filled
+    with ``convert`` applied to the old ``amount``."""
+    bind = op.get_bind()
+    dialect = bind.dialect.name
+
+    op.add_column('expenses', sa.Column('new_amount', new_type, nullable=True))
+    with op.get_context().autocommit_block():
+        backfill(bind, convert)
+
+    # Rows inserted or changed while the batches ran; writers wait for
+    # the swap from here on.
+    if dialect == 'postgresql':
+        op.execute("LOCK TABLE expenses IN SHARE ROW EXCLUSIVE MODE")
+    backfill(bind, convert, catch_up=True)
+
+    with op.batch_alter_table('expenses', schema=None) as batch_op:
+        for name in AMOUNT_INDEXES:
+            batch_op.drop_index(name)
+        batch_op.drop_column('amount')
+        batch_op.alter_column('new_amount',
+               new_column_name='amount',
+               existing_type=new_type,
+               nullable=False)
+
+    if dialect == 'postgresql':
+        with op.get_context().autocommit_block():
+            for name, columns in AMOUNT_INDEXES.items():
+                op.create_index(
+                    name,
+                    'expenses',
+                    columns,
+                    postgresql_concurrently=True
+                )
+    else:
+        with op.batch_alter_table('expenses', schema=None) as batch_op:
+            for name, columns in AMOUNT_INDEXES.items():
+                batch_op.create_index(name, columns, unique=False)
+
+    if dialect == 'sqlite':
+        for statement in SQLITE_FTS_TRIGGERS:
+            op.execute(statement)
+
+
+def rebuild_rollups(money_type):
+    dialect = op.get_bind().dialect.name
+    month = MONTH_START.get(dialect, MONTH_START['postgresql'])
+    day = DAY_START.get(dialect, DAY_START['postgresql'])
+
+    for table, columns in ROLLUP_COLUMNS.items():
+        op.execute(f"DELETE FROM {table}")
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            for column in columns:
+                batch_op.alter_column(column,
+                       type_=money_type,
+                       existing_nullable=False)
+
+    op.execute(
+        "INSERT INTO user_category_totals (owner_id, category_id, month, "
+        "count, total, min_amount, max_amount) "
+        f"SELECT owner_id, category_id, {month}, count(id), sum(amount), "
+        "min(amount), max(amount) FROM expenses "
+        f"GROUP BY owner_id, category_id, {month}"
+    )
+    op.execute(
+        "INSERT INTO user_daily_totals (owner_id, day, category_id, count, "
+        f"total) SELECT owner_id, {day}, category_id, count(id), "
+        f"sum(amount) FROM expenses GROUP BY owner_id, {day}, category_id"
+    )
+
+
+def upgrade():
+    swap_amount(sa.BigInteger(), to_cents)
+    rebuild_rollups(sa.BigInteger())
+
+
+def downgrade():
+    swap_amount(sa.Float(), from_cents)
+    rebuild_rollups(sa.Float())
@@ -0,0 +1,429 @@
+import json
+import unittest
+from datetime import datetime, timezone, timedelta
+
+from app import create_app, db
+from app.api.encoding import dumps
+from app.expenses import daily, rollup
+from app.instrumentation import count_queries, max_queries
+from app.expenses.models import Expense, ExpenseCategory
+from app.users.models import User
+
+
+class ExpensesApiTestCase(unittest.TestCase):
+    def setUp(self):
+        """Set up test client and database before each test"""
+        self.app = create_app({
+            'TESTING': True,
+            'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:',
+            'WTF_CSRF_ENABLED': False,
+        })
+
+        self.client = self.app.test_client()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+
+        db.create_all()
+
+        self.test_user = User(username='testuser')
+        self.test_user.set_password('testpass')
+        self.other_user = User(username='otheruser')
+        self.other_user.set_password('otherpass')
+        self.category = ExpenseCategory(name='Food', description='Groceries')
+        db.session.add_all([self.test_user, self.other_user, self.category])
+        db.session.commit()
+
+    def tearDown(self):
+        """Clean up after each test"""
+        db.session.rollback()
+        db.session.close()
+        db.drop_all()
+        db.engine.dispose()
+        self.app_context.pop()
+
+    def login(self):
+        return self.client.post('/users/login', data={
+            'username': 'testuser',
+            'password': 'testpass'
+        })
+
+    def add_expense(self, title, amount=10.0, owner=None, days_ago=0):
+        expense = Expense(
+            title=title,
+            amount=amount,
+            date=datetime.now(timezone.utc) - timedelta(days=days_ago),
+            category_id=self.category.id,
+            owner_id=(owner or self.test_user).id
+        )
+        db.session.add(expense)
+        db.session.commit()
+        return expense.id
+
+    def test_requires_login(self):
+        """Test: API answers 401 in JSON instead of redirecting"""
+        response = self.client.get('/api/v1/expenses')
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json['error'], 'Unauthorized')
+
+    def test_create_and_get_expense(self):
+        """Test: created expense is returned and can be fetched"""
+        self.login()
+        response = self.client.post('/api/v1/expenses', json={
+            'title': 'Groceries',
+            'amount': 12.5,
+            'date': '2024-03-01',
+            'category_id': self.category.id,
+        })
+        self.assertEqual(response.status_code, 201)
+        created = response.json
+        self.assertEqual(created['title'], 'Groceries')
+        self.assertEqual(created['amount'], '12.50')
+        self.assertEqual(created['date'], '2024-03-01')
+        self.assertEqual(created['owner_id'], self.test_user.id)
+
+        response = self.client.get(response.headers['Location'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json, created)
+
+    def test_create_validates_like_form(self):
+        """Test: invalid payloads get the ExpenseForm errors"""
+        self.login()
+        response = self.client.post('/api/v1/expenses', json={
+            'title': 'ab',
+            'amount': 0,
+            'date': 'yesterday',
+            'category_id': 999,
+        })
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(
+            set(response.json['errors']),
+            {'title', 'amount', 'date', 'category_id'}
+        )
+        self.assertEqual(Expense.query.count(), 0)
+
+        for field, value in [('title', ['a', 'b']),
+                             ('title', {'name': 'Lunch'}),
+                             ('description', True),
+                             ('amount', False),
+                             ('amount', [12]),
+                             ('category_id', {'id': self.category.id})]:
+            payload = {
+                'title': 'Lunch',
+                'amount': 12,
+                'date': '2024-03-01',
+                'category_id': self.category.id,
+            }
+            payload[field] = value
+            response = self.client.post('/api/v1/expenses', json=payload)
+            self.assertEqual(response.status_code, 422, payload)
+            self.assertEqual(set(response.json['errors']), {field}, payload)
+        self.assertEqual(Expense.query.count(), 0)
+
+        response = self.client.post(
+            '/api/v1/expenses',
+            data='title=Groceries',
+            content_type='application/x-www-form-urlencoded'
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_sparse_fields_load_only_requested_columns(self):
+        """Test: fields= limits both the payload and the loaded columns"""
+        self.login()
+        expense_id = self.add_expense('Lunch')
+
+        db.session.expire_all()
+        with count_queries(self.app) as stats:
+            response = self.client.get(
+                f'/api/v1/expenses/{expense_id}?fields=title,amount'
+            )
+        self.assertEqual(response.json, {'title': 'Lunch', 'amount': '10.00'})
+        select = [s for s in stats.statements if 'FROM expenses' in s][0]
+        self.assertNotIn('description', select)
+        self.assertNotIn('created_at', select)
+
+        response = self.client.get(f'/api/v1/expenses/{expense_id}?fields=id')
+        self.assertEqual(response.json, {'id': expense_id})
+
+        response = self.client.get('/api/v1/expenses?fields=id')
+        self.assertEqual(response.json['items'], [{'id': expense_id}])
+
+        response = self.client.get('/api/v1/expenses?fields=title,secret')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('secret', response.json['message'])
+
+    def test_list_pages_with_cursor(self):
+        """Test: list is paginated with keyset cursors"""
+        self.login()
+        for i in range(5):
+            self.add_expense(f'Paged {i}', days_ago=i)
+        self.add_expense('Not mine', owner=self.other_user, days_ago=9)
+
+        titles = []
+        url = '/api/v1/expenses?scope=mine&per_page=2&fields=id,title'
+        cursor = None
+        while True:
+            response = self.client.get(
+                url + (f'&cursor={cursor}' if cursor else '')
+            )
+            self.assertEqual(response.status_code, 200)
+            titles += [item['title'] for item in response.json['items']]
+            cursor = response.json['next_cursor']
+            if cursor is None:
+                break
+        self.assertEqual(titles, [f'Paged {i}' for i in range(5)])
+
+        response = self.client.get('/api/v1/expenses?cursor=nope')
+        self.assertEqual(response.status_code, 400)
+
+    def test_list_query_budget(self):
+        """Test: a page of the API list is a single query"""
+        self.login()
+        for i in range(30):
+            self.add_expense(f'Budget {i}')
+
+        db.session.expire_all()
+        with max_queries(2, self.app):
+            response = self.client.get('/api/v1/expenses?per_page=25')
+        self.assertEqual(len(response.json['items']), 25)
+
+    def test_update_and_delete_expense(self):
+        """Test: owners can patch and delete, others cannot"""
+        self.login()
+        expense_id = self.add_expense('Lunch')
+        other_id = self.add_expense('Theirs', owner=self.other_user)
+
+        response = self.client.patch(
+            f'/api/v1/expenses/{expense_id}',
+            json={'amount': 42}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json['amount'], '42.00')
+        self.assertEqual(response.json['title'], 'Lunch')
+
+        response = self.client.put(
+            f'/api/v1/expenses/{expense_id}',
+            json={'amount': 42}
+        )
+        self.assertEqual(response.status_code, 422)
+
+        response = self.client.patch(
+            f'/api/v1/expenses/{other_id}',
+            json={'amount': 1}
+        )
+        self.assertEqual(response.status_code, 403)
+        response = self.client.delete(f'/api/v1/expenses/{other_id}')
+        self.assertEqual(response.status_code, 403)
+
+        response = self.client.delete(f'/api/v1/expenses/{expense_id}')
+        self.assertEqual(response.status_code, 204)
+        self.assertIsNone(db.session.get(Expense, expense_id))
+        response = self.client.get(f'/api/v1/expenses/{expense_id}')
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.json['error'], 'Not Found')
+
+    def test_batch_delete_by_ids_skips_other_owners(self):
+        """Test: batch delete removes only the user's own expenses"""
+        self.login()
+        ids = [
+            self.add_expense(f'Mine {i}', days_ago=i * 20) for i in range(4)
+        ]
+        other_id = self.add_expense('Theirs', owner=self.other_user)
+
+        with max_queries(12, self.app):
+            response = self.client.post('/api/v1/expenses/batch', json={
+                'action': 'delete',
+                'ids': ids[:3] + [other_id],
+            })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json, {'deleted': 3})
+
+        db.session.expire_all()
+        self.assertEqual(
+            [e.id for e in Expense.query.order_by(Expense.id)],
+            [ids[3], other_id]
+        )
+        self.assertEqual(rollup.find_drift(db.session.connection()), [])
+        self.assertEqual(daily.find_drift(db.session.connection()), [])
+
+    def test_batch_recategorize_by_filter(self):
+        """Test: batch update moves filtered expenses in one statement"""
+        self.login()
+        transport = ExpenseCategory(name='Transport')
+        db.session.add(transport)
+        db.session.commit()
+        for i in range(5):
+            self.add_expense(f'Taxi {i}', amount=5.0 + i, days_ago=i * 10)
+        self.add_expense('Lunch', amount=8.0)
+        self.add_expense('Taxi theirs', owner=self.other_user)
+
+        with count_queries(self.app) as stats:
+            response = self.client.post('/api/v1/expenses/batch', json={
+                'action': 'update',
+                'filter': {'search': 'taxi', 'min_amount': 6},
+                'changes': {'category_id': transport.id},
+            })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json, {'updated': 4})
+        updates = [
+            s for s in stats.statements if s.startswith('UPDATE expenses')
+        ]
+        self.assertEqual(len(updates), 1)
+
+        db.session.expire_all()
+        moved = Expense.query.filter_by(category_id=transport.id).all()
+        self.assertEqual(
+            sorted(e.title for e in moved),
+            ['Taxi 1', 'Taxi 2', 'Taxi 3', 'Taxi 4']
+        )
+        self.assertEqual(rollup.find_drift(db.session.connection()), [])
+        self.assertEqual(daily.find_drift(db.session.connection()), [])
+
+        response = self.client.post('/api/v1/expenses/batch', json={
+            'action': 'update',
+            'filter': {'category_id': transport.id},
+            'changes': {'amount': 3, 'date': '2024-01-15'},
+        })
+        self.assertEqual(response.json, {'updated': 4})
+        db.session.expire_all()
+        self.assertEqual(rollup.find_drift(db.session.connection()), [])
+        self.assertEqual(daily.find_drift(db.session.connection()), [])
+
+    def test_batch_validation(self):
+        """Test: malformed batches are rejected without changes"""
+        self.login()
+        expense_id = self.add_expense('Lunch')
+
+        for payload, field in [
+            ({'action': 'archive', 'ids': [expense_id]}, 'action'),
+            ({'action': 'delete'}, 'selection'),
+            ({'action': 'delete', 'ids': ['1']}, 'ids'),
+            ({'action': 'delete', 'filter': {}}, 'filter'),
+            ({'action': 'delete', 'filter': {'owner_id': 2}}, 'owner_id'),
+            ({'action': 'delete', 'filter': {'date_to': '15.01'}}, 'date_to'),
+            ({'action': 'update', 'ids': [expense_id]}, 'changes'),
+            ({'action': 'update', 'ids': [expense_id],
+              'changes': {'amount': 0}}, 'amount'),
+            ({'action': 'update', 'ids': [expense_id],
+              'changes': {'amount': 1e17}}, 'amount'),
+            ({'action': 'delete',
+              'filter': {'max_amount': '1e17'}}, 'max_amount'),
+            ({'action': 'update', 'ids': [expense_id],
+              'changes': {'category_id': 999}}, 'category_id'),
+            ({'action': 'update', 'ids': [expense_id],
+              'changes': {'title': 'x'}}, 'title'),
+        ]:
+            response = self.client.post(
+                '/api/v1/expenses/batch',
+                json=payload
+            )
+            self.assertEqual(response.status_code, 422, payload)
+            self.assertIn(field, response.json['errors'], payload)
+
+        db.session.expire_all()
+        self.assertEqual(db.session.get(Expense, expense_id).amount, 10.0)
+
+    def test_summary(self):
+        """Test: summary totals the user's expenses per category"""
+        self.login()
+        self.add_expense('Lunch', amount=10.0)
+        self.add_expense('Dinner', amount=30.0, days_ago=40)
+        self.add_expense('Theirs', amount=99.0, owner=self.other_user)
+
+        response = self.client.get('/api/v1/expenses/summary')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json['count'], 2)
+        self.assertEqual(response.json['total'], '40.00')
+        self.assertEqual(response.json['categories'], [{
+            'category_id': self.category.id,
+            'category': 'Food',
+            'count': 2,
+            'total': '40.00',
+            'min_amount': '10.00',
+            'max_amount': '30.00',
+        }])
+
+    def add_dated(self, title, amount, day, category=None):
+        db.session.add(Expense(
+            title=title,
+            amount=amount,
+            date=datetime.strptime(day, '%Y-%m-%d'),
+            category_id=(category or self.category).id,
+            owner_id=self.test_user.id
+        ))
+        db.session.commit()
+
+    def test_analytics_weekly_buckets(self):
+        """Test: weekly analytics buckets by ISO week in SQL"""
+        self.login()
+        transport = ExpenseCategory(name='Transport')
+        db.session.add(transport)
+        db.session.commit()
+        self.add_dated('Mon', 1.0, '2024-01-01')
+        self.add_dated('Sun', 2.0, '2024-01-07')
+        self.add_dated('Next Mon', 4.0, '2024-01-08')
+        self.add_dated('Bus', 8.0, '2024-01-16', category=transport)
+        self.add_dated('Too late', 16.0, '2024-01-22')
+
+        response = self.client.get(
+            '/api/v1/expenses/analytics'
+            '?granularity=week&from=2024-01-03&to=2024-01-21'
+        )
+        self.assertEqual(response.status_code, 200)
+        data = response.json
+        self.assertEqual(data['from'], '2024-01-01')
+        self.assertEqual(
+            data['buckets'],
+            ['2024-01-01', '2024-01-08', '2024-01-15']
+        )
+        self.assertEqual(
+            [(c['category'], c['totals']) for c in data['categories']],
+            [('Food', ['3.00', '4.00', '0.00']),
+             ('Transport', ['0.00', '0.00', '8.00'])]
+        )
+        self.assertEqual(data['categories'][0]['counts'], [2, 1, 0])
+        self.assertEqual(data['totals'], ['3.00', '4.00', '8.00'])
+
+    def test_analytics_monthly_reads_rollup(self):
+        """Test: monthly analytics come from the rollup table"""
+        self.login()
+        self.add_dated('Old', 5.0, '2021-12-31')
+        self.add_dated('Jan', 10.0, '2022-01-10')
+        self.add_dated('Jan again', 2.5, '2022-01-30')
+        self.add_dated('Mar', 7.0, '2022-03-02')
+
+        db.session.expire_all()
+        with count_queries(self.app) as stats:
+            response = self.client.get(
+                '/api/v1/expenses/analytics'
+                '?granularity=month&from=2022-01-15&to=2022-03-01'
+            )
+        data = response.json
+        self.assertEqual(data['from'], '2022-01-01')
+        self.assertEqual(data['to'], '2022-03-31')
+        self.assertEqual(data['totals'], ['12.50', '0.00', '7.00'])
+        self.assertFalse(
+            [s for s in stats.statements if 'FROM expenses' in s]
+        )
+
+    def test_analytics_rejects_bad_ranges(self):
+        """Test: analytics validates granularity and range"""
+        self.login()
+        for query in [
+            'granularity=hour',
+            'from=2024-02-01&to=2024-01-01',
+            'from=01.01.2024',
+            'granularity=day&from=2000-01-01&to=2024-01-01',
+        ]:
+            response = self.client.get(f'/api/v1/expenses/analytics?{query}')
+            self.assertEqual(response.status_code, 400, query)
+
+    def test_dumps_is_compact_utf8(self):
+        """Test: encoder emits compact UTF-8 JSON"""
+        encoded = dumps({'title': 'Кава', 'amount': 1.5})
+        self.assertEqual(json.loads(encoded), {'title': 'Кава', 'amount': 1.5})
+        self.assertNotIn(b' ', encoded)
+        self.assertIn('Кава'.encode(), encoded)
+
+
+if __name__ == '__main__':
+    unittest.main()
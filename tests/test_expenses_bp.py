@@ -1,22 +1,46 @@
+import csv
+import io
+import json
+import os
+import tempfile
+import re
+import shutil
+import threading
+import time
 import unittest
+from unittest import mock
 from datetime import datetime, timezone, timedelta
+from decimal import Decimal
 
-from app import app, db
-from app.expenses.models import Expense, ExpenseCategory
+from sqlalchemy import exc, inspect, text
+
+from app import create_app, db
+from app.cache import FileVersions
+from app.database import pool_stats
+from app.instrumentation import count_queries, max_queries
+from app.expenses import daily, rollup
+from app.expenses.models import (
+    Expense,
+    ExpenseCategory,
+    UserCategoryTotal,
+    UserDailyTotal
+)
+from app.expenses.pagination import encode_cursor
 from app.users.models import User
 
 
 class ExpensesTestCase(unittest.TestCase):
     def setUp(self):
         """Set up test client and database before each test"""
-        app.config['TESTING'] = True
-        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
-        app.config['WTF_CSRF_ENABLED'] = False
-        app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-        app.config['LOGIN_DISABLED'] = False
-
-        self.client = app.test_client()
-        self.app_context = app.app_context()
+        self.app = create_app({
+            'TESTING': True,
+            'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:',
+            'WTF_CSRF_ENABLED': False,
+            'LOGIN_DISABLED': False,
+        })
+
+        self.client = self.app.test_client()
+        self.app_context = self.app.app_context()
         self.app_context.push()
 
         db.drop_all()
@@ -26,6 +50,10 @@ class ExpensesTestCase(unittest.TestCase):
         self.test_user.set_password('testpass')
         db.session.add(self.test_user)
 
+        self.other_user = User(username='otheruser')
+        self.other_user.set_password('otherpass')
+        db.session.add(self.other_user)
+
         category1 = ExpenseCategory(
             name='Food',
             description='Groceries'
@@ -98,7 +126,41 @@ class ExpensesTestCase(unittest.TestCase):
         expense = Expense.query.filter_by(title='Test Expense').first()
         self.assertIsNotNone(expense)
         self.assertEqual(expense.amount, 100.50)
-        self.assertEqual(expense.owner_username, 'testuser')
+        self.assertEqual(expense.owner.username, 'testuser')
+
+    def test_create_form_caches_categories(self):
+        """Test: category choices are cached until categories change"""
+        self.login()
+        self.client.get('/expenses/create')
+        first = self.count_queries('/expenses/create')
+        second = self.count_queries('/expenses/create')
+        self.assertEqual(first, second)
+
+        self.app.extensions.pop('category_choices')
+        self.assertEqual(self.count_queries('/expenses/create'), first + 1)
+
+        db.session.add(ExpenseCategory(name='Entertainment'))
+        db.session.commit()
+        response = self.client.get('/expenses/create')
+        self.assertIn(b'Entertainment', response.data)
+
+        category = ExpenseCategory.query.filter_by(name='Entertainment').one()
+        category.name = 'Leisure'
+        db.session.commit()
+        response = self.client.get('/expenses/create')
+        self.assertIn(b'Leisure', response.data)
+        self.assertNotIn(b'Entertainment', response.data)
+
+    def test_file_versions_shared_between_stores(self):
+        """Test: file version backend is visible to every process"""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        writer, reader = FileVersions(directory), FileVersions(directory)
+
+        self.assertEqual(reader.get('categories'), 0)
+        version = writer.bump('categories')
+        self.assertEqual(reader.get('categories'), version)
+        self.assertGreater(writer.bump('categories'), version)
 
     def test_expense_detail(self):
         """Test: display detailed expense information"""
@@ -110,7 +172,7 @@ class ExpensesTestCase(unittest.TestCase):
             amount=50.0,
             date=datetime.now(timezone.utc),
             category_id=category.id,
-            owner_username='testuser'
+            owner_id=self.test_user.id
         )
         db.session.add(expense)
         db.session.commit()
@@ -130,7 +192,7 @@ class ExpensesTestCase(unittest.TestCase):
             amount=75.0,
             date=datetime.now(timezone.utc),
             category_id=category.id,
-            owner_username='testuser'
+            owner_id=self.test_user.id
         )
         db.session.add(expense)
         db.session.commit()
@@ -165,7 +227,7 @@ class ExpensesTestCase(unittest.TestCase):
             amount=50.0,
             date=datetime.now(timezone.utc),
             category_id=category.id,
-            owner_username='otheruser'
+            owner_id=self.other_user.id
         )
         db.session.add(expense)
         db.session.commit()
@@ -199,7 +261,7 @@ class ExpensesTestCase(unittest.TestCase):
             amount=25.0,
             date=datetime.now(timezone.utc),
             category_id=category.id,
-            owner_username='testuser'
+            owner_id=self.test_user.id
         )
         db.session.add(expense)
         db.session.commit()
@@ -224,7 +286,7 @@ class ExpensesTestCase(unittest.TestCase):
             amount=50.0,
             date=datetime.now(timezone.utc),
             category_id=category.id,
-            owner_username='otheruser'
+            owner_id=self.other_user.id
         )
         db.session.add(expense)
         db.session.commit()
@@ -248,14 +310,14 @@ class ExpensesTestCase(unittest.TestCase):
             amount=100.0,
             date=datetime.now(timezone.utc),
             category_id=category.id,
-            owner_username='testuser'
+            owner_id=self.test_user.id
         )
         expense2 = Expense(
             title='Transport Payment',
             amount=50.0,
             date=datetime.now(timezone.utc),
             category_id=category.id,
-            owner_username='testuser'
+            owner_id=self.test_user.id
         )
         db.session.add(expense1)
         db.session.add(expense2)
@@ -263,6 +325,66 @@ class ExpensesTestCase(unittest.TestCase):
 
         response = self.client.get('/expenses/?search=grocery')
         self.assertEqual(response.status_code, 200)
+        self.assertIn(b'Grocery Purchase', response.data)
+        self.assertNotIn(b'Transport Payment', response.data)
+
+    def test_search_expenses_description_and_prefix(self):
+        """Test: search matches description words by prefix"""
+        self.login()
+        category = ExpenseCategory.query.first()
+        db.session.add(Expense(
+            title='Weekly shop',
+            description='Vegetables from the farmers market',
+            amount=30.0,
+            date=datetime.now(timezone.utc),
+            category_id=category.id,
+            owner_id=self.test_user.id
+        ))
+        db.session.add(Expense(
+            title='Bus ticket',
+            amount=2.0,
+            date=datetime.now(timezone.utc),
+            category_id=category.id,
+            owner_id=self.test_user.id
+        ))
+        db.session.commit()
+
+        response = self.client.get('/expenses/my-expenses?search=vegeta')
+        self.assertIn(b'Weekly shop', response.data)
+        self.assertNotIn(b'Bus ticket', response.data)
+
+        expense = Expense.query.filter_by(title='Bus ticket').first()
+        expense.description = 'Vegetable delivery bus'
+        db.session.commit()
+
+        response = self.client.get('/expenses/?search=veget+bus')
+        self.assertIn(b'Bus ticket', response.data)
+        self.assertNotIn(b'Weekly shop', response.data)
+
+    def test_search_expenses_by_relevance(self):
+        """Test: search results can be ordered by relevance"""
+        self.login()
+        category = ExpenseCategory.query.first()
+        for title, description in [
+            ('Taxi home', 'Late taxi after the taxi queue'),
+            ('Dinner', 'Paid the taxi driver a tip'),
+        ]:
+            db.session.add(Expense(
+                title=title,
+                description=description,
+                amount=10.0,
+                date=datetime.now(timezone.utc),
+                category_id=category.id,
+                owner_id=self.test_user.id
+            ))
+        db.session.commit()
+
+        response = self.client.get(
+            '/expenses/?search=taxi&sort_by=relevance&order=desc'
+        )
+        self.assertEqual(response.status_code, 200)
+        body = response.data.decode()
+        self.assertLess(body.index('Taxi home'), body.index('Dinner'))
 
     def test_sort_expenses(self):
         """Test: sort expenses"""
@@ -275,7 +397,7 @@ class ExpensesTestCase(unittest.TestCase):
                 amount=100.0 * (i + 1),
                 date=datetime.now(timezone.utc) - timedelta(days=i),
                 category_id=category.id,
-                owner_username='testuser'
+                owner_id=self.test_user.id
             )
             db.session.add(expense)
         db.session.commit()
@@ -286,12 +408,584 @@ class ExpensesTestCase(unittest.TestCase):
         response = self.client.get('/expenses/?sort_by=amount&order=asc')
         self.assertEqual(response.status_code, 200)
 
+    def test_paginate_expenses(self):
+        """Test: expenses list is split into cursor pages"""
+        self.login()
+        category = ExpenseCategory.query.first()
+        now = datetime.now(timezone.utc)
+
+        for i in range(25):
+            db.session.add(Expense(
+                title=f'Paged {i:02d}',
+                amount=10.0,
+                date=now - timedelta(days=i // 2),
+                category_id=category.id,
+                owner_id=self.test_user.id
+            ))
+        db.session.commit()
+
+        response = self.client.get('/expenses/?sort_by=date&order=desc')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'Paged 00', response.data)
+        self.assertNotIn(b'Paged 24', response.data)
+        cursors = re.findall(r'cursor=([\w-]+)', response.data.decode())
+        self.assertEqual(len(cursors), 1)
+
+        response = self.client.get(
+            f'/expenses/?sort_by=date&order=desc&cursor={cursors[0]}'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'Paged 24', response.data)
+        self.assertNotIn(b'Paged 00', response.data)
+        cursors = re.findall(r'cursor=([\w-]+)', response.data.decode())
+        self.assertEqual(len(cursors), 1)
+
+        response = self.client.get(
+            f'/expenses/?sort_by=date&order=desc&cursor={cursors[0]}'
+        )
+        self.assertIn(b'Paged 00', response.data)
+        self.assertIn(b'Paged 19', response.data)
+        self.assertNotIn(b'Paged 20', response.data)
+
+    def test_list_summary_covers_all_pages(self):
+        """Test: summary banner totals the whole filtered set"""
+        self.login()
+        category = ExpenseCategory.query.first()
+
+        for i in range(30):
+            db.session.add(Expense(
+                title=f'Coffee {i}' if i % 2 else f'Lunch {i}',
+                amount=1.25,
+                date=datetime.now(timezone.utc),
+                category_id=category.id,
+                owner_id=self.test_user.id
+            ))
+        db.session.commit()
+
+        response = self.client.get('/expenses/my-expenses')
+        self.assertIn(b'30 |', response.data)
+        self.assertIn(b'37.50 UAH', response.data)
+
+        response = self.client.get('/expenses/?search=coffee')
+        self.assertIn(b'15 |', response.data)
+        self.assertIn(b'18.75 UAH', response.data)
+
+    def test_paginate_invalid_cursor(self):
+        """Test: malformed cursor is rejected"""
+        self.login()
+        response = self.client.get('/expenses/?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, 400)
+
+    def test_export_csv(self):
+        """Test: CSV export streams the filtered and sorted expenses"""
+        self.login()
+        category = ExpenseCategory.query.first()
+        for title, amount in [('Rent', 500.0), ('Rent deposit', 900.0),
+                              ('Snacks', 5.0)]:
+            db.session.add(Expense(
+                title=title,
+                amount=amount,
+                date=datetime(2025, 5, 1),
+                category_id=category.id,
+                owner_id=self.test_user.id
+            ))
+        db.session.commit()
+
+        response = self.client.get(
+            '/expenses/export.csv?search=rent&sort_by=amount&order=asc'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_streamed)
+        self.assertEqual(response.mimetype, 'text/csv')
+
+        rows = list(csv.DictReader(response.get_data(as_text=True)
+                                   .splitlines()))
+        self.assertEqual([row['title'] for row in rows],
+                         ['Rent', 'Rent deposit'])
+        self.assertEqual(rows[1]['amount'], '900.00')
+        self.assertEqual(rows[1]['category'], category.name)
+
+    def test_export_ndjson_mine(self):
+        """Test: NDJSON export can be limited to the user's expenses"""
+        self.login()
+        category = ExpenseCategory.query.first()
+        for owner in (self.test_user, self.other_user):
+            db.session.add(Expense(
+                title=f'Owned by {owner.username}',
+                amount=1.0,
+                date=datetime(2025, 5, 1),
+                category_id=category.id,
+                owner_id=owner.id
+            ))
+        db.session.commit()
+
+        response = self.client.get('/expenses/export.ndjson?scope=mine')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+
+        rows = [json.loads(line) for line in
+                response.get_data(as_text=True).splitlines()]
+        self.assertEqual([row['owner_username'] for row in rows],
+                         ['testuser'])
+        self.assertEqual(rows[0]['date'], '2025-05-01')
+
+    def test_import_csv_upload(self):
+        """Test: CSV upload inserts valid rows and reports invalid ones"""
+        self.login()
+        content = (
+            'title,description,amount,date,category\n'
+            'Imported lunch,,12.50,2025-04-01,Food\n'
+            'Imported bus,Commute,2.00,2025-04-02,transport\n'
+            'No,,5,2025-04-03,Food\n'
+            'Bad amount,,-1,2025-04-03,Food\n'
+            'Unknown category,,5,2025-04-03,Travel\n'
+        )
+
+        response = self.client.post(
+            '/expenses/import',
+            data={'file': (io.BytesIO(content.encode()), 'expenses.csv')},
+            content_type='multipart/form-data'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'Imported 2 expense(s)', response.data)
+        self.assertIn(b'3 row(s) were skipped', response.data)
+
+        expenses = Expense.query.order_by(Expense.date).all()
+        self.assertEqual(
+            [(e.title, e.category.name, e.owner.username) for e in expenses],
+            [('Imported lunch', 'Food', 'testuser'),
+             ('Imported bus', 'Transport', 'testuser')]
+        )
+        with db.engine.connect() as connection:
+            self.assertEqual(rollup.find_drift(connection), [])
+            self.assertEqual(daily.find_drift(connection), [])
+
+    def test_import_command(self):
+        """Test: CLI import commits in chunks"""
+        handle, path = tempfile.mkstemp(suffix='.csv')
+        with os.fdopen(handle, 'w') as fh:
+            fh.write('title,amount,date,category\n')
+            for i in range(25):
+                fh.write(f'Bulk row {i},{i + 1},2025-06-{i + 1:02d},Food\n')
+        self.addCleanup(os.remove, path)
+
+        result = self.app.test_cli_runner().invoke(args=[
+            'expenses', 'import', path,
+            '--owner', 'testuser',
+            '--chunk-size', '10'
+        ])
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn('Imported 25 expense(s), skipped 0', result.output)
+        self.assertEqual(Expense.query.count(), 25)
+        self.assertEqual(UserCategoryTotal.query.one().total, 325.0)
+
+        self.login()
+        response = self.client.get('/expenses/?search=bulk')
+        self.assertIn(b'25 |', response.data)
+
+    def test_seed_command(self):
+        """Test: flask seed bulk-loads users, categories and expenses"""
+        result = self.app.test_cli_runner().invoke(args=[
+            'seed',
+            '--users', '5',
+            '--categories', '3',
+            '--expenses', '500',
+            '--username-prefix', 'seeded',
+            '--password', 'seedpass',
+            '--batch-size', '200',
+        ])
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn(
+            'Added 5 user(s), 2 category(ies) and 500 expense(s)',
+            result.output
+        )
+        self.assertEqual(Expense.query.count(), 500)
+        self.assertEqual(
+            sorted(category.name for category in ExpenseCategory.query),
+            ['Dining', 'Food', 'Groceries', 'Transport']
+        )
+        self.assertEqual(
+            Expense.query.join(ExpenseCategory)
+            .filter(ExpenseCategory.name == 'Food').count(),
+            0
+        )
+        self.assertEqual(
+            {index['name'] for index in inspect(db.engine).get_indexes(
+                'expenses'
+            )},
+            {index.name for index in Expense.__table__.indexes}
+        )
+        connection = db.session.connection()
+        self.assertEqual(rollup.find_drift(connection), [])
+        self.assertEqual(daily.find_drift(connection), [])
+
+        owner = User.query.filter(User.username.startswith('seeded')).first()
+        response = self.client.post('/users/login', data={
+            'username': owner.username,
+            'password': 'seedpass',
+        })
+        self.assertEqual(response.status_code, 302)
+        response = self.client.get('/expenses/?search=coffee')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'Coffee', response.data)
+
     def test_categories_page(self):
         """Test: categories page"""
         self.login()
         response = self.client.get('/expenses/categories')
         self.assertEqual(response.status_code, 200)
 
+    def count_queries(self, url):
+        """Helper method to count SQL statements issued by a GET request"""
+        with count_queries(self.app) as stats:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return stats.count
+
+    def test_categories_page_totals(self):
+        """Test: categories page shows count and total per category"""
+        self.login()
+        food = ExpenseCategory.query.filter_by(name='Food').first()
+        for amount in (10.0, 15.5):
+            db.session.add(Expense(
+                title='Groceries',
+                amount=amount,
+                date=datetime.now(timezone.utc),
+                category_id=food.id,
+                owner_id=self.test_user.id
+            ))
+        db.session.commit()
+
+        response = self.client.get('/expenses/categories')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'25.50 UAH', response.data)
+        self.assertIn(b'0.00 UAH', response.data)
+
+    def test_categories_page_query_count(self):
+        """Test: categories page query count does not grow with categories"""
+        self.login()
+        baseline = self.count_queries('/expenses/categories')
+
+        for i in range(20):
+            category = ExpenseCategory(name=f'Extra {i}')
+            db.session.add(category)
+            db.session.flush()
+            db.session.add(Expense(
+                title=f'Extra expense {i}',
+                amount=1.0,
+                date=datetime.now(timezone.utc),
+                category_id=category.id,
+                owner_id=self.test_user.id
+            ))
+        db.session.commit()
+
+        self.assertEqual(self.count_queries('/expenses/categories'), baseline)
+
+    def test_rollup_follows_create_edit_delete(self):
+        """Test: per-user category totals are kept in sync with expenses"""
+        self.login()
+        category = ExpenseCategory.query.first()
+        data = {
+            'title': 'Rollup Expense',
+            'amount': 40.0,
+            'date': '2025-01-15',
+            'category_id': category.id
+        }
+        self.client.post('/expenses/create', data=data)
+        self.client.post('/expenses/create', data=dict(data, amount=60.0))
+
+        bucket = db.session.get(
+            UserCategoryTotal,
+            (self.test_user.id, category.id, datetime(2025, 1, 1).date())
+        )
+        self.assertEqual(bucket.count, 2)
+        self.assertEqual(bucket.total, 100.0)
+        self.assertEqual(bucket.min_amount, 40.0)
+        self.assertEqual(bucket.max_amount, 60.0)
+
+        expense = Expense.query.filter_by(amount=60.0).first()
+        self.client.post(
+            f'/expenses/{expense.id}/edit',
+            data=dict(data, amount=60.0, date='2025-02-03')
+        )
+        other = Expense.query.filter_by(amount=40.0).first()
+        self.client.post(f'/expenses/{other.id}/delete')
+
+        db.session.expire_all()
+        with db.engine.connect() as connection:
+            self.assertEqual(rollup.find_drift(connection), [])
+            self.assertEqual(daily.find_drift(connection), [])
+        self.assertEqual(
+            [(row.month.month, row.count, row.total)
+             for row in UserCategoryTotal.query.all()],
+            [(2, 1, 60.0)]
+        )
+
+    def test_amounts_are_stored_as_exact_cents(self):
+        """Test: amounts are integer cents and totals are exact"""
+        self.login()
+        category = ExpenseCategory.query.first()
+        for amount in ('0.10', '0.20', '12.345'):
+            self.client.post('/expenses/create', data={
+                'title': 'Cents',
+                'amount': amount,
+                'date': '2025-01-15',
+                'category_id': category.id
+            })
+
+        self.assertEqual(
+            db.session.execute(
+                text('SELECT amount FROM expenses ORDER BY id')
+            ).scalars().all(),
+            [10, 20, 1235]
+        )
+        expense = Expense.query.order_by(Expense.id).first()
+        self.assertEqual(expense.amount, Decimal('0.10'))
+        self.assertEqual(
+            UserCategoryTotal.query.one().total,
+            Decimal('12.65')
+        )
+        self.assertEqual(
+            db.session.scalar(
+                db.select(db.func.sum(Expense.amount))
+                .where(Expense.amount < 1)
+            ),
+            Decimal('0.30')
+        )
+
+        response = self.client.get('/expenses/my-expenses')
+        self.assertIn(b'12.65 UAH', response.data)
+
+    def test_amounts_above_maximum_are_rejected(self):
+        """Test: amounts that do not fit the cents column are rejected"""
+        self.login()
+        category = ExpenseCategory.query.first()
+        response = self.client.post('/expenses/create', data={
+            'title': 'Too much',
+            'amount': '1e17',
+            'date': '2025-01-15',
+            'category_id': category.id
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'Amount cannot exceed', response.data)
+
+        content = (
+            'title,amount,date,category\n'
+            'Huge,100000000000000000,2025-04-01,Food\n'
+            'Fine lunch,12.50,2025-04-01,Food\n'
+        )
+        response = self.client.post(
+            '/expenses/import',
+            data={'file': (io.BytesIO(content.encode()), 'expenses.csv')},
+            content_type='multipart/form-data'
+        )
+        self.assertIn(b'Imported 1 expense(s)', response.data)
+        self.assertIn(b'1 row(s) were skipped', response.data)
+        self.assertEqual(
+            [expense.title for expense in Expense.query.all()],
+            ['Fine lunch']
+        )
+
+        cursor = encode_cursor('amount', Decimal('1e17'), 1, 'next')
+        response = self.client.get(
+            f'/expenses/?sort_by=amount&cursor={cursor}'
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_rebuild_totals_command(self):
+        """Test: CLI command detects drift and rebuilds the rollup"""
+        category = ExpenseCategory.query.first()
+        db.session.add(Expense(
+            title='Rollup CLI',
+            amount=12.0,
+            date=datetime(2025, 3, 4),
+            category_id=category.id,
+            owner_id=self.test_user.id
+        ))
+        db.session.commit()
+        runner = self.app.test_cli_runner()
+
+        result = runner.invoke(args=['expenses', 'rebuild-totals', '--check'])
+        self.assertEqual(result.exit_code, 0)
+
+        UserCategoryTotal.query.update({'total': 99.0})
+        db.session.commit()
+        result = runner.invoke(args=['expenses', 'rebuild-totals', '--check'])
+        self.assertNotEqual(result.exit_code, 0)
+        self.assertIn('1 bucket(s) drifted', result.output)
+
+        UserDailyTotal.query.delete()
+        db.session.commit()
+        result = runner.invoke(args=['expenses', 'rebuild-totals', '--check'])
+        self.assertIn(
+            "2025-03-04: expected (1, Decimal('12.00')), stored None",
+            result.output
+        )
+        self.assertIn('2 bucket(s) drifted', result.output)
+
+        result = runner.invoke(args=['expenses', 'rebuild-totals'])
+        self.assertEqual(result.exit_code, 0)
+        db.session.expire_all()
+        self.assertEqual(UserCategoryTotal.query.one().total, 12.0)
+        self.assertEqual(UserDailyTotal.query.one().total, 12.0)
+
+    def test_list_views_query_budget(self):
+        """Test: read-only views stay within their query budgets"""
+        self.login()
+        category = ExpenseCategory.query.first()
+        for i in range(30):
+            db.session.add(Expense(
+                title=f'Budget {i}',
+                amount=1.0,
+                date=datetime.now(timezone.utc),
+                category_id=category.id,
+                owner_id=self.test_user.id
+            ))
+        db.session.commit()
+        expense_id = Expense.query.first().id
+
+        for url, limit in [
+            ('/expenses/', 4),
+            ('/expenses/my-expenses', 4),
+            ('/expenses/?search=budget', 4),
+            ('/expenses/categories', 2),
+            (f'/expenses/{expense_id}', 3),
+        ]:
+            db.session.expire_all()
+            with max_queries(limit, self.app):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, url)
+
+    def test_detail_conditional_get(self):
+        """Test: unchanged detail page answers 304 without rendering"""
+        self.login()
+        self.app.config['CONDITIONAL_GET'] = True
+        self.client.get('/expenses/')
+        category = ExpenseCategory.query.first()
+        expense = Expense(
+            title='Cached Expense',
+            amount=10.0,
+            date=datetime(2025, 3, 1),
+            category_id=category.id,
+            owner_id=self.test_user.id
+        )
+        db.session.add(expense)
+        db.session.commit()
+        url = f'/expenses/{expense.id}'
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        etag = response.headers['ETag']
+        self.assertIsNotNone(response.last_modified)
+        self.assertIn('no-cache', response.headers['Cache-Control'])
+
+        with count_queries(self.app) as stats:
+            response = self.client.get(url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.data, b'')
+        self.assertEqual(stats.count, 1)
+
+        expense.amount = 20.0
+        db.session.commit()
+        response = self.client.get(url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers['ETag'], etag)
+
+    def test_list_etags_follow_data_versions(self):
+        """Test: list ETags change only when the listed data changes"""
+        self.login()
+        self.app.config['CONDITIONAL_GET'] = True
+        self.client.get('/expenses/')
+        etags = {
+            url: self.client.get(url).headers['ETag']
+            for url in ('/expenses/', '/expenses/my-expenses')
+        }
+
+        with count_queries(self.app) as stats:
+            response = self.client.get(
+                '/expenses/my-expenses',
+                headers={'If-None-Match': etags['/expenses/my-expenses']}
+            )
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(stats.count, 0)
+
+        category = ExpenseCategory.query.first()
+        db.session.add(Expense(
+            title='Someone else',
+            amount=1.0,
+            date=datetime(2025, 3, 1),
+            category_id=category.id,
+            owner_id=self.other_user.id
+        ))
+        db.session.commit()
+
+        for url, status in [('/expenses/', 200),
+                            ('/expenses/my-expenses', 304)]:
+            response = self.client.get(
+                url,
+                headers={'If-None-Match': etags[url]}
+            )
+            self.assertEqual(response.status_code, status, url)
+
+    def test_server_timing_header(self):
+        """Test: responses report SQL count and time"""
+        self.login()
+        response = self.client.get('/expenses/categories')
+        timing = response.headers.getlist('Server-Timing')
+        self.assertTrue(any(
+            re.match(r'db;dur=[\d.]+;desc="\d+ queries"', value)
+            for value in timing
+        ))
+        self.assertTrue(any(
+            re.match(r'pool;dur=[\d.]+$', value) for value in timing
+        ))
+
+    def test_slow_query_log(self):
+        """Test: statements above the threshold are logged with endpoint"""
+        self.login()
+        self.app.config['SLOW_QUERY_MS'] = 0
+        self.addCleanup(self.app.config.__setitem__, 'SLOW_QUERY_MS', 200)
+
+        with self.assertLogs('app.sql', level='WARNING') as logs:
+            self.client.get('/expenses/categories')
+        entry = json.loads(logs.records[0].getMessage())
+        self.assertEqual(entry['event'], 'slow_query')
+        self.assertEqual(entry['endpoint'], 'expenses_bp.categories')
+
+    def test_analytics_page(self):
+        """Test: analytics page tables spending per month and category"""
+        self.login()
+        category = ExpenseCategory.query.filter_by(name='Food').first()
+        for day, amount in [('2024-01-05', 10.0), ('2024-03-09', 2.5)]:
+            db.session.add(Expense(
+                title='Groceries',
+                amount=amount,
+                date=datetime.strptime(day, '%Y-%m-%d'),
+                category_id=category.id,
+                owner_id=self.test_user.id
+            ))
+        db.session.commit()
+
+        self.app.config['CONDITIONAL_GET'] = True
+        url = (
+            '/expenses/analytics'
+            '?granularity=month&from=2024-01-01&to=2024-03-31'
+        )
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'2024-02', response.data)
+        self.assertIn(b'10.00', response.data)
+        self.assertIn(b'2.50', response.data)
+
+        response = self.client.get(
+            url,
+            headers={'If-None-Match': response.headers['ETag']}
+        )
+        self.assertEqual(response.status_code, 304)
+
+        response = self.client.get('/expenses/analytics?granularity=hour')
+        self.assertEqual(response.status_code, 400)
+
     def test_my_expenses_page(self):
         """Test: "My expenses" page"""
         self.login()
@@ -308,7 +1002,7 @@ class ExpensesTestCase(unittest.TestCase):
             amount=150.0,
             date=datetime.now(timezone.utc),
             category_id=category.id,
-            owner_username='testuser'
+            owner_id=self.test_user.id
         )
         db.session.add(expense)
         db.session.commit()
@@ -317,5 +1011,213 @@ class ExpensesTestCase(unittest.TestCase):
         self.assertIn(expense, category.expenses)
 
 
+class EngineTuningTestCase(unittest.TestCase):
+    def make_db(self, **config):
+        """Helper method to build a file-backed database for one test"""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+
+        tuned_app = create_app({
+            'SQLALCHEMY_DATABASE_URI':
+                f"sqlite:///{os.path.join(directory, 'tuned.db')}",
+            **config,
+        }, blueprints=[])
+
+        with tuned_app.app_context():
+            engine = db.engine
+        self.addCleanup(engine.dispose)
+        return engine
+
+    def test_sqlite_prod_pragmas(self):
+        """Test: sqlite-prod profile enables WAL on every connection"""
+        engine = self.make_db(APP_PROFILE='sqlite-prod')
+        with engine.connect() as connection:
+            pragma = connection.exec_driver_sql
+            self.assertEqual(pragma('PRAGMA journal_mode').scalar(), 'wal')
+            self.assertEqual(pragma('PRAGMA synchronous').scalar(), 1)
+            self.assertEqual(pragma('PRAGMA mmap_size').scalar(),
+                             256 * 1024 * 1024)
+
+        stats = pool_stats(engine)
+        self.assertEqual(stats['pool'], 'TimedQueuePool')
+        self.assertEqual(stats['checkouts'], 1)
+        self.assertEqual(stats['size'], 5)
+
+    def test_pool_checkout_wait_is_measured(self):
+        """Test: time spent waiting for a free connection is recorded"""
+        engine = self.make_db(SQLALCHEMY_ENGINE_OPTIONS={
+            'pool_size': 1,
+            'max_overflow': 0,
+        })
+        held = engine.connect()
+
+        def wait_for_connection():
+            with engine.connect() as connection:
+                connection.execute(text('SELECT 1'))
+
+        waiter = threading.Thread(target=wait_for_connection)
+        waiter.start()
+        time.sleep(0.05)
+        held.close()
+        waiter.join()
+
+        stats = pool_stats(engine)
+        self.assertEqual(stats['checkouts'], 2)
+        self.assertGreaterEqual(stats['max_wait'], 0.04)
+        self.assertEqual(stats['checked_out'], 0)
+
+    def test_pool_counts_only_timeouts(self):
+        """Test: checkout timeouts are counted, connect errors are not"""
+        engine = self.make_db(SQLALCHEMY_ENGINE_OPTIONS={
+            'pool_size': 1,
+            'max_overflow': 0,
+            'pool_timeout': 0.01,
+        })
+        with engine.connect():
+            with self.assertRaises(exc.TimeoutError):
+                engine.connect()
+        self.assertEqual(pool_stats(engine)['timeouts'], 1)
+
+        engine.pool.dispose()
+        with mock.patch.object(
+            engine.pool, '_creator', side_effect=OSError('unreachable')
+        ):
+            with self.assertRaises(OSError):
+                engine.connect()
+        self.assertEqual(pool_stats(engine)['timeouts'], 1)
+
+
+class ReplicaRoutingTestCase(unittest.TestCase):
+    def setUp(self):
+        """Set up a primary and a replica SQLite file with the same data"""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        primary = os.path.join(directory, 'primary.db')
+        replica = os.path.join(directory, 'replica.db')
+
+        self.app = create_app({
+            'TESTING': True,
+            'SQLALCHEMY_DATABASE_URI': f'sqlite:///{primary}',
+            'SQLALCHEMY_BINDS': {'replica': f'sqlite:///{replica}'},
+            'WTF_CSRF_ENABLED': False,
+        })
+        with self.app.app_context():
+            db.create_all()
+            user = User(username='testuser')
+            user.set_password('testpass')
+            db.session.add(user)
+            db.session.add(ExpenseCategory(name='Food'))
+            db.session.commit()
+            self.category_id = ExpenseCategory.query.one().id
+            db.session.close()
+            for engine in db.engines.values():
+                engine.dispose()
+        shutil.copyfile(primary, replica)
+
+        self.client = self.app.test_client()
+        self.client.post(
+            '/users/login',
+            data={'username': 'testuser', 'password': 'testpass'}
+        )
+
+    def tearDown(self):
+        """Release both databases after each test"""
+        with self.app.app_context():
+            for engine in db.engines.values():
+                engine.dispose()
+
+    def add_to_primary(self, title):
+        """Helper method to write an expense the replica has not seen"""
+        with self.app.app_context():
+            expense = Expense(
+                title=title,
+                amount=5.0,
+                date=datetime(2025, 6, 1),
+                category_id=self.category_id,
+                owner_id=User.query.one().id
+            )
+            db.session.add(expense)
+            db.session.commit()
+            return expense.id
+
+    def test_read_views_use_replica(self):
+        """Test: read-only views query the replica database"""
+        expense_id = self.add_to_primary('Primary only')
+
+        response = self.client.get('/expenses/')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn(b'Primary only', response.data)
+        self.assertEqual(
+            self.client.get(f'/expenses/{expense_id}').status_code, 404
+        )
+
+    def test_replica_bind_stays_with_its_app(self):
+        """Test: apps without a replica do not see the replica bind"""
+        app = create_app({
+            'TESTING': True,
+            'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:',
+        }, blueprints=[])
+        with app.app_context():
+            db.create_all()
+            self.assertNotIn('replica', db.engines)
+        with self.app.app_context():
+            self.assertIn('replica', db.engines)
+
+    def test_replica_uses_profile_engine_options(self):
+        """Test: the replica pool is configured like the primary's"""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        app = create_app({
+            'TESTING': True,
+            'SQLALCHEMY_DATABASE_URI':
+                f"sqlite:///{os.path.join(directory, 'primary.db')}",
+            'SQLALCHEMY_BINDS': {
+                'replica': f"sqlite:///{os.path.join(directory, 'r.db')}",
+            },
+            'SQLALCHEMY_ENGINE_OPTIONS': {
+                'pool_size': 3,
+                'pool_pre_ping': True,
+                'pool_recycle': 1800,
+            },
+        }, blueprints=[])
+        with app.app_context():
+            for key in (None, 'replica'):
+                pool = db.engines[key].pool
+                self.assertEqual(pool.size(), 3, key)
+                self.assertTrue(pool._pre_ping, key)
+                self.assertEqual(pool._recycle, 1800, key)
+                db.engines[key].dispose()
+
+    def test_reads_stick_to_primary_after_write(self):
+        """Test: the user's own write is visible right after it"""
+        response = self.client.post('/expenses/create', data={
+            'title': 'Just written',
+            'amount': '12.00',
+            'date': '2025-06-02',
+            'category_id': self.category_id,
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertIn(b'Just written',
+                      self.client.get('/expenses/my-expenses').data)
+
+        self.app.config['REPLICA_STICKY_SECONDS'] = 0
+        self.assertNotIn(b'Just written',
+                         self.client.get('/expenses/my-expenses').data)
+
+    def test_replica_reads_are_not_conditional(self):
+        """Test: pages read from the replica get no validators"""
+        self.app.config['CONDITIONAL_GET'] = True
+        self.app.config['REPLICA_STICKY_SECONDS'] = 0
+        response = self.client.get('/expenses/my-expenses')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('ETag', response.headers)
+
+        response = self.client.get(
+            '/expenses/my-expenses',
+            headers={'If-None-Match': '*'}
+        )
+        self.assertEqual(response.status_code, 200)
+
+
 if __name__ == '__main__':
     unittest.main(verbosity=2)
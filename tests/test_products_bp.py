@@ -1,12 +1,44 @@
 import unittest
-from app import app
+from unittest import mock
+
+from app import create_app, db
+from app.page_cache import ResponseCache, page_cache
+from app.products.models import Product
+
+FRUITS = [
+    ("Lemon", "A tart, yellow citrus fruit used for juice and zest."),
+    ("Apple", "A sweet, crunchy fruit commonly eaten fresh or in desserts."),
+    ("Banana", "A soft, sweet tropical fruit with a creamy texture."),
+    ("Orange", "A juicy citrus fruit rich in vitamin C."),
+]
+
+
+def make_app(config=None, blueprints=None):
+    """Застосунок з окремою базою в пам'яті та каталогом фруктів."""
+    app = create_app({
+        "TESTING": True,
+        "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:",
+        **(config or {}),
+    }, blueprints=blueprints)
+    with app.app_context():
+        db.create_all()
+        for name, description in FRUITS:
+            db.session.add(Product(name=name, description=description))
+        db.session.commit()
+    page_cache.prewarm(app)
+    return app
 
 
 class FlaskAppTestCase(unittest.TestCase):
     def setUp(self):
         """Налаштування клієнта тестування перед кожним тестом."""
-        app.config["TESTING"] = True
-        self.client = app.test_client()
+        self.app = make_app()
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        """Звільнення бази даних після кожного тесту."""
+        with self.app.app_context():
+            db.engine.dispose()
 
     def test_products_page(self):
         """Тест маршруту /products."""
@@ -27,6 +59,123 @@ class FlaskAppTestCase(unittest.TestCase):
             response.data
         )
 
+    def test_app_with_selected_blueprints(self):
+        """Тест: застосунок реєструє лише вибрані блюпринти."""
+        products_app = make_app(blueprints=["products"])
+        self.assertIn("products_bp", products_app.blueprints)
+        self.assertIn("users_bp", products_app.blueprints)
+        self.assertNotIn("expenses_bp", products_app.blueprints)
+
+        response = products_app.test_client().get("/products")
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn(b"Expenses", response.data)
+        self.assertIn(b"Expenses", self.client.get("/products").data)
+
+    def test_pages_are_prewarmed(self):
+        """Тест: сторінки продуктів рендеряться один раз під час запуску."""
+        cache = self.app.extensions["page_cache"]
+        self.assertEqual(len(cache), 2)
+
+        with mock.patch("app.products.views.render_template") as render:
+            response = self.client.get("/products")
+        render.assert_not_called()
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b"Apple", response.data)
+
+        response = self.client.get(
+            "/products",
+            headers={"If-None-Match": response.headers["ETag"]}
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_prewarm_skips_failing_pages(self):
+        """Тест: сторінки, що не рендеряться, не кешуються під час запуску."""
+        testing = create_app({
+            "TESTING": True,
+            "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:",
+        })
+        self.assertEqual(len(testing.extensions["page_cache"]), 0)
+
+        app = create_app({
+            "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:",
+            "PAGE_CACHE_PREWARM": False,
+        })
+        with self.assertLogs(app.logger, "ERROR"):
+            with self.assertLogs("app.page_cache", "WARNING") as logs:
+                warmed = page_cache.prewarm(app)
+        self.assertEqual(warmed, 1)
+        self.assertEqual(len(app.extensions["page_cache"]), 1)
+        self.assertIn("/products", logs.output[0])
+
+    def test_theme_cookie_is_part_of_key(self):
+        """Тест: cookie теми створює окремий запис кешу."""
+        cache = self.app.extensions["page_cache"]
+        misses = cache.misses
+        self.client.set_cookie("theme", "dark")
+        self.client.get("/products")
+        self.client.get("/products")
+        self.assertEqual(len(cache), 3)
+        self.assertEqual(cache.misses, misses + 1)
+
+    def test_lookup_by_id_with_gaps(self):
+        """Тест: пошук продукту за id не залежить від позиції в списку."""
+        with self.app.app_context():
+            db.session.delete(db.session.get(Product, 2))
+            db.session.add(Product(id=10, name="Kiwi", description="Green"))
+            db.session.commit()
+
+        self.assertEqual(self.client.get("/products/2").status_code, 404)
+        response = self.client.get("/products/10")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b"Kiwi", response.data)
+
+        response = self.client.get("/products")
+        self.assertIn(b"Kiwi", response.data)
+        self.assertNotIn(b"Apple", response.data)
+
+    def test_products_pagination_and_search(self):
+        """Тест: список продуктів розбито на сторінки і він шукає."""
+        client = make_app({"PRODUCTS_PER_PAGE": 3}).test_client()
+        response = client.get("/products")
+        self.assertIn(b"Banana", response.data)
+        self.assertNotIn(b"Orange", response.data)
+        self.assertIn(b"after=3", response.data)
+
+        response = client.get("/products?after=3")
+        self.assertIn(b"Orange", response.data)
+        self.assertNotIn(b"Lemon", response.data)
+        self.assertNotIn(b"Next page", response.data)
+
+        response = client.get("/products?search=CITRUS")
+        self.assertIn(b"Lemon", response.data)
+        self.assertIn(b"Orange", response.data)
+        self.assertNotIn(b"Apple", response.data)
+
+    def test_seed_command(self):
+        """Тест: команда seed додає продукти пакетами."""
+        result = self.app.test_cli_runner().invoke(args=[
+            "products", "seed", "--count", "50", "--batch-size", "20"
+        ])
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn("Added 50 product(s)", result.output)
+        with self.app.app_context():
+            self.assertEqual(db.session.query(Product).count(), 54)
+
+
+class ResponseCacheTestCase(unittest.TestCase):
+    def test_byte_budget_evicts_least_recently_used(self):
+        """Тест: кеш не перевищує бюджет у байтах."""
+        cache = ResponseCache(max_bytes=10)
+        cache.put("a", b"1234", "text/html")
+        cache.put("b", b"1234", "text/html")
+        cache.get("a")
+        cache.put("c", b"1234", "text/html")
+
+        self.assertEqual(cache.size, 8)
+        self.assertIsNone(cache.get("b"))
+        self.assertIsNotNone(cache.get("a"))
+        self.assertIsNone(cache.put("huge", b"x" * 11, "text/html"))
+
 
 if __name__ == "__main__":
     unittest.main()
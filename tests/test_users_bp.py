@@ -1,12 +1,28 @@
 import unittest
-from app import app
+from unittest import mock
+
+from werkzeug.security import generate_password_hash
+
+from app import create_app, db
+from app.cache import versions
+from app.instrumentation import count_queries
+from app.users.hashing import password_hasher
+from app.users.identity import (
+    USERS_VERSION_KEY,
+    IdentityCache,
+    UserIdentity
+)
+from app.users.models import User
 
 
 class FlaskAppTestCase(unittest.TestCase):
     def setUp(self):
         """Налаштування клієнта тестування перед кожним тестом."""
-        app.config["TESTING"] = True
-        self.client = app.test_client()
+        self.app = create_app({
+            "TESTING": True,
+            "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:",
+        })
+        self.client = self.app.test_client()
 
     def test_greetings_page(self):
         """Тест маршруту /users/hi/<name>."""
@@ -23,5 +39,136 @@ class FlaskAppTestCase(unittest.TestCase):
         self.assertIn(b"45", response.data)
 
 
+class UserSessionTestCase(unittest.TestCase):
+    def setUp(self):
+        """Підготовка бази даних і користувача перед кожним тестом."""
+        self.app = create_app({
+            "TESTING": True,
+            "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:",
+            "WTF_CSRF_ENABLED": False,
+        })
+        self.client = self.app.test_client()
+
+        with self.app.app_context():
+            db.drop_all()
+            db.create_all()
+            user = User(username="loader")
+            user.set_password("secret")
+            db.session.add(user)
+            db.session.commit()
+            self.user_id = user.id
+
+        self.client.post(
+            "/users/login",
+            data={"username": "loader", "password": "secret"}
+        )
+
+    def tearDown(self):
+        """Очищення бази даних після кожного тесту."""
+        with self.app.app_context():
+            db.drop_all()
+            db.engine.dispose()
+
+    def users_queries(self, url):
+        """Кількість запитів до таблиці users під час GET-запиту."""
+        with count_queries(self.app) as stats:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return sum("FROM users" in statement for statement in stats.statements)
+
+    def test_user_loader_is_cached(self):
+        """Тест: повторні запити не звертаються до таблиці users."""
+        self.client.get("/users/profile")
+        self.assertEqual(self.users_queries("/users/profile"), 0)
+
+    def test_renamed_user_is_reloaded(self):
+        """Тест: зміна користувача скидає кешовану ідентичність."""
+        self.client.get("/users/profile")
+        with self.app.app_context():
+            db.session.get(User, self.user_id).username = "renamed"
+            db.session.commit()
+
+        self.assertEqual(self.users_queries("/users/profile"), 1)
+        response = self.client.get("/users/profile")
+        self.assertIn(b"renamed", response.data)
+
+    def test_deleted_user_is_logged_out(self):
+        """Тест: видалений користувач більше не автентифікований."""
+        self.client.get("/users/profile")
+        with self.app.app_context():
+            db.session.delete(db.session.get(User, self.user_id))
+            db.session.commit()
+
+        response = self.client.get("/users/profile")
+        self.assertEqual(response.status_code, 302)
+        self.assertIn("/users/login", response.headers["Location"])
+
+    def test_login_upgrades_outdated_hash(self):
+        """Тест: хеш зі старим методом оновлюється під час входу."""
+        with self.app.app_context():
+            user = db.session.get(User, self.user_id)
+            user.password_hash = generate_password_hash(
+                "secret",
+                "pbkdf2:sha256:1000"
+            )
+            db.session.commit()
+            self.assertTrue(user.password_needs_rehash())
+            version = versions.get(USERS_VERSION_KEY)
+
+        self.client.get("/users/profile")
+        client = self.app.test_client()
+        response = client.post(
+            "/users/login",
+            data={"username": "loader", "password": "secret"}
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertIn("/users/profile", response.headers["Location"])
+
+        with self.app.app_context():
+            user = db.session.get(User, self.user_id)
+            self.assertFalse(user.password_needs_rehash())
+            self.assertTrue(user.check_password("secret"))
+            self.assertEqual(versions.get(USERS_VERSION_KEY), version)
+        self.assertEqual(self.users_queries("/users/profile"), 0)
+
+    def test_needs_rehash_follows_configured_cost(self):
+        """Тест: зміна вартості хешування вимагає перехешування."""
+        with self.app.app_context():
+            password_hash = password_hasher.hash("secret")
+            self.assertFalse(password_hasher.needs_rehash(password_hash))
+
+            with mock.patch.dict(self.app.config,
+                                 {"PASSWORD_HASH_METHOD": "scrypt:16384:8:1"}):
+                self.assertTrue(password_hasher.needs_rehash(password_hash))
+
+
+class IdentityCacheTestCase(unittest.TestCase):
+    def test_least_recently_used_entry_is_evicted(self):
+        """Тест: кеш не перевищує заданий розмір."""
+        cache = IdentityCache(maxsize=2, ttl=60)
+        cache.get(0, version=1)
+        for user_id in (1, 2):
+            cache.put(UserIdentity(user_id, f"user{user_id}"))
+        cache.get(1, version=1)
+        cache.put(UserIdentity(3, "user3"))
+
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.get(2, version=1))
+        self.assertEqual(cache.get(1, version=1).username, "user1")
+
+    def test_entries_expire_and_follow_version(self):
+        """Тест: записи застарівають за TTL і при зміні версії."""
+        cache = IdentityCache(maxsize=10, ttl=60)
+        cache.get(0, version=1)
+        cache.put(UserIdentity(1, "user1"))
+
+        with mock.patch("app.users.identity.time.monotonic",
+                        return_value=10 ** 9):
+            self.assertIsNone(cache.get(1, version=1))
+
+        cache.put(UserIdentity(1, "user1"))
+        self.assertIsNone(cache.get(1, version=2))
+
+
 if __name__ == "__main__":
     unittest.main()